@@ -0,0 +1,119 @@
+"""
+Benchmark batched multi-query retrieval: throughput of retrieve_batch vs one query at a time
+
+For each batch size, the same queries are answered serially (one embeddings
+request and one search per query) and with retrieve_batch (one embeddings
+request, one batched index search). Real collections call the embeddings API;
+--synthetic uses local hash-seeded vectors with a simulated request latency.
+
+Usage:
+    python archives/benchmark_batch_retrieval.py [--sizes 1 16 128 1024]
+    python archives/benchmark_batch_retrieval.py --synthetic 2800 --latency-ms 150
+"""
+import argparse
+import hashlib
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from langchain_community.vectorstores import Chroma
+from langchain_core.embeddings import Embeddings
+
+from config.settings import AVAILABLE_COLLECTIONS, RETRIEVAL_CONFIG
+from core.retrievers import build_retriever, retrieve_batch
+
+BASE_QUERIES = [
+    "Qu'est-ce que l'émotivité ?",
+    "Comment reconnaître un flegmatique ?",
+    "Différence entre primarité et secondarité",
+    "Le colérique est-il actif ?",
+    "Quels sont les traits du sentimental ?",
+    "Le passionné et l'ambition",
+    "Le nerveux face au travail",
+    "L'amorphe et l'apathique"
+]
+
+
+class LocalEmbeddings(Embeddings):
+    """Hash-seeded unit vectors, sleeping latency seconds per request to simulate the API round trip"""
+
+    def __init__(self, dimensions: int = 1536, latency: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        vectors = np.array([
+            np.random.default_rng(int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16))
+            .normal(size=self.dimensions) for text in texts
+        ])
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def make_queries(size: int) -> List[str]:
+    """Distinct queries (so the embedding cache does not serve repeats)"""
+    return [f"{BASE_QUERIES[i % len(BASE_QUERIES)]} ({i})" for i in range(size)]
+
+
+def queries_per_second(run, queries) -> float:
+    started_at = time.perf_counter()
+    run(queries)
+    return len(queries) / (time.perf_counter() - started_at)
+
+
+def benchmark_retriever(label: str, retriever, sizes: List[int], serial_limit: int):
+    print(f"\n{label}")
+    print(f"  {'Batch':>6}{'Serial q/s':>14}{'Batch q/s':>14}{'Speed-up':>10}")
+    for size in sizes:
+        queries = make_queries(size)
+        batch_qps = queries_per_second(lambda batch: retrieve_batch(retriever, batch), queries)
+        if size <= serial_limit:
+            serial_qps = queries_per_second(lambda batch: [retriever.invoke(query) for query in batch], queries)
+            print(f"  {size:>6}{serial_qps:>14.1f}{batch_qps:>14.1f}{batch_qps / serial_qps:>9.1f}x")
+        else:
+            print(f"  {size:>6}{'-':>14}{batch_qps:>14.1f}{'-':>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1, 16, 128, 1024])
+    parser.add_argument("--serial-limit", type=int, default=128,
+                        help="Largest batch also run one query at a time (serial runs are slow on the real API)")
+    parser.add_argument("--synthetic", type=int, nargs="*", help="Benchmark random collections of these sizes")
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Simulated embeddings request latency")
+    args = parser.parse_args()
+
+    print("=== Batched retrieval benchmark (queries/second) ===")
+    if args.synthetic:
+        embeddings = LocalEmbeddings(latency=args.latency_ms / 1000)
+        for size in args.synthetic:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                vectorstore = Chroma(persist_directory=tmp_dir, collection_name=f"synthetic_{size}",
+                                     embedding_function=embeddings)
+                vectors = np.asarray(embeddings.embed_documents([f"chunk {i}" for i in range(size)]))
+                ids = [str(i) for i in range(size)]
+                for start in range(0, size, 5000):
+                    vectorstore._collection.add(ids=ids[start:start + 5000], embeddings=vectors[start:start + 5000],
+                                                documents=[f"chunk {i}" for i in range(start, min(size, start + 5000))])
+                for engine in ("chroma", "numpy", "quantized"):
+                    retriever = build_retriever(vectorstore, {**RETRIEVAL_CONFIG, "engine": engine})
+                    benchmark_retriever(f"Synthetic ({size}), {engine} engine, "
+                                        f"{args.latency_ms:.0f} ms per embeddings request",
+                                        retriever, args.sizes, args.serial_limit)
+        return
+
+    from core.llm_setup import setup_retriever
+    for collection_key in AVAILABLE_COLLECTIONS:
+        benchmark_retriever(collection_key, setup_retriever(collection_key), args.sizes, args.serial_limit)
+
+
+if __name__ == "__main__":
+    main()
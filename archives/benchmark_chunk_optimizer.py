@@ -0,0 +1,68 @@
+"""
+Benchmark the chunk size optimizer of SubChapterChunker on synthetic corpora
+
+Two shapes are generated for each size: many tiny sections (merge path) and
+a few huge sections made of short paragraphs (split path). Throughput should
+stay flat as the corpus grows if the optimizer scales linearly.
+
+Usage: python archives/benchmark_chunk_optimizer.py [max_size_mb]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.documents import Document
+from create_subchapter_vectorstore import SubChapterChunker
+
+
+def make_paragraph(rng: random.Random) -> str:
+    return " ".join(["caractère"] * rng.randint(5, 120))
+
+
+def small_sections(size: int, rng: random.Random):
+    """Sections of 50-600 chars, mostly below MIN_CHUNK_SIZE"""
+    documents, total = [], 0
+    while total < size:
+        content = "x" * rng.randint(50, 600)
+        documents.append(Document(page_content=content, metadata={"section_title": f"Section {len(documents)}"}))
+        total += len(content)
+    return documents
+
+
+def huge_sections(size: int, rng: random.Random, section_size: int = 10_000_000):
+    """Sections of up to 10 MB made of short paragraphs, far above MAX_CHUNK_SIZE"""
+    documents, total = [], 0
+    while total < size:
+        paragraphs, length = [], 0
+        while length < min(section_size, size - total):
+            paragraphs.append(make_paragraph(rng))
+            length += len(paragraphs[-1]) + 2
+        content = "\n\n".join(paragraphs)
+        documents.append(Document(page_content=content, metadata={"section_title": f"Section {len(documents)}"}))
+        total += len(content)
+    return documents
+
+
+def main():
+    max_size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    sizes_mb = [size for size in (1, 10, 100) if size <= max_size_mb]
+    chunker = SubChapterChunker()
+
+    print("=== Chunk optimizer benchmark ===")
+    print(f"{'Shape':<16}{'Size':>8}{'Input docs':>12}{'Chunks':>10}{'Time':>12}{'MB/s':>10}")
+    for shape, generate in [("small sections", small_sections), ("huge sections", huge_sections)]:
+        for size_mb in sizes_mb:
+            documents = generate(size_mb * 1_000_000, random.Random(0))
+            started_at = time.perf_counter()
+            chunks = chunker.optimize_chunk_sizes(documents)
+            elapsed = time.perf_counter() - started_at
+            print(f"{shape:<16}{size_mb:>6} MB{len(documents):>12}{len(chunks):>10}"
+                  f"{elapsed * 1000:>10.0f} ms{size_mb / elapsed:>10.1f}")
+            del documents, chunks
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark quantized vector storage: recall@k vs float32 exact search, memory and latency
+
+For each collection (or synthetic corpus) the float32 embeddings are quantized to
+int8 and float16; queries are ranked on the codes, with and without re-scoring
+the top candidates against the memory-mapped float32 vectors.
+
+Usage:
+    python archives/benchmark_quantized_search.py [--queries 200] [--k 10]
+    python archives/benchmark_quantized_search.py --synthetic 2800 50000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from langchain_community.vectorstores import Chroma
+
+from config.settings import AVAILABLE_COLLECTIONS, get_vectorstore_config
+from core.quantized_store import QuantizedVectorStore
+
+
+def synthetic_embeddings(size: int, dimensions: int = 1536, seed: int = 0):
+    """Normalized vectors around topic centers, closer to real embeddings than pure noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(size // 50, 1), dimensions))
+    vectors = centers[rng.integers(0, len(centers), size)] + rng.normal(scale=0.8, size=(size, dimensions))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def exact_top_k(matrix, queries, k):
+    scores = np.einsum("ij,ij->i", matrix, matrix) - 2.0 * (queries @ matrix.T)
+    return np.argsort(scores, axis=1)[:, :k]
+
+
+def recall_at_k(found, expected):
+    return float(np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(found, expected)]))
+
+
+def benchmark_matrix(label: str, matrix: np.ndarray, query_count: int, k: int):
+    if not len(matrix):
+        print(f"\n{label}: empty collection, skipped")
+        return
+
+    rng = np.random.default_rng(1)
+    queries = matrix[rng.integers(0, len(matrix), query_count)]
+    queries = (queries + rng.normal(scale=0.02, size=queries.shape)).astype(np.float32)
+
+    started_at = time.perf_counter()
+    expected = exact_top_k(matrix, queries, k)
+    exact_ms = (time.perf_counter() - started_at) * 1000 / query_count
+
+    print(f"\n{label}: {matrix.shape[0]} vectors x {matrix.shape[1]} dims, "
+          f"float32 = {matrix.nbytes / 1e6:.1f} MB, exact search {exact_ms:.3f} ms/query")
+    print(f"  {'Format':<10}{'RAM':>10}{'Saving':>9}{'Recall (codes)':>16}{'Recall (re-scored)':>20}{'ms/query':>10}")
+
+    ids = [str(i) for i in range(len(matrix))]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for quantization in ("int8", "float16"):
+            store = QuantizedVectorStore.build(str(Path(tmp_dir) / quantization), ids, [matrix], quantization)
+
+            first_pass, _ = store.search_vectors(queries, k, rescore_factor=1)
+            started_at = time.perf_counter()
+            rescored, _ = store.search_vectors(queries, k, rescore_factor=4)
+            search_ms = (time.perf_counter() - started_at) * 1000 / query_count
+
+            print(f"  {quantization:<10}{store.memory_bytes / 1e6:>8.1f}MB"
+                  f"{1 - store.memory_bytes / store.full_precision_bytes:>9.0%}"
+                  f"{recall_at_k(first_pass, expected):>16.3f}{recall_at_k(rescored, expected):>20.3f}"
+                  f"{search_ms:>10.3f}")
+            del store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--synthetic", type=int, nargs="*", help="Benchmark synthetic corpora of these sizes")
+    args = parser.parse_args()
+
+    print(f"=== Quantized search benchmark (recall@{args.k} vs float32) ===")
+    if args.synthetic:
+        for size in args.synthetic:
+            benchmark_matrix(f"Synthetic ({size})", synthetic_embeddings(size), args.queries, args.k)
+        return
+
+    for collection_key in AVAILABLE_COLLECTIONS:
+        config = get_vectorstore_config(collection_key)
+        vectorstore = Chroma(persist_directory=config["persist_directory"], collection_name=config["collection_name"])
+        stored = vectorstore._collection.get(include=["embeddings"])
+        matrix = np.asarray(stored["embeddings"], dtype=np.float32) if stored["ids"] else np.zeros((0, 0))
+        benchmark_matrix(f"{collection_key} ({config['collection_name']})", matrix, args.queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark the section scanner of SubChapterChunker: three finditer passes vs single pass
+
+Usage: python archives/benchmark_section_scanner.py [repeat]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from create_subchapter_vectorstore import SubChapterChunker
+
+TEXT_PATH = "documents/traite_de_caracterologie.txt"
+
+
+def three_pass_section_breaks(chunker: SubChapterChunker, text: str):
+    """Previous implementation: one finditer pass per pattern, then a sort"""
+    breaks = []
+    for match in chunker.numbered_pattern.finditer(text):
+        breaks.append((match.start(), f"Section {match.group(2)}", match.group(3).strip()))
+    for match in chunker.roman_pattern.finditer(text):
+        breaks.append((match.start(), f"Chapter {match.group(2)}", match.group(3).strip()))
+    for match in chunker.major_pattern.finditer(text):
+        breaks.append((match.start(), match.group(2), match.group(3).strip() if match.group(3) else ""))
+    breaks.sort(key=lambda x: x[0])
+    return breaks
+
+
+def measure(scanner, text: str, repeat: int):
+    """Best wall time over repeat runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        breaks = scanner(text)
+        best = min(best, time.perf_counter() - started_at)
+    return best, breaks
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    chunker = SubChapterChunker()
+    text = Path(TEXT_PATH).read_text(encoding="utf-8")
+    size_mb = len(text.encode("utf-8")) / 1e6
+
+    print(f"=== Section scanner benchmark ({size_mb:.2f} MB, best of {repeat}) ===")
+    old_time, old_breaks = measure(lambda t: three_pass_section_breaks(chunker, t), text, repeat)
+    new_time, new_breaks = measure(chunker.find_section_breaks, text, repeat)
+
+    print(f"Three passes : {old_time * 1000:8.2f} ms  {size_mb / old_time:8.1f} MB/s  ({len(old_breaks)} breaks)")
+    print(f"Single pass  : {new_time * 1000:8.2f} ms  {size_mb / new_time:8.1f} MB/s  ({len(new_breaks)} breaks)")
+    print(f"Speed-up     : x{old_time / new_time:.2f}")
+    print(f"Same breaks  : {old_breaks == new_breaks}")
+
+
+if __name__ == "__main__":
+    main()
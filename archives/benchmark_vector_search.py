@@ -0,0 +1,107 @@
+"""
+Benchmark top-k vector search latency: Chroma (HNSW) vs in-process NumPy exact search
+
+Stored chunk embeddings are reused as queries, so no embeddings API call is made.
+Collections that are not available locally can be simulated with --synthetic.
+
+Usage:
+    python archives/benchmark_vector_search.py [--queries 200] [--k 10]
+    python archives/benchmark_vector_search.py --synthetic 336 2800
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from langchain_community.vectorstores import Chroma
+
+from config.settings import AVAILABLE_COLLECTIONS, get_vectorstore_config
+from core.retrievers import NumpySearchEngine
+
+
+def percentile_ms(timings, fraction):
+    return sorted(timings)[min(len(timings) - 1, int(len(timings) * fraction))] * 1000
+
+
+def time_per_query(search, queries):
+    timings = []
+    for query in queries:
+        started_at = time.perf_counter()
+        search(query)
+        timings.append(time.perf_counter() - started_at)
+    return timings
+
+
+def benchmark_collection(label: str, vectorstore, query_count: int, k: int):
+    started_at = time.perf_counter()
+    engine = NumpySearchEngine(vectorstore)
+    load_ms = (time.perf_counter() - started_at) * 1000
+    if not len(engine):
+        print(f"\n{label}: empty collection, skipped")
+        return
+
+    rng = np.random.default_rng(0)
+    queries = engine.matrix[rng.integers(0, len(engine), query_count)]
+    queries = queries + rng.normal(scale=0.01, size=queries.shape).astype(np.float32)
+
+    chroma_timings = time_per_query(
+        lambda query: vectorstore.similarity_search_by_vector_with_relevance_scores(query.tolist(), k=k), queries
+    )
+    numpy_timings = time_per_query(lambda query: engine.search_vectors(query, k), queries)
+
+    started_at = time.perf_counter()
+    engine.search_vectors(queries, k)
+    batch_ms = (time.perf_counter() - started_at) * 1000
+
+    overlap = statistics.mean(
+        len({doc.page_content for doc, _ in vectorstore.similarity_search_by_vector_with_relevance_scores(
+            query.tolist(), k=k)} & {engine.texts[position] for position in engine.search_vectors(query, k)[0][0]}) / k
+        for query in queries[:20]
+    )
+
+    print(f"\n{label}: {len(engine)} vectors x {engine.matrix.shape[1]} dims "
+          f"({engine.matrix.nbytes / 1e6:.1f} MB, loaded in {load_ms:.0f} ms)")
+    print(f"  {'Engine':<22}{'p50':>10}{'p95':>10}")
+    print(f"  {'Chroma (LangChain)':<22}{percentile_ms(chroma_timings, 0.5):>8.2f}ms"
+          f"{percentile_ms(chroma_timings, 0.95):>8.2f}ms")
+    print(f"  {'NumPy exact':<22}{percentile_ms(numpy_timings, 0.5):>8.2f}ms"
+          f"{percentile_ms(numpy_timings, 0.95):>8.2f}ms")
+    print(f"  NumPy batch of {len(queries)}: {batch_ms:.2f} ms ({batch_ms / len(queries):.3f} ms/query)")
+    print(f"  Top-{k} overlap with Chroma: {overlap:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--synthetic", type=int, nargs="*", help="Benchmark random collections of these sizes")
+    args = parser.parse_args()
+
+    print("=== Vector search benchmark ===")
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        for size in args.synthetic:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                vectorstore = Chroma(persist_directory=tmp_dir, collection_name=f"synthetic_{size}")
+                vectors = rng.normal(size=(size, 1536)).astype(np.float32)
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                ids = [str(i) for i in range(size)]
+                for start in range(0, size, 5000):
+                    vectorstore._collection.add(ids=ids[start:start + 5000], embeddings=vectors[start:start + 5000],
+                                                documents=[f"chunk {i}" for i in range(start, min(size, start + 5000))])
+                benchmark_collection(f"Synthetic ({size})", vectorstore, args.queries, args.k)
+        return
+
+    for collection_key in AVAILABLE_COLLECTIONS:
+        config = get_vectorstore_config(collection_key)
+        vectorstore = Chroma(persist_directory=config["persist_directory"], collection_name=config["collection_name"])
+        benchmark_collection(f"{collection_key} ({config['collection_name']})", vectorstore, args.queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import OpenAIEmbeddings
 from config.settings import get_openai_api_key
+from core.retrievers import ChromaSearchEngine
 
 
 def compare_collections(collection_names, test_queries):
@@ -19,9 +20,10 @@ def compare_collections(collection_names, test_queries):
             )
             
             collection_results = []
-            for query in test_queries:
-                # Rechercher dans la collection
-                docs = vectorstore.similarity_search(query, k=3)
+            # Rechercher toutes les requêtes en un seul appel d'embeddings et une seule recherche
+            batch_results = ChromaSearchEngine(vectorstore).search_batch(test_queries, 3)
+            for query, results in zip(test_queries, batch_results):
+                docs = [doc for doc, _ in results]
                 
                 # Extraire les métadonnées et scores si disponibles
                 doc_info = []
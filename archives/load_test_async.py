@@ -0,0 +1,129 @@
+"""
+Load test of the async RAG pipeline: questions answered per second vs concurrent conversations
+
+For each concurrency level, the same number of conversations ask one question:
+with invoke on a fixed thread pool (the Streamlit model, one blocked thread per
+question) and with ainvoke on a single event loop. The LLM and retriever are
+local stand-ins sleeping --latency-ms per call (asyncio.sleep on the async
+path), so the test measures the pipeline's concurrency, not the OpenAI API.
+
+Usage:
+    python archives/load_test_async.py [--concurrency 1 8 32 128] [--threads 8] [--latency-ms 300]
+"""
+import argparse
+import asyncio
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.retrievers import BaseRetriever
+
+from core.langgraph_qa_chain import ConversationRAGChain, LangGraphRAGChain
+
+ANSWER = "Le colérique est émotif, actif et primaire : impulsif, généreux, toujours en mouvement."
+QUESTIONS = ["Décris le type passionné", "Quels sont ses défauts ?", "Et le sentimental ?"]
+
+
+class LatencyChatModel(BaseChatModel):
+    """Fixed answer after latency seconds (time.sleep when sync, asyncio.sleep when async)"""
+
+    latency: float = 0.3
+
+    @property
+    def _llm_type(self) -> str:
+        return "latency"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=ANSWER))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=ANSWER))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for token in re.findall(r"\S+\s*", ANSWER):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class LatencyRetriever(BaseRetriever):
+    """Fixed chunks after latency seconds (embeddings request + search)"""
+
+    latency: float = 0.1
+
+    def _get_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        time.sleep(self.latency)
+        return [Document(id=f"chunk-{i}", page_content=f"Passage {i} du traité.") for i in range(5)]
+
+    async def _aget_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        await asyncio.sleep(self.latency)
+        return [Document(id=f"chunk-{i}", page_content=f"Passage {i} du traité.") for i in range(5)]
+
+
+class ConversationMemory:
+    """In-memory conversation with one previous turn"""
+
+    def __init__(self):
+        self.messages = [HumanMessage(content="Parle-moi du colérique."), AIMessage(content=ANSWER)]
+
+    def get_chat_history(self):
+        return list(self.messages)
+
+    def save_context(self, inputs, outputs):
+        self.messages += [HumanMessage(content=inputs["question"]), AIMessage(content=outputs["answer"])]
+
+
+def run_threaded(chain: LangGraphRAGChain, conversations: int, threads: int) -> float:
+    bound = [ConversationRAGChain(chain, ConversationMemory()) for _ in range(conversations)]
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda item: item[1].invoke({"question": QUESTIONS[item[0] % len(QUESTIONS)]}),
+                          enumerate(bound)))
+    return time.perf_counter() - started_at
+
+
+async def run_async(chain: LangGraphRAGChain, conversations: int) -> float:
+    bound = [ConversationRAGChain(chain, ConversationMemory()) for _ in range(conversations)]
+    started_at = time.perf_counter()
+    await asyncio.gather(*(conversation.ainvoke({"question": QUESTIONS[i % len(QUESTIONS)]})
+                           for i, conversation in enumerate(bound)))
+    return time.perf_counter() - started_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--threads", type=int, default=8, help="Thread pool size of the sync baseline")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Simulated latency of each LLM call")
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000
+    chain = LangGraphRAGChain(llm=LatencyChatModel(latency=latency), retriever=LatencyRetriever(latency=latency / 3))
+
+    results = []
+    for conversations in args.concurrency:
+        threaded = run_threaded(chain, conversations, args.threads)
+        asynchronous = asyncio.run(run_async(chain, conversations))
+        results.append((conversations, threaded, asynchronous))
+
+    print(f"\n🚀 Charge: LLM {args.latency_ms:.0f} ms, recherche {args.latency_ms / 3:.0f} ms, "
+          f"{args.threads} threads pour invoke")
+    print(f"{'Conversations':>14} | {'invoke (s)':>10} | {'q/s':>7} | {'ainvoke (s)':>11} | {'q/s':>7} | {'gain':>6}")
+    print("-" * 72)
+    for conversations, threaded, asynchronous in results:
+        print(f"{conversations:>14} | {threaded:>10.2f} | {conversations / threaded:>7.1f} | "
+              f"{asynchronous:>11.2f} | {conversations / asynchronous:>7.1f} | {threaded / asynchronous:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
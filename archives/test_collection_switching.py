@@ -1,6 +1,10 @@
 """
 Test script to verify collection switching functionality
 """
+import tempfile
+from unittest import mock
+
+import core.llm_setup
 from config.settings import AVAILABLE_COLLECTIONS, get_vectorstore_config
 from core.llm_setup import setup_vectorstore, setup_retriever
 
@@ -8,6 +12,13 @@ def test_collections():
     """Test that both collections can be loaded and queried"""
     print("=== Testing Collection Switching ===\n")
     
+    # Open the collections in a temporary directory, never in ./index_stores
+    with tempfile.TemporaryDirectory() as persist_directory, \
+         mock.patch.object(core.llm_setup, "get_vectorstore_config",
+                           lambda key=None: {**get_vectorstore_config(key), "persist_directory": persist_directory}):
+        _test_collections()
+
+def _test_collections():
     for collection_key, collection_info in AVAILABLE_COLLECTIONS.items():
         print(f"Testing collection: {collection_key}")
         print(f"Description: {collection_info['description']}")
@@ -0,0 +1,64 @@
+"""
+Precompute the answers of the welcome-screen prompts (TEMPLATED_PROMPTS) for every collection
+
+For each collection and templated prompt, the RAG chain is run once on an empty
+conversation; the retrieved chunk IDs and the generated answer are stored next
+to the index (index_stores/precomputed/<collection>.json) with the index version
+and prompt key they were generated with. Up-to-date entries are skipped unless
+--force is given. The app also regenerates a stale entry the first time its
+button is clicked after re-indexing or a prompt change.
+
+Usage:
+    python build_precomputed_answers.py [--collection "Sub-chapters (Semantic)"] [--force]
+"""
+import argparse
+
+from config.settings import AVAILABLE_COLLECTIONS, get_vectorstore_config
+from config.welcome_config import TEMPLATED_PROMPTS
+from core.langgraph_qa_chain import LangGraphRAGChain
+from core.precomputed_answers import PrecomputedAnswers, precomputed_answers_path
+
+
+class EmptyConversation:
+    """Memory manager of a throwaway conversation with no history"""
+
+    def get_chat_history(self):
+        return []
+
+    def save_context(self, inputs, outputs):
+        pass
+
+
+def build_collection(collection_key: str, force: bool = False):
+    config = get_vectorstore_config(collection_key)
+    store = PrecomputedAnswers(precomputed_answers_path(config["persist_directory"], config["collection_name"]))
+    chain = LangGraphRAGChain(EmptyConversation(), collection_key)
+    _, index_version, prompt_key = chain.answer_scope()
+
+    print(f"\n📚 Collection: {collection_key} (index {index_version})")
+    for prompt_config in TEMPLATED_PROMPTS:
+        question = prompt_config["prompt"]
+        if not force and store.get(question, index_version, prompt_key) is not None:
+            print(f"  ✓ {prompt_config['id']}: à jour")
+            continue
+
+        result = chain.invoke({"question": question})
+        chunk_ids = result["trace"].get("retrieve_context", {}).get("chunk_ids", [])
+        store.put(question, chunk_ids, result["answer"], index_version, prompt_key)
+        print(f"  ✅ {prompt_config['id']}: {len(result['answer'])} caractères, {len(chunk_ids)} chunks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--collection", choices=list(AVAILABLE_COLLECTIONS), help="Only this collection")
+    parser.add_argument("--force", action="store_true", help="Regenerate up-to-date entries too")
+    args = parser.parse_args()
+
+    print("🚀 Précalcul des réponses de l'écran d'accueil...")
+    for collection_key in [args.collection] if args.collection else AVAILABLE_COLLECTIONS:
+        build_collection(collection_key, args.force)
+    print("\n🎉 Réponses précalculées à jour")
+
+
+if __name__ == "__main__":
+    main()
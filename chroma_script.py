@@ -1,8 +1,10 @@
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import OpenAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from core.embedding_cache import with_embedding_cache
+from core.indexing import sync_collection
 import os
-from datetime import datetime
 
 # Clé API OpenAI (à adapter selon ton usage)
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
@@ -13,37 +15,30 @@ if not OPENAI_API_KEY:
     except Exception:
         raise RuntimeError("OPENAI_API_KEY non trouvé dans les variables d'environnement ni dans streamlit.secrets")
 
+SOURCE_PATH = "documents/traite_de_caracterologie.txt"
+PERSIST_DIRECTORY = "./index_stores"
+COLLECTION_NAME = "traite"
+
 # Charger le texte
-with open("documents/traite_de_caracterologie.txt", "r", encoding="utf-8") as f:
+with open(SOURCE_PATH, "r", encoding="utf-8") as f:
     full_text = f.read()
 
 # Découper le texte en chunks (par défaut 500 caractères, overlap 50)
 text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
 chunks = text_splitter.split_text(full_text)
+documents = [Document(page_content=chunk, metadata={"source": SOURCE_PATH}) for chunk in chunks]
 
-# Créer les embeddings OpenAI
-embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-
-# Créer un nom de collection unique avec timestamp
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-collection_name = f"traite_{timestamp}"
+# Créer les embeddings OpenAI (servis depuis le cache local quand déjà calculés)
+embeddings = with_embedding_cache(OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY))
 
-# Créer la base Chroma avec les bons embeddings
-vectorstore = Chroma.from_texts(
-    chunks,
-    embedding=embeddings,
-    persist_directory="./index_stores",
-    collection_name=collection_name
+# Ouvrir la collection existante (ou la créer) et ne ré-indexer que les chunks nouveaux ou modifiés
+vectorstore = Chroma(
+    embedding_function=embeddings,
+    persist_directory=PERSIST_DIRECTORY,
+    collection_name=COLLECTION_NAME
 )
+stats = sync_collection(vectorstore, documents, PERSIST_DIRECTORY, COLLECTION_NAME)
 vectorstore.persist()
 
-print(f"Indexation terminée. {len(chunks)} chunks indexés dans ./index_stores (collection '{collection_name}').")
-print(f"Pour utiliser cette collection, modifiez config/settings.py avec: 'collection_name': '{collection_name}'")
-
-
-
-
-
-
-
-
+print(f"Indexation terminée. {len(chunks)} chunks dans ./index_stores (collection '{COLLECTION_NAME}').")
+print(f"{stats['added']} ajoutés, {stats['deleted']} supprimés, {stats['unchanged']} inchangés, {stats['failed']} en échec.")
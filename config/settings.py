@@ -21,38 +21,93 @@ LLM_CONFIG = {
     "streaming": True
 }
 
+# Per-node LLM profiles of the RAG workflow (see get_llm_profile); other nodes use LLM_CONFIG
+LLM_PROFILES = {
+    "contextualize_question": {
+        "model_name": "gpt-4.1-nano",  # Small, fast model: a rewrite is a few dozen tokens
+        "temperature": 0,  # Deterministic rewrites (also cacheable in the LLM response cache)
+        "max_tokens": 80,  # Hard cap: a standalone question, never an answer
+        "streaming": False,
+        "timeout": 10  # Seconds before the request is abandoned
+    },
+    "generate_answer": {
+        **LLM_CONFIG,
+        "timeout": 60,
+        "stream_usage": True  # Token usage reported at the end of the stream (cost per node)
+    }
+}
+
+# Price in USD per million tokens, for the per-node cost report
+LLM_PRICING = {
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+    "gpt-4.1-nano": {"input": 0.10, "output": 0.40}
+}
+
+def get_llm_profile(node: str) -> dict:
+    """LLM configuration of a workflow node (LLM_CONFIG when the node has no profile)"""
+    return dict(LLM_PROFILES.get(node, LLM_CONFIG))
+
+# Retrieval Configuration (defaults, overridden per collection with a "retrieval" entry)
+RETRIEVAL_CONFIG = {
+    "mode": "dense",  # "dense" (vectors only) or "hybrid" (BM25 + vectors fused with reciprocal rank fusion)
+    "engine": "chroma",  # Vector search: "chroma" (HNSW), "numpy" (exact, in memory) or "quantized" (see below)
+    "quantization": "int8",  # "quantized" engine: "int8" or "float16" codes in RAM for the first pass
+    "rescore_factor": 4,  # "quantized" engine: k * rescore_factor candidates re-scored in float32 from disk
+    "k": 10,  # Chunks sent to the LLM
+    "dense_k": 20,  # Candidates from the vector search (hybrid mode)
+    "lexical_k": 20,  # Candidates from the BM25 index (hybrid mode)
+    "dense_weight": 1.0,  # Weight of the vector ranking in the fusion
+    "lexical_weight": 1.0,  # Weight of the BM25 ranking in the fusion
+    "rrf_k": 60,  # Reciprocal rank fusion constant
+    "mmr": False,  # Re-rank candidates by maximal marginal relevance to drop near-duplicate chunks
+    "fetch_k": 20,  # MMR: candidates considered before selecting k
+    "mmr_lambda": 0.5,  # MMR: 1 = pure relevance, 0 = pure diversity
+    "adaptive_k": False,  # Choose k per question from the score distribution instead of a fixed k
+    "min_k": 3,  # Adaptive k: chunks always kept
+    "max_k": 12,  # Adaptive k: candidates considered (upper bound of k)
+    "score_threshold": 0.5,  # Adaptive k: cut below this fraction of the best score
+    "score_gap": 0.3  # Adaptive k: cut after a drop larger than this fraction of the top max_k score spread
+}
+
 # Available vectorstore collections
 AVAILABLE_COLLECTIONS = {
     "Sub-chapters (Semantic)": {
         "collection_name": "traite_subchapters",
         "description": "Chunks based on document sub-chapters (~336 semantic chunks)",
-        "chunk_type": "semantic"
+        "chunk_type": "semantic",
+        "retrieval": {"mode": "hybrid", "engine": "numpy", "k": 6, "adaptive_k": True, "min_k": 2, "max_k": 8}
     },
     "Original (Character-based)": {
         "collection_name": "traite",
         "description": "Original character-based chunks (~2800 small chunks)",
-        "chunk_type": "character"
+        "chunk_type": "character",
+        "retrieval": {"mode": "hybrid", "engine": "quantized", "k": 6, "dense_k": 30, "lexical_k": 30,
+                      "mmr": True, "fetch_k": 24, "mmr_lambda": 0.6, "adaptive_k": True, "min_k": 4, "max_k": 10}
     }
 }
 
 # Default collection
 DEFAULT_COLLECTION_KEY = "Sub-chapters (Semantic)"
 
+def resolve_collection_key(collection_key: str = None) -> str:
+    """Return a valid collection key, falling back to the default collection"""
+    if collection_key is None or collection_key not in AVAILABLE_COLLECTIONS:
+        return DEFAULT_COLLECTION_KEY
+    return collection_key
+
 # Vectorstore Configuration (dynamic)
 def get_vectorstore_config(collection_key: str = None):
     """Get vectorstore config for specified collection"""
-    if collection_key is None:
-        collection_key = DEFAULT_COLLECTION_KEY
-    
-    if collection_key not in AVAILABLE_COLLECTIONS:
-        collection_key = DEFAULT_COLLECTION_KEY
+    collection_key = resolve_collection_key(collection_key)
     
     collection_info = AVAILABLE_COLLECTIONS[collection_key]
+    retrieval = {**RETRIEVAL_CONFIG, **collection_info.get("retrieval", {})}
     
     return {
         "persist_directory": "./index_stores",
         "collection_name": collection_info["collection_name"],
-        "search_kwargs": {"k": 10},
+        "search_kwargs": {"k": retrieval["k"]},
+        "retrieval": retrieval,
         "description": collection_info["description"],
         "chunk_type": collection_info["chunk_type"]
     }
@@ -60,10 +115,88 @@ def get_vectorstore_config(collection_key: str = None):
 # Legacy config for backward compatibility
 VECTORSTORE_CONFIG = get_vectorstore_config()
 
+# Embedding cache Configuration
+EMBEDDING_CACHE_CONFIG = {
+    "enabled": True,  # Serve repeated chunk/query embeddings from a local SQLite cache
+    "db_path": "./cache/embeddings.db",  # Shared by the app and the ingestion scripts
+    "max_entries": 100000  # Least recently used vectors are evicted beyond this size
+}
+
+# Embedding pipeline Configuration (ingestion scripts)
+EMBEDDING_PIPELINE_CONFIG = {
+    "tokenizer_model": "text-embedding-ada-002",  # Tokenizer used to size batches
+    "max_tokens_per_batch": 50000,  # Token budget per embeddings request
+    "max_texts_per_batch": 512,  # Maximum inputs per embeddings request
+    "max_workers": 4,  # Concurrent embeddings requests
+    "max_retries": 6,  # Retries on rate-limit errors
+    "initial_backoff": 1.0,  # Seconds before the first retry (doubled each time)
+    "max_backoff": 60.0,  # Upper bound for the backoff delay
+    "write_batch_size": 5000  # Rows per Chroma upsert once all vectors are computed
+}
+
+# Corpus store Configuration (memory-mapped source texts for ingestion)
+CORPUS_CONFIG = {
+    "directory": "./cache/corpus",  # Where extracted source texts are written and memory-mapped
+    "checkpoint_chars": 4096  # Character -> byte offset checkpoint interval for span reads
+}
+
+# Semantic answer cache Configuration
+ANSWER_CACHE_CONFIG = {
+    "enabled": True,  # Answer standalone questions close to an already answered one from the cache
+    "db_path": "./cache/answers.db",  # SQLite store of question vectors and answers
+    "similarity_threshold": 0.95,  # Minimum cosine similarity between the new and the cached question
+    "max_entries": 2000,  # Least recently used answers are evicted beyond this size
+    "ttl_seconds": 7 * 24 * 3600  # Cached answers expire after this delay
+}
+
+# LLM response cache Configuration (exact repeats of a rendered prompt)
+LLM_CACHE_CONFIG = {
+    "enabled": True,  # Serve identical contextualization and answer prompts from the cache
+    "db_path": "./cache/llm_responses.db",  # SQLite store of responses keyed by model settings + prompt
+    "max_entries": 5000,  # Least recently used responses are evicted beyond this count...
+    "max_size_mb": 50,  # ...or beyond this total response size
+    "ttl_seconds": 7 * 24 * 3600  # Cached responses expire after this delay
+}
+
+# Request coalescing Configuration (identical questions asked at the same moment)
+SINGLE_FLIGHT_CONFIG = {
+    "enabled": True,  # Concurrent identical requests share one retrieval + generation
+    "wait_timeout_seconds": 120  # A waiter gives up if the shared computation streams nothing for this long
+}
+
+# Precomputed answers Configuration (welcome-screen prompts, see build_precomputed_answers.py)
+PRECOMPUTED_ANSWERS_CONFIG = {
+    "enabled": True,  # Serve the stored answers of TEMPLATED_PROMPTS when they match the index and prompt
+    "replay_words_per_second": 0  # 0: render the stored answer at once, otherwise re-stream it at this speed
+}
+
+# Question contextualization Configuration (rewrite of follow-up questions into standalone ones)
+CONTEXTUALIZATION_CONFIG = {
+    "selective": True,  # Only call the LLM for questions the local classifier finds history-dependent
+    "max_followup_tokens": 6  # Shorter questions naming no caracterology entity are treated as follow-ups
+}
+
+# RAG workflow Configuration (LangGraph graph of LangGraphRAGChain)
+WORKFLOW_CONFIG = {
+    "parallel_branches": True,  # Run retrieve_context and contextualize_question concurrently
+    "refine_retrieval": True,  # Retrieve again on the rewritten question when it differs materially
+    "refine_min_new_term_ratio": 0.25  # Share of new content terms in the rewrite that triggers the second pass
+}
+
+# Context packing Configuration (token budget of the answer prompt)
+CONTEXT_PACKING_CONFIG = {
+    "enabled": True,  # Fit history and chunks to the budget (False: send everything, only count tokens)
+    "model_name": LLM_CONFIG["model_name"],  # Tokenizer used to count prompt tokens
+    "max_prompt_tokens": 6000,  # Template + history + chunks + question
+    "max_history_tokens": 1500,  # Most recent messages kept within this share of the budget
+    "min_truncated_tokens": 80,  # Below this remaining budget, a chunk that does not fit is dropped, not cut
+    "min_dedupe_chars": 30  # Shorter sentences are never treated as duplicates of a better chunk
+}
+
 # Streaming Configuration
 STREAMING_CONFIG = {
-    "update_every": 3,
-    "delay": 0.15
+    "max_fps": 15,  # Maximum placeholder refreshes per second while tokens stream in
+    "cursor": "▌"  # Cursor appended to the partial answer during streaming
 }
 
 # Memory Configuration
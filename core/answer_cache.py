@@ -0,0 +1,187 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from config.settings import ANSWER_CACHE_CONFIG
+
+
+class CachedAnswer(NamedTuple):
+    """Answer served from the semantic cache"""
+    answer: str
+    question: str
+    similarity: float
+
+
+class SemanticAnswerCache:
+    """
+    Persistent SQLite store of answers keyed by question embedding
+
+    Entries are scoped by collection, index version and prompt key: an answer is
+    only reused for the same collection contents and prompt. A lookup returns the
+    cached answer whose question is the most similar to the new one (cosine),
+    provided the similarity reaches similarity_threshold. Entries expire after
+    ttl_seconds, and least recently used entries are evicted beyond max_entries.
+    """
+
+    def __init__(self, db_path: str = None, max_entries: int = None, similarity_threshold: float = None,
+                 ttl_seconds: float = None):
+        self.db_path = db_path or ANSWER_CACHE_CONFIG["db_path"]
+        self.max_entries = max_entries or ANSWER_CACHE_CONFIG["max_entries"]
+        self.similarity_threshold = similarity_threshold or ANSWER_CACHE_CONFIG["similarity_threshold"]
+        self.ttl_seconds = ttl_seconds or ANSWER_CACHE_CONFIG["ttl_seconds"]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # (collection, index version, prompt key) -> (generation, entry IDs, unit question vectors)
+        self._matrices: Dict[Tuple[str, str, str], Tuple[tuple, List[int], np.ndarray]] = {}
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_database(self):
+        """Initialize SQLite table for cached answers"""
+        os.makedirs(os.path.dirname(self.db_path) if os.path.dirname(self.db_path) else ".", exist_ok=True)
+
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                collection TEXT,
+                index_version TEXT,
+                prompt_key TEXT,
+                question TEXT,
+                vector BLOB,
+                answer TEXT,
+                created_at REAL,
+                last_used REAL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_answers_scope ON answers (collection, index_version, prompt_key)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers (last_used)")
+        conn.commit()
+        conn.close()
+
+    def _scope_matrix(self, cursor, scope: Tuple[str, str, str]) -> Tuple[List[int], np.ndarray]:
+        """Question vectors of a scope, reloaded only when its rows changed"""
+        cursor.execute("SELECT COUNT(*), MAX(id) FROM answers WHERE collection = ? AND index_version = ? "
+                       "AND prompt_key = ?", scope)
+        generation = cursor.fetchone()
+        cached = self._matrices.get(scope)
+        if cached is not None and cached[0] == generation:
+            return cached[1], cached[2]
+
+        cursor.execute("SELECT id, vector FROM answers WHERE collection = ? AND index_version = ? "
+                       "AND prompt_key = ? ORDER BY id", scope)
+        rows = cursor.fetchall()
+        ids = [entry_id for entry_id, _ in rows]
+        matrix = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]) if rows \
+            else np.zeros((0, 0), dtype=np.float32)
+        self._matrices[scope] = (generation, ids, matrix)
+        return ids, matrix
+
+    def lookup(self, collection: str, index_version: str, prompt_key: str,
+               question_vector) -> Optional[CachedAnswer]:
+        """Most similar cached answer of the scope above similarity_threshold, if any"""
+        query = np.asarray(question_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scope = (collection, index_version, prompt_key)
+
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            self._expire(cursor)
+            ids, matrix = self._scope_matrix(cursor, scope)
+
+            found = None
+            if len(ids) and matrix.shape[1] == len(query):
+                similarities = matrix @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    cursor.execute("SELECT question, answer FROM answers WHERE id = ?", (ids[best],))
+                    row = cursor.fetchone()
+                    if row is not None:
+                        found = CachedAnswer(row[1], row[0], float(similarities[best]))
+                        cursor.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), ids[best]))
+
+            conn.commit()
+            conn.close()
+
+            if found is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return found
+
+    def put(self, collection: str, index_version: str, prompt_key: str, question: str, question_vector,
+            answer: str):
+        """
+        Store an answer, drop the collection's entries from older index versions
+        and evict least recently used entries beyond max_entries
+        """
+        vector = np.asarray(question_vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        now = time.time()
+
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM answers WHERE collection = ? AND index_version != ?",
+                           (collection, index_version))
+            cursor.execute("""
+                INSERT INTO answers (collection, index_version, prompt_key, question, vector, answer,
+                                     created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (collection, index_version, prompt_key, question, vector.tobytes(), answer, now, now))
+
+            cursor.execute("SELECT COUNT(*) FROM answers")
+            overflow = cursor.fetchone()[0] - self.max_entries
+            if overflow > 0:
+                cursor.execute("""
+                    DELETE FROM answers WHERE id IN (
+                        SELECT id FROM answers ORDER BY last_used ASC LIMIT ?
+                    )
+                """, (overflow,))
+                self.evictions += overflow
+
+            conn.commit()
+            conn.close()
+
+    def _expire(self, cursor):
+        """Delete entries older than ttl_seconds"""
+        cursor.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+    def invalidate(self, collection: str = None):
+        """Drop the cached answers of a collection (all collections when None)"""
+        with self._lock:
+            conn = self._connect()
+            if collection is None:
+                conn.execute("DELETE FROM answers")
+            else:
+                conn.execute("DELETE FROM answers WHERE collection = ?", (collection,))
+            conn.commit()
+            conn.close()
+            self._matrices.clear()
+
+    def __len__(self) -> int:
+        conn = self._connect()
+        count = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        conn.close()
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters since this cache object was created"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
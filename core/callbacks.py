@@ -2,24 +2,89 @@ import time
 from langchain.callbacks.base import BaseCallbackHandler
 
 class StreamlitCallbackHandler(BaseCallbackHandler):
-    """Handler pour afficher le texte en streaming dans Streamlit"""
+    """
+    Handler pour afficher le texte en streaming dans Streamlit
+
+    Les tokens sont accumulés dans un buffer et le placeholder n'est rafraîchi
+    qu'au plus max_fps fois par seconde (horloge murale), sans jamais bloquer
+    le thread de génération.
+    """
     
-    def __init__(self, placeholder, update_every=3, delay=0.15):
+    def __init__(self, placeholder, max_fps=15, cursor="▌"):
         self.placeholder = placeholder
-        self.text = ""
+        self.min_interval = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+        self.cursor = cursor
+        self._parts = []
+        self._text = ""
+        self._dirty = False
+        self._last_flush = 0.0
         self.counter = 0
-        self.update_every = update_every
-        self.delay = delay
+        self.frames = 0
+    
+    @property
+    def text(self):
+        """Texte complet reçu jusqu'ici"""
+        if self._dirty:
+            self._text += "".join(self._parts)
+            self._parts = []
+            self._dirty = False
+        return self._text
+    
+    def _flush(self, final=False):
+        self.placeholder.markdown(self.text if final else self.text + self.cursor)
+        self._last_flush = time.monotonic()
+        self.frames += 1
     
     def on_llm_new_token(self, token, **kwargs):
-        self.text += token
+        self._parts.append(token)
+        self._dirty = True
         self.counter += 1
-        if self.counter % self.update_every == 1:
-            self.placeholder.markdown(self.text + "▌")
-            time.sleep(self.delay)
+        if time.monotonic() - self._last_flush >= self.min_interval:
+            self._flush()
     
     def on_llm_end(self, *args, **kwargs):
-        self.placeholder.markdown(self.text)
+        self._flush(final=True)
+
+
+class AsyncQueueStreamHandler:
+    """
+    Handler de streaming qui pousse les tokens dans une asyncio.Queue
+
+    Utilisé par LangGraphRAGChain.astream ; les tokens peuvent être émis depuis
+    la boucle d'événements ou depuis un thread de travail (relecture d'une
+    réponse stockée), d'où le passage par call_soon_threadsafe.
+    """
+
+    def __init__(self, queue, loop):
+        self.queue = queue
+        self.loop = loop
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, token)
+
+    def on_llm_end(self, *args, **kwargs):
+        pass
+
+
+def split_stream_handler(callbacks):
+    """
+    Sépare le handler de streaming Streamlit des autres callbacks
+
+    Les tokens sont poussés explicitement vers le handler Streamlit par les chaînes
+    RAG ; il ne doit donc pas être transmis aux appels LLM intermédiaires
+    (reformulation de la question), sous peine d'afficher leurs tokens.
+
+    Returns:
+        Tuple (stream_handler ou None, liste des autres callbacks)
+    """
+    stream_handler = None
+    other_callbacks = []
+    for cb in callbacks or []:
+        if 'StreamlitCallbackHandler' in cb.__class__.__name__:
+            stream_handler = cb
+        elif 'Streamlit' not in cb.__class__.__name__:
+            other_callbacks.append(cb)
+    return stream_handler, other_callbacks
 
 class RetrievalCallbackHandler(BaseCallbackHandler):
     """Handler pour afficher les chunks récupérés dans la console"""
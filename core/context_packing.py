@@ -0,0 +1,156 @@
+from typing import Dict, Any, List, NamedTuple, Optional, Callable, Tuple
+import re
+
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from config.settings import CONTEXT_PACKING_CONFIG
+from core.tokens import get_token_counter
+
+# A sentence runs up to terminal punctuation followed by whitespace (or to the end of the text)
+SENTENCE_PATTERN = re.compile(r"(\s*)(\S.*?(?:[.!?…]+[»\"')\]]*(?=\s)|$))", re.DOTALL)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class PackedPrompt(NamedTuple):
+    """Prompt sections fitted to the token budget, with per-section token counts"""
+    history: str
+    context: str
+    stats: Dict[str, Any]
+
+
+def split_sentences(text: str) -> List[Tuple[str, str]]:
+    """Split text into (leading whitespace, sentence) pairs that join back into the (right-stripped) text"""
+    return [(match.group(1), match.group(2)) for match in SENTENCE_PATTERN.finditer(text)]
+
+
+def normalize_sentence(sentence: str) -> str:
+    return WHITESPACE_PATTERN.sub(" ", sentence).strip().lower()
+
+
+def document_score(document: Document) -> Optional[float]:
+    """Retrieval score of a chunk (fused RRF score, or cosine similarity with adaptive k), if any"""
+    score = document.metadata.get("rrf_score", document.metadata.get("relevance_score"))
+    return float(score) if score is not None else None
+
+
+def rank_documents(documents: List[Document]) -> List[Document]:
+    """Best chunks first: by score when every chunk has one, otherwise in retriever order"""
+    if documents and all(document_score(doc) is not None for doc in documents):
+        return sorted(documents, key=document_score, reverse=True)
+    return list(documents)
+
+
+def format_history(chat_history: List[BaseMessage], count_tokens: Callable[[str], int],
+                   max_tokens: int) -> Tuple[str, int, int]:
+    """
+    Format the most recent messages that fit in max_tokens
+
+    Returns:
+        (history text, its token count, number of messages kept)
+    """
+    lines, tokens = [], 0
+    for message in reversed(chat_history):
+        role = "Utilisateur" if isinstance(message, HumanMessage) else "Assistant"
+        line = f"{role}: {message.content}\n"
+        line_tokens = count_tokens(line)
+        if tokens + line_tokens > max_tokens:
+            break
+        lines.append(line)
+        tokens += line_tokens
+
+    if not lines:
+        return "(Aucun historique)", count_tokens("(Aucun historique)"), 0
+    return "".join(reversed(lines)), tokens, len(lines)
+
+
+def pack_documents(documents: List[Document], count_tokens: Callable[[str], int], budget: int,
+                   min_truncated_tokens: int = 80, min_dedupe_chars: int = 30) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Fill a token budget with chunk texts, best chunks first
+
+    Sentences already present in a better chunk (overlapping splits, near-duplicate
+    sections) are removed. A chunk that no longer fits is cut at a sentence boundary
+    when at least min_truncated_tokens remain, otherwise it is dropped.
+
+    Returns:
+        (packed chunk texts, counters: packed, deduplicated, truncated, dropped, tokens)
+    """
+    texts = []
+    seen_text = ""  # Normalized packed text, for substring checks of the shorter overlaps
+    stats = {"packed": 0, "deduplicated": 0, "truncated": 0, "dropped": 0, "tokens": 0}
+
+    for document in rank_documents(documents):
+        remaining = budget - stats["tokens"]
+        kept, kept_tokens, truncated = [], 0, False
+        for separator, sentence in split_sentences(document.page_content):
+            normalized = normalize_sentence(sentence)
+            if len(normalized) >= min_dedupe_chars and normalized in seen_text:
+                continue
+            sentence_tokens = count_tokens(separator + sentence)
+            if kept_tokens + sentence_tokens > remaining:
+                truncated = True
+                break
+            kept.append(separator + sentence)
+            kept_tokens += sentence_tokens
+
+        text = "".join(kept).strip()
+        if not text:
+            stats["dropped" if truncated else "deduplicated"] += 1
+            continue
+        if truncated and remaining < min_truncated_tokens:
+            stats["dropped"] += 1
+            continue
+
+        texts.append(text)
+        seen_text += " " + normalize_sentence(text)
+        stats["packed"] += 1
+        stats["truncated"] += int(truncated)
+        stats["tokens"] += kept_tokens
+
+    return texts, stats
+
+
+def pack_prompt(template: str, documents: List[Document], chat_history: List[BaseMessage], question: str,
+                config: Dict[str, Any] = None) -> PackedPrompt:
+    """
+    Fit chat history and retrieved chunks into the prompt token budget
+
+    The history keeps its most recent messages within max_history_tokens; the
+    chunks get what is left of max_prompt_tokens once the template, history and
+    question are counted (see pack_documents).
+    """
+    config = config or CONTEXT_PACKING_CONFIG
+    count_tokens = get_token_counter(config["model_name"])
+
+    template_tokens = count_tokens(template.format(chat_history="", context="", input=""))
+    question_tokens = count_tokens(question)
+
+    if not config["enabled"]:
+        history, history_tokens, history_kept = format_history(chat_history, count_tokens, float("inf"))
+        texts = [doc.page_content for doc in documents]
+        packing = {"packed": len(texts), "deduplicated": 0, "truncated": 0, "dropped": 0,
+                   "tokens": sum(count_tokens(text) for text in texts)}
+    else:
+        history, history_tokens, history_kept = format_history(chat_history, count_tokens,
+                                                               config["max_history_tokens"])
+        budget = max(config["max_prompt_tokens"] - template_tokens - history_tokens - question_tokens, 0)
+        texts, packing = pack_documents(documents, count_tokens, budget, config["min_truncated_tokens"],
+                                        config["min_dedupe_chars"])
+
+    context = "".join(text + "\n\n" for text in texts)
+    stats = {
+        "template_tokens": template_tokens,
+        "history_tokens": history_tokens,
+        "history_messages": history_kept,
+        "history_dropped": len(chat_history) - history_kept,
+        "context_tokens": packing["tokens"],
+        "question_tokens": question_tokens,
+        "prompt_tokens": template_tokens + history_tokens + packing["tokens"] + question_tokens,
+        "chunks_retrieved": len(documents),
+        "chunks_packed": packing["packed"],
+        "chunks_deduplicated": packing["deduplicated"],
+        "chunks_truncated": packing["truncated"],
+        "chunks_dropped": packing["dropped"]
+    }
+    return PackedPrompt(history, context, stats)
@@ -0,0 +1,149 @@
+from typing import Dict, List, NamedTuple, Set
+import re
+import threading
+
+from langchain_core.messages import BaseMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableBranch
+
+from core.lexical import analyze, fold_accents
+
+# Personal and demonstrative pronouns that point back to something said earlier
+ANAPHORIC_PRONOUNS = frozenset("""
+il ils elle elles lui eux ca cela celui celle ceux celles celui-ci celle-ci ceux-ci celles-ci celui-la
+celle-la ceux-la celles-la lequel laquelle lesquels lesquelles
+""".split())
+
+# Possessive determiners of the third person ("ses défauts" = the defects of the type just discussed)
+ANAPHORIC_POSSESSIVES = frozenset("son sa ses leur leurs".split())
+
+# Words that open an elliptical follow-up ("Et le colérique ?", "Mais chez l'amorphe ?")
+CONTINUATION_MARKERS = frozenset("et mais alors aussi donc puis ensuite sinon plutot oui non pareil idem".split())
+
+# Impersonal "il" (not a reference to a previous entity)
+IMPERSONAL_IL_PATTERN = re.compile(r"\bil (?:y a|faut|existe|s'agit|est (?:possible|vrai|necessaire)|semble)|"
+                                   r"\by a-t-il\b|\bfaut-il\b|\bexiste-t-il\b")
+# "ce/cet/cette/ces + noun" refers back; "ce que", "ce qui", "c'est" do not
+DEMONSTRATIVE_PATTERN = re.compile(r"\b(?:cet|cette|ces|ce(?! (?:que|qui|qu|dont)\b))\s+[a-z]")
+# Subject inversion points forward to a subject named before it ("Le nerveux est-il émotif ?"),
+# otherwise back to the conversation ("Comment se manifeste-t-elle chez le nerveux ?")
+INVERTED_PRONOUN_PATTERN = re.compile(r"-(?:t-)?(?:il|elle|ils|elles)\b")
+# "avec le sanguin" in a comparison compares with the type just discussed, unless both sides are named
+COMPARATIVE_CUE_PATTERN = re.compile(r"\b(?:differen|compar|ressembl|distingu|commun|oppos|rapport|contrairement)")
+COMPARISON_PATTERN = re.compile(r"\b(?:avec|par rapport (?:a|au|aux)|compare (?:a|au|aux)|contrairement (?:a|au|aux))"
+                                r"\s+(?:l'|le\b|la\b|les\b|un\b|une\b)?")
+TOKEN_PATTERN = re.compile(r"[\w'-]+")
+TYPE_CODE_PATTERN = re.compile(r"\bn?En?A[SP]\b")
+
+# Caracterology entities: a question naming one of them is usually self-contained
+DOMAIN_TERMS = frozenset(analyze("""
+caracterologie caractere caracteres passionne passionnes colerique coleriques sentimental sentimentaux
+nerveux flegmatique flegmatiques sanguin sanguins apathique apathiques amorphe amorphes emotivite emotif
+emotive non-emotif activite actif active inactif primarite primaire secondarite secondaire retentissement
+Senne Heymans Wiersma largeur champ conscience avidite tendresse interet sensoriel polarite typologie
+"""))
+
+
+class RewriteDecision(NamedTuple):
+    """Whether a question must be rewritten into a standalone one, and why"""
+    needed: bool
+    reason: str
+
+
+def domain_entities(text: str) -> Set[str]:
+    """Caracterology terms (stemmed) and type codes mentioned in a text"""
+    return ({term for term in analyze(text) if term in DOMAIN_TERMS}
+            | set(TYPE_CODE_PATTERN.findall(text)))
+
+
+def needs_contextualization(question: str, chat_history: List[BaseMessage], max_followup_tokens: int = 6) -> RewriteDecision:
+    """
+    Decide locally whether a question depends on the conversation history
+
+    Rewriting is needed for anaphoric pronouns (il, elle, ça, celui...),
+    demonstratives (cette notion) and third-person possessives (ses défauts),
+    elliptical follow-ups opening with a continuation word (Et le colérique ?),
+    comparisons with a single named side (la différence avec le sanguin ?),
+    and short questions naming no caracterology entity after a turn that did.
+    Otherwise the question is standalone and the LLM round trip can be skipped.
+    """
+    if not chat_history:
+        return RewriteDecision(False, "no_history")
+
+    folded = fold_accents(question).replace("’", "'")
+    tokens = TOKEN_PATTERN.findall(folded)
+    words = set(tokens) | {part for token in tokens for part in token.split("-")}
+    entities = domain_entities(question)
+
+    pronoun_text = IMPERSONAL_IL_PATTERN.sub(" ", folded)
+    pronoun_text = INVERTED_PRONOUN_PATTERN.sub(
+        lambda match: " " if domain_entities(pronoun_text[:match.start()]) else match.group(0), pronoun_text)
+    pronoun_words = set(TOKEN_PATTERN.findall(pronoun_text))
+    pronoun_words |= {part for token in pronoun_words for part in token.split("-")}
+    if pronoun_words & ANAPHORIC_PRONOUNS:
+        return RewriteDecision(True, "pronoun")
+    if words & ANAPHORIC_POSSESSIVES:
+        return RewriteDecision(True, "possessive")
+    if DEMONSTRATIVE_PATTERN.search(folded):
+        return RewriteDecision(True, "demonstrative")
+    if tokens and tokens[0] in CONTINUATION_MARKERS:
+        return RewriteDecision(True, "ellipsis")
+    comparison = COMPARISON_PATTERN.search(folded)
+    if comparison and COMPARATIVE_CUE_PATTERN.search(folded) and not domain_entities(folded[:comparison.start()]):
+        return RewriteDecision(True, "comparison")
+
+    if entities:
+        return RewriteDecision(False, "standalone")
+
+    previous_turn = " ".join(str(message.content) for message in chat_history[-2:])
+    if domain_entities(previous_turn) and len(analyze(question)) <= max_followup_tokens:
+        return RewriteDecision(True, "entity_overlap")
+    return RewriteDecision(False, "standalone")
+
+
+class ContextualizationCounter:
+    """Thread-safe counters of skipped versus performed question rewrites"""
+
+    def __init__(self):
+        self.performed = 0
+        self.skipped = 0
+        self.reasons: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, decision: RewriteDecision):
+        with self._lock:
+            if decision.needed:
+                self.performed += 1
+            else:
+                self.skipped += 1
+            self.reasons[decision.reason] = self.reasons.get(decision.reason, 0) + 1
+
+    def get_stats(self) -> Dict[str, object]:
+        total = self.performed + self.skipped
+        return {
+            "performed": self.performed,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / total if total else 0.0,
+            "reasons": dict(self.reasons)
+        }
+
+
+def create_selective_history_aware_retriever(llm, retriever, prompt, counter: ContextualizationCounter = None,
+                                             max_followup_tokens: int = 6):
+    """
+    History-aware retriever that only asks the LLM to rewrite questions that need it
+
+    Same inputs and behaviour as langchain's create_history_aware_retriever
+    ({"input", "chat_history"} -> documents), with needs_contextualization
+    deciding between the rewrite chain and retrieval on the raw question.
+    """
+    def is_standalone(inputs) -> bool:
+        decision = needs_contextualization(inputs["input"], inputs.get("chat_history") or [], max_followup_tokens)
+        if counter is not None:
+            counter.record(decision)
+        return not decision.needed
+
+    return RunnableBranch(
+        (is_standalone, (lambda inputs: inputs["input"]) | retriever),
+        prompt | llm | StrOutputParser() | retriever
+    ).with_config(run_name="chat_retriever_chain")
@@ -0,0 +1,191 @@
+from typing import Dict, List, NamedTuple, Iterable, Optional
+import mmap
+import os
+import threading
+
+from langchain_core.documents import Document
+from config.settings import CORPUS_CONFIG
+
+
+class TextSpan(NamedTuple):
+    """Character range [start, end) of a source text in a CorpusStore"""
+    doc_id: str
+    start: int
+    end: int
+
+
+class _CorpusFile:
+    """One source text on disk, with a sparse character -> byte offset index"""
+
+    def __init__(self, path: str, checkpoint_chars: int):
+        self.path = path
+        self.checkpoint_chars = checkpoint_chars
+        self.chars = 0
+        self.bytes = 0
+        self.offsets = [0]  # Byte offset of every checkpoint_chars-th character
+        self.writer = None
+        self.mapping: Optional[mmap.mmap] = None
+
+    def index(self, text: str):
+        """Advance the offset index over text appended at the end of the file"""
+        pos = 0
+        while pos < len(text):
+            take = min(len(text) - pos, len(self.offsets) * self.checkpoint_chars - self.chars)
+            self.bytes += len(text[pos:pos + take].encode("utf-8"))
+            self.chars += take
+            pos += take
+            if self.chars == len(self.offsets) * self.checkpoint_chars:
+                self.offsets.append(self.bytes)
+
+    def byte_offset(self, char_offset: int, round_up: bool = False) -> int:
+        checkpoint, remainder = divmod(char_offset, self.checkpoint_chars)
+        if round_up and remainder:
+            checkpoint += 1
+        return self.offsets[checkpoint] if checkpoint < len(self.offsets) else self.bytes
+
+
+class CorpusStore:
+    """
+    Source texts stored once on disk and read through memory-mapped character spans
+
+    Texts are either registered from an existing UTF-8 file (add_file) or written
+    incrementally (append), e.g. pages extracted from a PDF. A span is read by
+    decoding only the bytes between the offset checkpoints around it, so chunks
+    can be kept as compact (doc_id, start, end) spans instead of string copies.
+    """
+
+    def __init__(self, directory: str = None, checkpoint_chars: int = None):
+        self.directory = directory or CORPUS_CONFIG["directory"]
+        self.checkpoint_chars = checkpoint_chars or CORPUS_CONFIG["checkpoint_chars"]
+        self._files: Dict[str, _CorpusFile] = {}
+        self._lock = threading.Lock()
+
+    def add_file(self, doc_id: str, path: str) -> int:
+        """Register an existing UTF-8 text file, returning its length in characters"""
+        corpus_file = _CorpusFile(path, self.checkpoint_chars)
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for block in iter(lambda: f.read(self.checkpoint_chars * 64), ""):
+                corpus_file.index(block)
+
+        with self._lock:
+            self._close_file(self._files.get(doc_id))
+            self._files[doc_id] = corpus_file
+        return corpus_file.chars
+
+    def append(self, doc_id: str, text: str) -> TextSpan:
+        """Append text to a corpus document (created on first append), returning its span"""
+        with self._lock:
+            corpus_file = self._files.get(doc_id)
+            if corpus_file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                corpus_file = _CorpusFile(os.path.join(self.directory, f"{doc_id}.txt"), self.checkpoint_chars)
+                corpus_file.writer = open(corpus_file.path, "wb")
+                self._files[doc_id] = corpus_file
+            if corpus_file.writer is None:
+                raise ValueError(f"Corpus document '{doc_id}' is read-only")
+
+            start = corpus_file.chars
+            corpus_file.writer.write(text.encode("utf-8"))
+            corpus_file.writer.flush()
+            corpus_file.index(text)
+            return TextSpan(doc_id, start, corpus_file.chars)
+
+    def length(self, doc_id: str) -> int:
+        """Length of a corpus document in characters"""
+        return self._files[doc_id].chars
+
+    def read(self, span: TextSpan) -> str:
+        """Materialize the text of a span from the memory-mapped file"""
+        corpus_file = self._files[span.doc_id]
+        if span.end <= span.start:
+            return ""
+
+        first_checkpoint = span.start // self.checkpoint_chars
+        start_byte = corpus_file.offsets[first_checkpoint]
+        end_byte = corpus_file.byte_offset(span.end, round_up=True)
+
+        mapping = self._mapping(corpus_file, end_byte)
+        text = mapping[start_byte:end_byte].decode("utf-8")
+        skip = span.start - first_checkpoint * self.checkpoint_chars
+        return text[skip:skip + span.end - span.start]
+
+    def text(self, doc_id: str) -> str:
+        """Full text of a corpus document"""
+        return self.read(TextSpan(doc_id, 0, self.length(doc_id)))
+
+    def _mapping(self, corpus_file: _CorpusFile, min_bytes: int) -> mmap.mmap:
+        # Files being appended to are re-mapped when a span goes past the mapped size
+        with self._lock:
+            if corpus_file.mapping is None or len(corpus_file.mapping) < min_bytes:
+                if corpus_file.mapping is not None:
+                    corpus_file.mapping.close()
+                with open(corpus_file.path, "rb") as f:
+                    corpus_file.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return corpus_file.mapping
+
+    @staticmethod
+    def _close_file(corpus_file: Optional[_CorpusFile]):
+        if corpus_file is None:
+            return
+        if corpus_file.writer is not None:
+            corpus_file.writer.close()
+            corpus_file.writer = None
+        if corpus_file.mapping is not None:
+            corpus_file.mapping.close()
+            corpus_file.mapping = None
+
+    def close(self):
+        """Close writers and memory maps (spans stay valid and are re-opened on read)"""
+        with self._lock:
+            for corpus_file in self._files.values():
+                self._close_file(corpus_file)
+
+    def __enter__(self) -> "CorpusStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CorpusChunk:
+    """
+    Document-like chunk made of one or more spans of a CorpusStore
+
+    Only the spans and metadata are held in memory: page_content is read from
+    the memory-mapped corpus on each access, when the chunk is embedded or put
+    in a prompt. Several spans are joined with a blank line (merged sections).
+    """
+
+    __slots__ = ("store", "spans", "metadata")
+
+    def __init__(self, store: CorpusStore, spans: Iterable[TextSpan], metadata: dict = None):
+        self.store = store
+        self.spans = tuple(spans)
+        self.metadata = metadata if metadata is not None else {}
+
+    @property
+    def page_content(self) -> str:
+        return "\n\n".join(self.store.read(span) for span in self.spans)
+
+    @property
+    def size(self) -> int:
+        """Length of page_content, without reading it"""
+        return sum(span.end - span.start for span in self.spans) + 2 * max(len(self.spans) - 1, 0)
+
+    def to_document(self) -> Document:
+        return Document(page_content=self.page_content, metadata=self.metadata)
+
+    def __repr__(self) -> str:
+        return f"CorpusChunk(spans={list(self.spans)!r}, metadata={self.metadata!r})"
+
+
+def content_size(document) -> int:
+    """Length of a document's text, without materializing corpus chunks"""
+    if isinstance(document, CorpusChunk):
+        return document.size
+    return len(document.page_content)
+
+
+def merge_chunks(chunks: List[CorpusChunk], metadata: dict) -> CorpusChunk:
+    """Concatenate corpus chunks of the same store into one multi-span chunk"""
+    return CorpusChunk(chunks[0].store, [span for chunk in chunks for span in chunk.spans], metadata)
@@ -0,0 +1,194 @@
+from typing import List, Optional, Dict
+from array import array
+from datetime import datetime
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+
+from langchain_core.embeddings import Embeddings
+from config.settings import EMBEDDING_CACHE_CONFIG
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text before hashing (Unicode NFC, collapsed whitespace)"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def embedding_key(model: str, text: str) -> str:
+    """Content-addressed cache key for (model, normalized text)"""
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent SQLite store of embedding vectors keyed by (model, normalized text hash)
+
+    Vectors are stored as float32 blobs. The store is bounded to max_entries rows and
+    evicts the least recently used entries when it grows beyond that.
+    """
+
+    def __init__(self, db_path: str = None, max_entries: int = None):
+        self.db_path = db_path or EMBEDDING_CACHE_CONFIG["db_path"]
+        self.max_entries = max_entries or EMBEDDING_CACHE_CONFIG["max_entries"]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_database(self):
+        """Initialize SQLite table for embeddings"""
+        os.makedirs(os.path.dirname(self.db_path) if os.path.dirname(self.db_path) else ".", exist_ok=True)
+
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                vector BLOB,
+                last_used TEXT
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        conn.commit()
+        conn.close()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up vectors for texts, returning None for cache misses"""
+        keys = [embedding_key(model, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            unique_keys = list(dict.fromkeys(keys))
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                cursor.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch)
+                for key, blob in cursor.fetchall():
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+
+            if found:
+                now = datetime.now().isoformat()
+                cursor.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                conn.commit()
+            conn.close()
+
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for vector in results if vector is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        """Store vectors for texts and evict least recently used entries beyond max_entries"""
+        now = datetime.now().isoformat()
+        rows = [
+            (embedding_key(model, text), model, array("f", vector).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+            cursor.execute("SELECT COUNT(*) FROM embeddings")
+            overflow = cursor.fetchone()[0] - self.max_entries
+            if overflow > 0:
+                cursor.execute("""
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?
+                    )
+                """, (overflow,))
+                self.evictions += overflow
+
+            conn.commit()
+            conn.close()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Hit/miss counters since this cache object was created"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves vectors from an EmbeddingCache and only calls
+    the underlying model for texts it has never embedded
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache = None, model_name: str = None):
+        self.embeddings = embeddings
+        self.cache = cache or EmbeddingCache()
+        self.model_name = model_name or getattr(embeddings, "model", None) or embeddings.__class__.__name__
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(self.model_name, texts)
+
+        # Embed each missing text once, even if it appears several times in the batch
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            computed = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            self.cache.put_many(self.model_name, missing, [computed[text] for text in missing])
+            vectors = [vector if vector is not None else computed[text] for text, vector in zip(texts, vectors)]
+
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get_many(self.model_name, [text])[0]
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many(self.model_name, [text], [vector])
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = await asyncio.to_thread(self.cache.get_many, self.model_name, texts)
+
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            computed = dict(zip(missing, await self.embeddings.aembed_documents(missing)))
+            await asyncio.to_thread(self.cache.put_many, self.model_name, missing,
+                                    [computed[text] for text in missing])
+            vectors = [vector if vector is not None else computed[text] for text, vector in zip(texts, vectors)]
+
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = (await asyncio.to_thread(self.cache.get_many, self.model_name, [text]))[0]
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            await asyncio.to_thread(self.cache.put_many, self.model_name, [text], [vector])
+        return vector
+
+
+def with_embedding_cache(embeddings: Embeddings) -> Embeddings:
+    """Wrap embeddings with the persistent cache when enabled in EMBEDDING_CACHE_CONFIG"""
+    if not EMBEDDING_CACHE_CONFIG["enabled"]:
+        return embeddings
+    return CachedEmbeddings(embeddings)
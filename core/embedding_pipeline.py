@@ -0,0 +1,159 @@
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Tuple, Hashable
+from concurrent.futures import ThreadPoolExecutor
+import random
+import threading
+import time
+
+from config.settings import EMBEDDING_PIPELINE_CONFIG
+from core.tokens import get_token_counter
+
+
+def iter_token_budget_batches(items: Iterable[Tuple[Hashable, str]], max_tokens: int = None,
+                              max_texts: int = None) -> Iterator[List[Tuple[Hashable, str]]]:
+    """
+    Group (key, text) items into batches bounded by a token budget (tiktoken) and a text count
+
+    Items are consumed lazily and each batch is yielded as soon as it is full, so
+    batches can be embedded while upstream items are still being produced.
+    A single text larger than the budget gets a batch of its own.
+    """
+    max_tokens = max_tokens or EMBEDDING_PIPELINE_CONFIG["max_tokens_per_batch"]
+    max_texts = max_texts or EMBEDDING_PIPELINE_CONFIG["max_texts_per_batch"]
+    count_tokens = get_token_counter(EMBEDDING_PIPELINE_CONFIG["tokenizer_model"])
+
+    current, current_tokens = [], 0
+    for key, text in items:
+        tokens = count_tokens(text)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_texts):
+            yield current
+            current, current_tokens = [], 0
+        current.append((key, text))
+        current_tokens += tokens
+    if current:
+        yield current
+
+
+def token_budget_batches(texts: List[str], max_tokens: int = None, max_texts: int = None) -> List[List[int]]:
+    """Group text indices into token-budgeted batches (see iter_token_budget_batches)"""
+    return [
+        [index for index, _ in batch]
+        for batch in iter_token_budget_batches(enumerate(texts), max_tokens, max_texts)
+    ]
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Detect OpenAI rate-limit errors (HTTP 429) without depending on the client version"""
+    if error.__class__.__name__ == "RateLimitError":
+        return True
+    if getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error).lower()
+    return "rate limit" in message or "429" in message
+
+
+class EmbeddingPipeline:
+    """
+    Concurrent, rate-limit-aware embedding of many texts
+
+    Texts are grouped into token-budgeted batches embedded by a bounded pool of
+    workers. Rate-limit errors are retried with exponential backoff, and a batch
+    still rate-limited after max_retries fails as a whole; any other failing
+    batch is bisected so that only the offending texts are dropped.
+    """
+
+    def __init__(self, embeddings, config: Dict[str, Any] = None):
+        self.embeddings = embeddings
+        self.config = {**EMBEDDING_PIPELINE_CONFIG, **(config or {})}
+        self.failed_keys: List[Hashable] = []
+        self.retries = 0
+        self.requests = 0
+        self._stats_lock = threading.Lock()  # Counters and failed_keys are updated from the worker threads
+
+    def _embed_with_backoff(self, texts: List[str]) -> List[List[float]]:
+        delay = self.config["initial_backoff"]
+        for attempt in range(self.config["max_retries"] + 1):
+            try:
+                with self._stats_lock:
+                    self.requests += 1
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.config["max_retries"]:
+                    raise
+                with self._stats_lock:
+                    self.retries += 1
+                time.sleep(delay + random.uniform(0, delay / 2))
+                delay = min(delay * 2, self.config["max_backoff"])
+
+    def _embed_batch(self, batch: List[Tuple[Hashable, str]]) -> Dict[Hashable, List[float]]:
+        """Embed one batch of (key, text) items, bisecting it on non rate-limit failures"""
+        try:
+            vectors = self._embed_with_backoff([text for _, text in batch])
+            return {key: vector for (key, _), vector in zip(batch, vectors)}
+        except Exception as e:
+            if is_rate_limit_error(e):
+                # Halves would only run their own retry series against the same limit
+                print(f"Rate limit persists after {self.config['max_retries']} retries, "
+                      f"{len(batch)} documents not embedded: {e}")
+                with self._stats_lock:
+                    self.failed_keys.extend(key for key, _ in batch)
+                return {}
+            if len(batch) == 1:
+                key, text = batch[0]
+                print(f"Failed to embed document {key} ({len(text)} chars): {e}")
+                with self._stats_lock:
+                    self.failed_keys.append(key)
+                return {}
+            middle = len(batch) // 2
+            return {
+                **self._embed_batch(batch[:middle]),
+                **self._embed_batch(batch[middle:])
+            }
+
+    def embed_iter(self, items: Iterable[Tuple[Hashable, str]]) -> Dict[Hashable, List[float]]:
+        """
+        Embed (key, text) items concurrently while they are being produced
+
+        Each token-budgeted batch is submitted to the worker pool as soon as it is
+        full, so a lazy producer (e.g. PDF parsing) overlaps with embedding.
+
+        Returns:
+            Dictionary key -> vector (failed keys are listed in failed_keys)
+        """
+        vectors: Dict[Hashable, List[float]] = {}
+
+        with ThreadPoolExecutor(max_workers=self.config["max_workers"]) as executor:
+            futures = [
+                executor.submit(self._embed_batch, batch)
+                for batch in iter_token_budget_batches(
+                    items, self.config["max_tokens_per_batch"], self.config["max_texts_per_batch"]
+                )
+            ]
+            for future in futures:
+                vectors.update(future.result())
+
+        return vectors
+
+    def embed(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embed texts concurrently
+
+        Returns:
+            Vectors aligned with texts (None for texts that could not be embedded)
+        """
+        vectors = self.embed_iter(enumerate(texts))
+        return [vectors.get(i) for i in range(len(texts))]
+
+
+def bulk_upsert(vectorstore, ids: List[str], texts: List[str], metadatas: List[dict],
+                vectors: List[List[float]], write_batch_size: int = None):
+    """Write precomputed vectors into a Chroma collection in bulk (no embedding call)"""
+    write_batch_size = write_batch_size or EMBEDDING_PIPELINE_CONFIG["write_batch_size"]
+    collection = vectorstore._collection
+    for start in range(0, len(ids), write_batch_size):
+        end = start + write_batch_size
+        collection.upsert(
+            ids=ids[start:end],
+            embeddings=vectors[start:end],
+            documents=texts[start:end],
+            metadatas=metadatas[start:end]
+        )
@@ -0,0 +1,125 @@
+from typing import Dict, Any, List, Iterable
+from datetime import datetime
+import hashlib
+import json
+import os
+
+from langchain_core.documents import Document
+from core.embedding_pipeline import EmbeddingPipeline, bulk_upsert
+from core.lexical import BM25IndexBuilder, lexical_index_path
+
+
+MANIFEST_DIRECTORY = "manifests"
+
+
+def compute_chunk_id(document: Document) -> str:
+    """
+    Stable chunk ID derived from source, section and content hash
+
+    Editing the text of a section changes its ID, so an edited chunk is seen as
+    one deletion plus one addition by the incremental indexer.
+    """
+    metadata = document.metadata or {}
+    content_hash = hashlib.sha256(document.page_content.encode("utf-8")).hexdigest()
+    key = "\0".join([
+        str(metadata.get("source", "")),
+        str(metadata.get("section_title", "")),
+        content_hash
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def sync_collection(vectorstore, documents: Iterable[Document], persist_directory: str,
+                    collection_name: str, pipeline_config: Dict[str, Any] = None) -> Dict[str, int]:
+    """
+    Incrementally sync a Chroma collection with documents
+
+    Documents may be a lazy iterator: new or changed chunks are sent to the
+    embedding pipeline as they arrive, so chunk production overlaps embedding.
+    Vectors are bulk-upserted once all batches are done, then chunks that no
+    longer exist in the source are deleted, and the collection manifest and
+    lexical (BM25) index are rewritten from the full set of chunks.
+    """
+    existing_ids = set(vectorstore.get(include=[])["ids"])
+    all_ids, new_documents = [], {}
+    unchanged = 0
+    lexical = BM25IndexBuilder()
+
+    def new_chunks():
+        nonlocal unchanged
+        seen = set()
+        for document in documents:
+            chunk_id = compute_chunk_id(document)
+            if chunk_id in seen:
+                # Exact duplicate (same source, section and content)
+                continue
+            seen.add(chunk_id)
+            all_ids.append(chunk_id)
+            lexical.add(chunk_id, document.page_content)
+            if chunk_id in existing_ids:
+                unchanged += 1
+                continue
+            new_documents[chunk_id] = document
+            yield chunk_id, document.page_content
+
+    pipeline = EmbeddingPipeline(vectorstore.embeddings, pipeline_config)
+    vectors = pipeline.embed_iter(new_chunks())
+
+    embedded_ids = [chunk_id for chunk_id in new_documents if chunk_id in vectors]
+    bulk_upsert(
+        vectorstore,
+        ids=embedded_ids,
+        texts=[new_documents[chunk_id].page_content for chunk_id in embedded_ids],
+        metadatas=[new_documents[chunk_id].metadata for chunk_id in embedded_ids],
+        vectors=[vectors[chunk_id] for chunk_id in embedded_ids]
+    )
+
+    delete_ids = sorted(existing_ids - set(all_ids))
+    if delete_ids:
+        vectorstore.delete(ids=delete_ids)
+
+    failed_ids = set(pipeline.failed_keys)
+    write_index_manifest(persist_directory, collection_name,
+                         [chunk_id for chunk_id in all_ids if chunk_id not in failed_ids])
+    lexical.build(exclude=failed_ids).save(lexical_index_path(persist_directory, collection_name))
+
+    return {
+        "added": len(embedded_ids),
+        "deleted": len(delete_ids),
+        "unchanged": unchanged,
+        "failed": len(failed_ids),
+        "requests": pipeline.requests,
+        "retries": pipeline.retries
+    }
+
+
+def compute_index_version(chunk_ids: List[str]) -> str:
+    """Version stamp of a collection: hash of its sorted chunk IDs"""
+    return hashlib.sha256("\n".join(sorted(chunk_ids)).encode("utf-8")).hexdigest()[:16]
+
+
+def _manifest_path(persist_directory: str, collection_name: str) -> str:
+    return os.path.join(persist_directory, MANIFEST_DIRECTORY, f"{collection_name}.json")
+
+
+def write_index_manifest(persist_directory: str, collection_name: str, chunk_ids: List[str]):
+    """Record the index version and chunk count of a collection after indexing"""
+    path = _manifest_path(persist_directory, collection_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "collection_name": collection_name,
+            "index_version": compute_index_version(chunk_ids),
+            "chunk_count": len(chunk_ids),
+            "updated_at": datetime.now().isoformat()
+        }, f, indent=2)
+
+
+def get_index_version(persist_directory: str, collection_name: str) -> str:
+    """Get the index version of a collection ("unknown" if it was never synced)"""
+    try:
+        with open(_manifest_path(persist_directory, collection_name), "r", encoding="utf-8") as f:
+            return json.load(f)["index_version"]
+    except (OSError, ValueError, KeyError):
+        return "unknown"
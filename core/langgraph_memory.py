@@ -4,6 +4,7 @@ from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, MessagesState
 from langchain_openai import ChatOpenAI
 import tiktoken
+import asyncio
 import sqlite3
 import json
 import os
@@ -178,6 +179,10 @@ class LangGraphMemoryManager:
         # Update database metadata
         self._update_conversation_metadata(thread_id, len(messages), self._count_tokens(messages))
     
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, Any]):
+        """Async save_context: the SQLite metadata update runs in a worker thread"""
+        await asyncio.to_thread(self.save_context, inputs, outputs)
+    
     def _update_conversation_metadata(self, thread_id: str, message_count: int, token_count: int):
         """Update conversation metadata in database"""
         conn = sqlite3.connect(self.db_path)
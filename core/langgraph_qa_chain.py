@@ -1,27 +1,114 @@
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Tuple, AsyncIterator, Iterator
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langchain.prompts import PromptTemplate
 from langchain_core.documents import Document
 from langgraph.graph import StateGraph, MessagesState, START, END
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph.state import CompiledStateGraph
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from pydantic import BaseModel, Field
+import asyncio
+import hashlib
+import inspect
+import json
 import operator
+import time
 from typing_extensions import Annotated
 
 from core.llm_setup import setup_llm, setup_retriever
+from core.tokens import llm_usage
+from core.answer_cache import SemanticAnswerCache
+from core.llm_cache import LLMResponseCache, llm_response_key
+from core.single_flight import SingleFlight
+from core.precomputed_answers import PrecomputedAnswers, templated_prompt_id
+from core.indexing import get_index_version
 from core.langgraph_memory import LangGraphMemoryManager
+from core.callbacks import AsyncQueueStreamHandler, split_stream_handler
+from core.context_packing import PackedPrompt, pack_prompt, document_score
+from core.lexical import analyze
+from core.contextualization import ContextualizationCounter, RewriteDecision, needs_contextualization
 from config.prompts import get_qa_prompt
+from config.settings import get_vectorstore_config, get_llm_profile, CONTEXTUALIZATION_CONFIG, PRECOMPUTED_ANSWERS_CONFIG, WORKFLOW_CONFIG
 import re
 
 
+# Prompt of the contextualize_question node
+CONTEXTUALIZE_TEMPLATE = """Étant donné un historique de conversation et la dernière question de l'utilisateur qui pourrait faire référence au contexte de l'historique de conversation, formulez une question autonome qui peut être comprise sans l'historique de conversation. Ne répondez PAS à la question, reformulez-la uniquement si nécessaire, sinon retournez-la telle quelle.
+
+Historique de conversation:
+{chat_history}
+
+Question: {question}
+
+Question contextualisée:"""
+
+# Prompt of the generate_answer node (also part of the answer cache key)
+ANSWER_TEMPLATE = """Tu es un assistant caractérologue expert, à la fois pédagogue et curieux. Ton rôle est de faire découvrir la caractérologie — la science des types de caractère — de manière à la fois précise, vivante et accessible.
+
+Tu réponds aux questions des utilisateurs en t'appuyant rigoureusement sur les connaissances fournies par la base de données intégrée, notamment les travaux de René Le Senne et les typologies reconnues (émotivité, activité, retentissement). Si une réponse n'est pas disponible dans les sources, tu l'indiques honnêtement.
+
+Tu adaptes ton langage et ton niveau d'explication selon le profil de l'utilisateur (novice ou initié). Tu cherches à l'accompagner dans sa compréhension de la caractérologie. S'il pose des questions simples ou générales, tu proposes des compléments pertinents pour approfondir.
+
+Tu es capable d'orienter la conversation de façon naturelle, en suggérant des sujets liés à ce que l'utilisateur vient de dire. Par exemple, tu peux l'inviter à découvrir un autre type psychologique, une dimension caractérologique ou une mise en application concrète.
+
+Tu peux aussi poser des questions ouvertes à l'utilisateur s'il semble curieux mais ne sait pas par où commencer.
+
+Sois clair, structuré et rigoureux. Utilise des exemples concrets si cela peut aider à mieux comprendre. Ton objectif : éveiller l'intérêt, transmettre un savoir solide, et guider pas à pas dans l'univers de la caractérologie.
+
+Adapte la longueur de ta réponse à la complexité de la question : réponse courte pour une question simple, plus développée pour une question complexe ou une demande d'explication détaillée.
+
+IMPORTANT - Utilise les informations suivantes dans cet ordre de priorité :
+
+1. HISTORIQUE DE CONVERSATION (priorité absolue pour comprendre les références comme "ça", "ils", "cette notion") :
+{chat_history}
+
+2. CONTEXTE DOCUMENTAIRE (sources pour informations factuelles) :
+{context}
+
+3. QUESTION ACTUELLE :
+{input}"""
+
+
+def merge_trace(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge per-node trace entries written by the workflow nodes"""
+    return {**(left or {}), **(right or {})}
+
+
+def new_term_ratio(original: str, rewritten: str) -> float:
+    """Share of the rewritten question's content terms that the original question did not contain"""
+    rewritten_terms = set(analyze(rewritten))
+    if not rewritten_terms:
+        return 0.0
+    return len(rewritten_terms - set(analyze(original))) / len(rewritten_terms)
+
+
+def replay_tokens(text: str) -> List[str]:
+    """Split a stored completion into word tokens to push through the streaming path"""
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+def interleave_documents(primary: List[Document], secondary: List[Document], limit: int) -> List[Document]:
+    """Alternate two ranked document lists (primary first), dropping duplicates, up to limit documents"""
+    merged, seen = [], set()
+    for i in range(max(len(primary), len(secondary))):
+        for docs in (primary, secondary):
+            if i < len(docs):
+                key = docs[i].id or docs[i].page_content
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(docs[i])
+    return merged[:limit]
+
+
 class RAGState(BaseModel):
     """State for the RAG workflow"""
     messages: Annotated[List[BaseMessage], operator.add] = Field(default_factory=list)
     question: str = ""
+    original_question: str = ""
     context: List[Document] = Field(default_factory=list)
     answer: str = ""
     chat_history: List[BaseMessage] = Field(default_factory=list)
+    trace: Annotated[Dict[str, Any], merge_trace] = Field(default_factory=dict)
 
 
 def clean_response(response: str, user_question: str) -> str:
@@ -49,51 +136,137 @@ class LangGraphRAGChain:
     with enhanced memory management and workflow control
     """
     
-    def __init__(self, memory_manager: LangGraphMemoryManager, collection_key: str = None, 
-                 prompt_name: str = "caracterologie_qa", prompt_version: int = None):
+    def __init__(self, memory_manager: Optional[LangGraphMemoryManager] = None, collection_key: str = None, 
+                 prompt_name: str = "caracterologie_qa", prompt_version: int = None,
+                 llm=None, rewrite_llm=None, retriever=None, answer_cache: Optional[SemanticAnswerCache] = None, embeddings=None,
+                 precomputed_answers: Optional[PrecomputedAnswers] = None,
+                 llm_cache: Optional[LLMResponseCache] = None, single_flight: Optional[SingleFlight] = None):
         """
         Initialize LangGraph RAG chain
         
         Args:
-            memory_manager: LangGraph memory manager instance
+            memory_manager: Default LangGraph memory manager (None for a chain shared
+                across conversations, which receives the memory manager at invoke time)
             collection_key: Vector store collection key
             prompt_name: Prompt template name
             prompt_version: Prompt version
+            llm: Optional answer model (default: the "generate_answer" LLM profile)
+            rewrite_llm: Optional question rewriting model (default: llm when given, else the
+                "contextualize_question" LLM profile)
+            retriever: Optional retriever (default: setup_retriever(collection_key))
+            answer_cache: Optional semantic answer cache for questions asked without history
+            embeddings: Embeddings of the questions looked up in answer_cache
+            precomputed_answers: Optional stored answers of the welcome-screen prompts
+            llm_cache: Optional exact-match cache of the contextualization and answer completions
+            single_flight: Optional coalescing of identical questions asked concurrently
         """
         self.memory_manager = memory_manager
-        self.llm = setup_llm()
-        self.retriever = setup_retriever(collection_key)
+        self.llm = llm if llm is not None else setup_llm(get_llm_profile("generate_answer"))
+        if rewrite_llm is None:
+            rewrite_llm = llm if llm is not None else setup_llm(get_llm_profile("contextualize_question"))
+        self.rewrite_llm = rewrite_llm
+        self.retriever = retriever if retriever is not None else setup_retriever(collection_key)
+        self.collection_key = collection_key
         self.prompt_name = prompt_name
         self.prompt_version = prompt_version
+        self.answer_cache = answer_cache if embeddings is not None else None
+        self.embeddings = embeddings
+        self.precomputed_answers = precomputed_answers
+        self.llm_cache = llm_cache
+        self.single_flight = single_flight
+        self.contextualization_stats = ContextualizationCounter()
         
         # Build the workflow graph
         self.workflow = self._build_workflow()
         self.app = self.workflow.compile()
     
     def _build_workflow(self) -> StateGraph:
-        """Build the LangGraph workflow for RAG"""
+        """
+        Build the LangGraph workflow for RAG
+        
+        Retrieval only uses the original question, so it runs concurrently with the
+        contextualization call; both branches join in refine_context, which retrieves
+        again on the rewritten question when it differs materially, before generate_answer.
+        Every node has a sync and an async implementation (invoke / ainvoke).
+        """
         workflow = StateGraph(RAGState)
         
         # Add nodes
-        workflow.add_node("retrieve_context", self._retrieve_context)
-        workflow.add_node("contextualize_question", self._contextualize_question)
-        workflow.add_node("generate_answer", self._generate_answer)
+        workflow.add_node("retrieve_context",
+                          self._timed_node("retrieve_context", self._retrieve_context, self._aretrieve_context))
+        workflow.add_node("contextualize_question",
+                          self._timed_node("contextualize_question", self._contextualize_question,
+                                           self._acontextualize_question))
+        workflow.add_node("refine_context",
+                          self._timed_node("refine_context", self._refine_context, self._arefine_context))
+        workflow.add_node("generate_answer",
+                          self._timed_node("generate_answer", self._generate_answer, self._agenerate_answer))
         
         # Add edges
-        workflow.add_edge(START, "retrieve_context")
-        workflow.add_edge("retrieve_context", "contextualize_question")
-        workflow.add_edge("contextualize_question", "generate_answer")
+        if WORKFLOW_CONFIG["parallel_branches"]:
+            workflow.add_edge(START, "retrieve_context")
+            workflow.add_edge(START, "contextualize_question")
+            workflow.add_edge(["retrieve_context", "contextualize_question"], "refine_context")
+        else:
+            workflow.add_edge(START, "retrieve_context")
+            workflow.add_edge("retrieve_context", "contextualize_question")
+            workflow.add_edge("contextualize_question", "refine_context")
+        workflow.add_edge("refine_context", "generate_answer")
         workflow.add_edge("generate_answer", END)
         
         return workflow
     
+    @staticmethod
+    def _timed_node(name: str, node: Callable, anode: Callable) -> RunnableLambda:
+        """Wrap a node to record when it started (relative to the workflow start) and how long it ran"""
+        takes_config = "config" in inspect.signature(node).parameters
+        
+        def timed(result: Dict[str, Any], started_at: float, config: RunnableConfig) -> Dict[str, Any]:
+            elapsed_ms = (time.perf_counter() - started_at) * 1000
+            workflow_started_at = (config or {}).get("configurable", {}).get("workflow_started_at", started_at)
+            trace = dict(result.get("trace", {}))
+            trace[name] = {
+                **trace.get(name, {}),
+                "started_ms": (started_at - workflow_started_at) * 1000,
+                "elapsed_ms": elapsed_ms
+            }
+            return {**result, "trace": trace}
+        
+        def run(state: RAGState, config: RunnableConfig) -> Dict[str, Any]:
+            started_at = time.perf_counter()
+            return timed(node(state, config) if takes_config else node(state), started_at, config)
+        
+        async def arun(state: RAGState, config: RunnableConfig) -> Dict[str, Any]:
+            started_at = time.perf_counter()
+            return timed(await (anode(state, config) if takes_config else anode(state)), started_at, config)
+        
+        return RunnableLambda(run, afunc=arun, name=name)
+    
     def _retrieve_context(self, state: RAGState) -> Dict[str, Any]:
         """Retrieve relevant documents based on the question"""
-        print(f"\n🔍 RECHERCHE DE CHUNKS pour la question: '{state.question}'")
+        question = state.original_question or state.question
+        print(f"\n🔍 RECHERCHE DE CHUNKS pour la question: '{question}'")
         print("=" * 80)
         
-        # Use the original question for retrieval (before contextualization)
-        docs = self.retriever.invoke(state.question)
+        # Use the original question for retrieval (contextualization runs concurrently)
+        started_at = time.perf_counter()
+        docs = self.retriever.invoke(question)
+        return self._retrieved(docs, (time.perf_counter() - started_at) * 1000)
+    
+    async def _aretrieve_context(self, state: RAGState) -> Dict[str, Any]:
+        """Async _retrieve_context (async embeddings request)"""
+        question = state.original_question or state.question
+        print(f"\n🔍 RECHERCHE DE CHUNKS pour la question: '{question}'")
+        print("=" * 80)
+        
+        started_at = time.perf_counter()
+        docs = await self.retriever.ainvoke(question)
+        return self._retrieved(docs, (time.perf_counter() - started_at) * 1000)
+    
+    @staticmethod
+    def _retrieved(docs: List[Document], retrieval_ms: float) -> Dict[str, Any]:
+        """Log the retrieved chunks and build the retrieve_context state update"""
+        scores = [document_score(doc) for doc in docs]
         
         print(f"📄 {len(docs)} chunks récupérés:")
         print("-" * 80)
@@ -102,6 +275,8 @@ class LangGraphRAGChain:
             if hasattr(doc, 'metadata'):
                 print(f"   Source: {doc.metadata.get('source', 'N/A')}")
                 print(f"   Page: {doc.metadata.get('page', 'N/A')}")
+            if scores[i - 1] is not None:
+                print(f"   Score: {scores[i - 1]:.4f}")
             content = doc.page_content if hasattr(doc, 'page_content') else str(doc)
             print(f"   Contenu: {content[:200]}...")
             if len(content) > 200:
@@ -109,42 +284,244 @@ class LangGraphRAGChain:
             print("-" * 40)
         print("=" * 80)
         
-        return {"context": docs}
+        return {
+            "context": docs,
+            "trace": {
+                "retrieve_context": {
+                    "k": len(docs),
+                    "scores": scores,
+                    "chunk_ids": [doc.id for doc in docs],
+                    "retrieval_ms": retrieval_ms
+                }
+            }
+        }
     
     def _contextualize_question(self, state: RAGState) -> Dict[str, Any]:
         """Contextualize the question using chat history if needed"""
-        # If no chat history, return question as-is
-        if not state.chat_history:
-            return {"question": state.question}
+        decision = self._rewrite_decision(state)
+        if not decision.needed:
+            return self._not_rewritten(state, decision)
         
-        # Create contextualization prompt
-        contextualize_prompt = """Étant donné un historique de conversation et la dernière question de l'utilisateur qui pourrait faire référence au contexte de l'historique de conversation, formulez une question autonome qui peut être comprise sans l'historique de conversation. Ne répondez PAS à la question, reformulez-la uniquement si nécessaire, sinon retournez-la telle quelle.
-
-Historique de conversation:
-{chat_history}
-
-Question: {question}
-
-Question contextualisée:"""
+        # Get contextualized question (from the response cache for an identical prompt)
+        started_at = time.perf_counter()
+        prompt = self._contextualize_prompt(state)
+        cache_key, contextualized_question, cache_status = self._cached_response("contextualize_question", prompt)
+        usage_metadata = None
+        if contextualized_question is None:
+            response = self.rewrite_llm.invoke(prompt)
+            contextualized_question, usage_metadata = response.content, response.usage_metadata
+            self._cache_response(cache_key, "contextualize_question", contextualized_question)
+        usage = llm_usage(self.rewrite_llm, prompt, contextualized_question, usage_metadata, cache_status == "hit")
+        return self._rewritten(contextualized_question, decision, (time.perf_counter() - started_at) * 1000,
+                               cache_status, usage)
+    
+    async def _acontextualize_question(self, state: RAGState) -> Dict[str, Any]:
+        """Async _contextualize_question (async LLM client)"""
+        decision = self._rewrite_decision(state)
+        if not decision.needed:
+            return self._not_rewritten(state, decision)
+        
+        started_at = time.perf_counter()
+        prompt = self._contextualize_prompt(state)
+        cache_key, contextualized_question, cache_status = await asyncio.to_thread(
+            self._cached_response, "contextualize_question", prompt)
+        usage_metadata = None
+        if contextualized_question is None:
+            response = await self.rewrite_llm.ainvoke(prompt)
+            contextualized_question, usage_metadata = response.content, response.usage_metadata
+            await asyncio.to_thread(self._cache_response, cache_key, "contextualize_question",
+                                    contextualized_question)
+        usage = llm_usage(self.rewrite_llm, prompt, contextualized_question, usage_metadata, cache_status == "hit")
+        return self._rewritten(contextualized_question, decision, (time.perf_counter() - started_at) * 1000,
+                               cache_status, usage)
+    
+    def _rewrite_decision(self, state: RAGState) -> RewriteDecision:
+        """Whether the question must be rewritten with the chat history (recorded in contextualization_stats)"""
+        # If no chat history, the question is used as-is
+        if not state.chat_history:
+            return RewriteDecision(False, "no_history")
         
-        # Format chat history
+        if CONTEXTUALIZATION_CONFIG["selective"]:
+            decision = needs_contextualization(state.question, state.chat_history,
+                                               CONTEXTUALIZATION_CONFIG["max_followup_tokens"])
+        else:
+            decision = RewriteDecision(True, "always")
+        self.contextualization_stats.record(decision)
+        return decision
+    
+    @staticmethod
+    def _contextualize_prompt(state: RAGState) -> str:
+        """Contextualization prompt with the last messages of the chat history"""
         history_text = ""
         for msg in state.chat_history[-6:]:  # Last 6 messages for context
             role = "Utilisateur" if isinstance(msg, HumanMessage) else "Assistant"
             history_text += f"{role}: {msg.content}\n"
         
-        prompt = contextualize_prompt.format(
+        return CONTEXTUALIZE_TEMPLATE.format(
             chat_history=history_text,
             question=state.question
         )
+    
+    @staticmethod
+    def _not_rewritten(state: RAGState, decision: RewriteDecision) -> Dict[str, Any]:
+        if decision.reason == "no_history":
+            return {"question": state.question}
+        print(f"⏭️ Question autonome, reformulation ignorée ({decision.reason})")
+        return {
+            "question": state.question,
+            "trace": {"contextualize_question": {"rewritten": False, "reason": decision.reason, "llm_ms": 0.0}}
+        }
+    
+    @staticmethod
+    def _rewritten(contextualized_question: str, decision: RewriteDecision, llm_ms: float,
+                   cache_status: Optional[str], usage: Dict[str, Any]) -> Dict[str, Any]:
+        print(f"✏️ Question reformulée ({decision.reason}): '{contextualized_question}'")
+        return {
+            "question": contextualized_question,
+            "trace": {"contextualize_question": {"rewritten": True, "reason": decision.reason, "llm_ms": llm_ms,
+                                                 "llm_cache": cache_status, "llm": usage}}
+        }
+    
+    def _cached_response(self, node: str, prompt: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """(cache key, cached completion or None, "hit"/"miss") of a prompt; all None without an LLM cache"""
+        if self.llm_cache is None:
+            return None, None, None
+        cache_key = llm_response_key(self._node_llm(node), prompt)
+        response = self.llm_cache.get(cache_key, node)
+        return cache_key, response, "miss" if response is None else "hit"
+    
+    def _node_llm(self, node: str):
+        """Chat model of a workflow node"""
+        return self.rewrite_llm if node == "contextualize_question" else self.llm
+    
+    def _cache_response(self, cache_key: Optional[str], node: str, response: str):
+        if cache_key is not None and response:
+            self.llm_cache.put(cache_key, node, response)
+    
+    def _refine_context(self, state: RAGState) -> Dict[str, Any]:
+        """Retrieve again on the rewritten question when it brings new terms, merging both result lists"""
+        refine, ratio = self._refine_decision(state)
+        if not refine:
+            return {"trace": {"refine_context": {"refined": False, "new_term_ratio": ratio}}}
+        
+        started_at = time.perf_counter()
+        refined_docs = self.retriever.invoke(state.question)
+        return self._refined(state, refined_docs, ratio, (time.perf_counter() - started_at) * 1000)
+    
+    async def _arefine_context(self, state: RAGState) -> Dict[str, Any]:
+        """Async _refine_context"""
+        refine, ratio = self._refine_decision(state)
+        if not refine:
+            return {"trace": {"refine_context": {"refined": False, "new_term_ratio": ratio}}}
+        
+        started_at = time.perf_counter()
+        refined_docs = await self.retriever.ainvoke(state.question)
+        return self._refined(state, refined_docs, ratio, (time.perf_counter() - started_at) * 1000)
+    
+    @staticmethod
+    def _refine_decision(state: RAGState) -> Tuple[bool, float]:
+        """Whether the rewritten question calls for a second retrieval, and its share of new terms"""
+        original = state.original_question or state.question
+        ratio = new_term_ratio(original, state.question)
+        refine = (WORKFLOW_CONFIG["refine_retrieval"] and state.question != original
+                  and ratio >= WORKFLOW_CONFIG["refine_min_new_term_ratio"])
+        if refine:
+            print(f"🔁 Seconde recherche sur la question reformulée ({ratio:.0%} de termes nouveaux)")
+        return refine, ratio
+    
+    @staticmethod
+    def _refined(state: RAGState, refined_docs: List[Document], ratio: float, retrieval_ms: float) -> Dict[str, Any]:
+        limit = max(len(state.context), len(refined_docs))
+        docs = interleave_documents(refined_docs, state.context, limit)
+        return {
+            "context": docs,
+            "trace": {
+                "refine_context": {
+                    "refined": True,
+                    "new_term_ratio": ratio,
+                    "k": len(docs),
+                    "chunk_ids": [doc.id for doc in docs],
+                    "retrieval_ms": retrieval_ms
+                }
+            }
+        }
+    
+    def _generate_answer(self, state: RAGState, config: RunnableConfig) -> Dict[str, Any]:
+        """Generate answer using retrieved context and chat history, streaming tokens as they arrive"""
+        final_prompt, packed = self._answer_prompt(state)
+        
+        # Stream the response token by token to the Streamlit handler (if any)
+        stream_handler = (config or {}).get("configurable", {}).get("stream_handler")
+        
+        started_at = time.perf_counter()
+        first_token_at = None
+        answer_parts = []
+        
+        # An identical final prompt is replayed from the response cache through the same stream
+        usage_metadata = {}
+        cache_key, cached_answer, cache_status = self._cached_response("generate_answer", final_prompt)
+        tokens = replay_tokens(cached_answer) if cached_answer is not None else self._stream_tokens(final_prompt,
+                                                                                                   usage_metadata)
+        
+        for token in tokens:
+            if not token:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            answer_parts.append(token)
+            if stream_handler:
+                stream_handler.on_llm_new_token(token)
+        
+        if cached_answer is None:
+            self._cache_response(cache_key, "generate_answer", "".join(answer_parts))
+        usage = llm_usage(self.llm, final_prompt, "".join(answer_parts), usage_metadata, cached_answer is not None)
+        return self._generated(answer_parts, started_at, first_token_at, packed, stream_handler, cache_status, usage)
+    
+    def _stream_tokens(self, prompt: str, usage_metadata: Dict[str, Any]) -> Iterator[str]:
+        """Tokens streamed by the answer model, keeping the usage reported with the last chunk"""
+        for chunk in self.llm.stream(prompt):
+            if chunk.usage_metadata:
+                usage_metadata.update(chunk.usage_metadata)
+            yield chunk.content
+    
+    async def _agenerate_answer(self, state: RAGState, config: RunnableConfig) -> Dict[str, Any]:
+        """Async _generate_answer (async LLM client)"""
+        final_prompt, packed = self._answer_prompt(state)
+        stream_handler = (config or {}).get("configurable", {}).get("stream_handler")
+        
+        started_at = time.perf_counter()
+        first_token_at = None
+        answer_parts = []
         
-        # Get contextualized question
-        contextualized_question = self.llm.invoke(prompt).content
+        usage_metadata = {}
+        cache_key, cached_answer, cache_status = await asyncio.to_thread(self._cached_response, "generate_answer",
+                                                                         final_prompt)
+        if cached_answer is not None:
+            first_token_at = time.perf_counter()
+            answer_parts = replay_tokens(cached_answer)
+            for token in answer_parts:
+                if stream_handler:
+                    stream_handler.on_llm_new_token(token)
+        else:
+            async for chunk in self.llm.astream(final_prompt):
+                if chunk.usage_metadata:
+                    usage_metadata.update(chunk.usage_metadata)
+                token = chunk.content
+                if not token:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                answer_parts.append(token)
+                if stream_handler:
+                    stream_handler.on_llm_new_token(token)
+            await asyncio.to_thread(self._cache_response, cache_key, "generate_answer", "".join(answer_parts))
         
-        return {"question": contextualized_question}
+        usage = llm_usage(self.llm, final_prompt, "".join(answer_parts), usage_metadata, cached_answer is not None)
+        return self._generated(answer_parts, started_at, first_token_at, packed, stream_handler, cache_status, usage)
     
-    def _generate_answer(self, state: RAGState) -> Dict[str, Any]:
-        """Generate answer using retrieved context and chat history"""
+    @staticmethod
+    def _answer_prompt(state: RAGState) -> Tuple[str, PackedPrompt]:
+        """Final answer prompt, with chat history and retrieved chunks fitted to the token budget"""
         # Display memory content
         if state.chat_history:
             print(f"\n💬 MÉMOIRE DE CONVERSATION ({len(state.chat_history)} messages):")
@@ -160,133 +537,353 @@ Question contextualisée:"""
         else:
             print("\n💬 MÉMOIRE DE CONVERSATION: (vide)")
         
-        # Create enhanced prompt template
-        enhanced_template = """Tu es un assistant caractérologue expert, à la fois pédagogue et curieux. Ton rôle est de faire découvrir la caractérologie — la science des types de caractère — de manière à la fois précise, vivante et accessible.
-
-Tu réponds aux questions des utilisateurs en t'appuyant rigoureusement sur les connaissances fournies par la base de données intégrée, notamment les travaux de René Le Senne et les typologies reconnues (émotivité, activité, retentissement). Si une réponse n'est pas disponible dans les sources, tu l'indiques honnêtement.
-
-Tu adaptes ton langage et ton niveau d'explication selon le profil de l'utilisateur (novice ou initié). Tu cherches à l'accompagner dans sa compréhension de la caractérologie. S'il pose des questions simples ou générales, tu proposes des compléments pertinents pour approfondir.
-
-Tu es capable d'orienter la conversation de façon naturelle, en suggérant des sujets liés à ce que l'utilisateur vient de dire. Par exemple, tu peux l'inviter à découvrir un autre type psychologique, une dimension caractérologique ou une mise en application concrète.
-
-Tu peux aussi poser des questions ouvertes à l'utilisateur s'il semble curieux mais ne sait pas par où commencer.
-
-Sois clair, structuré et rigoureux. Utilise des exemples concrets si cela peut aider à mieux comprendre. Ton objectif : éveiller l'intérêt, transmettre un savoir solide, et guider pas à pas dans l'univers de la caractérologie.
-
-Adapte la longueur de ta réponse à la complexité de la question : réponse courte pour une question simple, plus développée pour une question complexe ou une demande d'explication détaillée.
-
-IMPORTANT - Utilise les informations suivantes dans cet ordre de priorité :
-
-1. HISTORIQUE DE CONVERSATION (priorité absolue pour comprendre les références comme "ça", "ils", "cette notion") :
-{chat_history}
-
-2. CONTEXTE DOCUMENTAIRE (sources pour informations factuelles) :
-{context}
-
-3. QUESTION ACTUELLE :
-{input}"""
-        
-        # Format chat history for prompt
-        history_text = ""
-        if state.chat_history:
-            for msg in state.chat_history:
-                role = "Utilisateur" if isinstance(msg, HumanMessage) else "Assistant"
-                history_text += f"{role}: {msg.content}\n"
-        else:
-            history_text = "(Aucun historique)"
-        
-        # Format context
-        context_text = ""
-        for doc in state.context:
-            context_text += doc.page_content + "\n\n"
+        # Fit chat history and retrieved chunks to the prompt token budget
+        packed = pack_prompt(ANSWER_TEMPLATE, state.context, state.chat_history, state.question)
         
         # Create final prompt
-        final_prompt = enhanced_template.format(
-            chat_history=history_text,
-            context=context_text,
+        final_prompt = ANSWER_TEMPLATE.format(
+            chat_history=packed.history,
+            context=packed.context,
             input=state.question
         )
         
+        stats = packed.stats
+        print(f"🧮 Prompt: {stats['prompt_tokens']} tokens (historique {stats['history_tokens']}, "
+              f"contexte {stats['context_tokens']}, question {stats['question_tokens']}) - "
+              f"{stats['chunks_packed']}/{stats['chunks_retrieved']} chunks "
+              f"({stats['chunks_deduplicated']} dédoublonnés, {stats['chunks_truncated']} tronqués, "
+              f"{stats['chunks_dropped']} écartés)")
+        
         print(f"\n🤖 PROMPT SYSTÈME UTILISÉ:")
         print("=" * 80)
         print("✅ Prompt avec historique de conversation intégré")
         print("✅ Priorité donnée à l'historique pour les références")
         print("=" * 80)
         
-        # Generate response
-        response = self.llm.invoke(final_prompt)
-        answer = response.content
+        return final_prompt, packed
+    
+    @staticmethod
+    def _generated(answer_parts: List[str], started_at: float, first_token_at: Optional[float],
+                   packed: PackedPrompt, stream_handler, cache_status: Optional[str],
+                   usage: Dict[str, Any]) -> Dict[str, Any]:
+        """Close the stream and build the generate_answer state update with its timings"""
+        finished_at = time.perf_counter()
+        answer = "".join(answer_parts)
+        
+        if stream_handler:
+            stream_handler.on_llm_end(None)
         
-        return {"answer": answer}
+        ttft_ms = (first_token_at - started_at) * 1000 if first_token_at is not None else None
+        total_ms = (finished_at - started_at) * 1000
+        if ttft_ms is not None:
+            print(f"⏱️ Premier token après {ttft_ms:.0f} ms (génération totale: {total_ms:.0f} ms, {len(answer_parts)} tokens)")
+        
+        return {
+            "answer": answer,
+            "trace": {
+                "generate_answer": {
+                    "ttft_ms": ttft_ms,
+                    "total_ms": total_ms,
+                    "streamed_tokens": len(answer_parts),
+                    "prompt": packed.stats,
+                    "llm_cache": cache_status,
+                    "llm": usage
+                }
+            }
+        }
     
-    def invoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    @staticmethod
+    def _replay_answer(answer: str, stream_handler):
+        """Push a stored answer to the stream handler, word by word when a replay speed is set"""
+        if not stream_handler:
+            return
+        words_per_second = PRECOMPUTED_ANSWERS_CONFIG["replay_words_per_second"]
+        if not words_per_second:
+            stream_handler.on_llm_new_token(answer)
+        else:
+            for token in replay_tokens(answer):
+                stream_handler.on_llm_new_token(token)
+                time.sleep(1.0 / words_per_second)
+        stream_handler.on_llm_end(None)
+    
+    def answer_scope(self) -> Tuple[str, str, str]:
+        """(collection, index version, prompt key) under which answers are cached or precomputed"""
+        vectorstore_config = get_vectorstore_config(self.collection_key)
+        collection_name = vectorstore_config["collection_name"]
+        index_version = get_index_version(vectorstore_config["persist_directory"], collection_name)
+        model_name = getattr(self.llm, "model_name", self.llm.__class__.__name__)
+        template_hash = hashlib.sha256(ANSWER_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+        prompt_key = f"{self.prompt_name}:{self.prompt_version or 'latest'}:{model_name}:{template_hash}"
+        return collection_name, index_version, prompt_key
+    
+    def _resolve_memory_manager(self, memory_manager):
+        if memory_manager is None:
+            memory_manager = self.memory_manager
+        if memory_manager is None:
+            raise ValueError("A memory manager is required to invoke a shared LangGraphRAGChain")
+        return memory_manager
+    
+    def _precomputed_lookup(self, question: str, chat_history: List[BaseMessage]):
+        """(store, cache scope, fresh entry or None) for a welcome-screen prompt opening a conversation"""
+        precomputed = self.precomputed_answers if not chat_history else None
+        if precomputed is None:
+            return None, None, None
+        cache_scope = self.answer_scope()
+        entry = precomputed.get(question, cache_scope[1], cache_scope[2])
+        if entry is not None:
+            print(f"⚡ Réponse précalculée servie pour '{question}' (générée le {entry['generated_at']})")
+        return precomputed, cache_scope, entry
+    
+    @staticmethod
+    def _precomputed_result(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {"answer": entry["answer"], "trace": {"precomputed_answer": {
+            "hit": True,
+            "chunk_ids": entry["chunk_ids"],
+            "generated_at": entry["generated_at"]
+        }}}
+    
+    def _answer_cache_lookup(self, cache_scope, question_vector, started_at: float):
+        """(cache trace, cached answer or None) of a standalone question"""
+        cached = self.answer_cache.lookup(*cache_scope, question_vector)
+        stats = self.answer_cache.get_stats()
+        cache_trace = {
+            "hit": cached is not None,
+            "lookup_ms": (time.perf_counter() - started_at) * 1000,
+            "hit_rate": stats["hit_rate"]
+        }
+        print(f"🗄️ Cache sémantique: {stats['hits']}/{stats['hits'] + stats['misses']} "
+              f"({stats['hit_rate']:.0%} de réussite)")
+        
+        if cached is not None:
+            print(f"⚡ Réponse servie depuis le cache (similarité {cached.similarity:.3f} avec "
+                  f"'{cached.question}')")
+            cache_trace.update(similarity=cached.similarity, cached_question=cached.question)
+        return cache_trace, cached
+    
+    def _store_answer(self, question: str, answer: str, final_state: Dict[str, Any], cache_scope,
+                      question_vector, precomputed: Optional[PrecomputedAnswers]):
+        """Keep a generated answer in the semantic cache and, for a welcome-screen prompt, the precomputed store"""
+        if self.answer_cache is not None and question_vector is not None and answer:
+            self.answer_cache.put(*cache_scope, question, question_vector, answer)
+        if precomputed is not None and answer and templated_prompt_id(question):
+            # Missing or stale entry: regenerated from this answer for the next conversations
+            chunk_ids = final_state.get("trace", {}).get("retrieve_context", {}).get("chunk_ids", [])
+            precomputed.put(question, chunk_ids, answer, cache_scope[1], cache_scope[2])
+    
+    def _flight_key(self, question: str, chat_history: List[BaseMessage]) -> str:
+        """Single-flight key: same chain settings, question and conversation history"""
+        request = [self.collection_key, self.prompt_name, self.prompt_version, question.strip(),
+                   [(message.type, message.content) for message in chat_history]]
+        return hashlib.sha256(json.dumps(request, ensure_ascii=False).encode("utf-8")).hexdigest()
+    
+    def _workflow_trace(self, final_state: Dict[str, Any], workflow_ms: float, cache_trace: Dict[str, Any],
+                        flight_trace: Dict[str, Any]) -> Dict[str, Any]:
+        nodes_ms = sum(entry.get("elapsed_ms", 0.0) for entry in final_state.get("trace", {}).values())
+        print(f"⏱️ Workflow: {workflow_ms:.0f} ms (somme des nœuds: {nodes_ms:.0f} ms)")
+        cost_usd = 0.0
+        for node, entry in final_state.get("trace", {}).items():
+            usage = entry.get("llm")
+            if usage is None:
+                continue
+            cost = f"${usage['cost_usd']:.5f}" if usage["cost_usd"] is not None else "coût inconnu"
+            print(f"💰 {node}: {usage['model']} - {entry.get('elapsed_ms', 0.0):.0f} ms, "
+                  f"{usage['input_tokens']} + {usage['output_tokens']} tokens"
+                  f"{' (estimés)' if usage['estimated'] else ''}, {cost}")
+            cost_usd += usage["cost_usd"] or 0.0
+        if self.llm_cache is not None:
+            for node, stats in self.llm_cache.get_stats()["nodes"].items():
+                print(f"🗄️ Cache LLM {node}: {stats['hits']}/{stats['hits'] + stats['misses']} "
+                      f"({stats['hit_rate']:.0%} de réussite)")
+        trace = {**final_state.get("trace", {}),
+                 "workflow": {"total_ms": workflow_ms, "nodes_ms": nodes_ms, "cost_usd": cost_usd}}
+        if cache_trace:
+            trace = {**trace, "answer_cache": cache_trace}
+        if flight_trace:
+            if flight_trace["coalesced"]:
+                print("🤝 Réponse partagée avec une requête identique déjà en cours")
+            trace = {**trace, "single_flight": flight_trace}
+        return trace
+    
+    def invoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None,
+               memory_manager: Optional[LangGraphMemoryManager] = None) -> Dict[str, Any]:
         """
         Invoke the RAG chain with memory management
         
         Args:
             inputs: Input dictionary containing "question"
             config: Optional configuration for callbacks
+            memory_manager: Memory manager of the conversation (default: the chain's own)
             
         Returns:
-            Dictionary containing "answer"
+            Dictionary containing "answer" and the per-node "trace" (e.g. time to first token)
         """
+        memory_manager = self._resolve_memory_manager(memory_manager)
         question = inputs["question"]
-        thread_id = self.memory_manager.get_current_thread()
         
         # Get chat history from memory manager
-        chat_history = self.memory_manager.get_chat_history()
+        chat_history = memory_manager.get_chat_history()
         
-        # Prepare initial state
-        initial_state = RAGState(
-            question=question,
-            chat_history=chat_history
-        )
+        # Handle streaming if specified in config: the handler is passed to the
+        # generate_answer node, which pushes tokens to it as they arrive
+        stream_handler, _ = split_stream_handler((config or {}).get("callbacks"))
         
-        # Handle streaming if specified in config
-        stream_handler = None
-        if config and "callbacks" in config:
-            for cb in config["callbacks"]:
-                if hasattr(cb, '__class__') and 'StreamlitCallbackHandler' in cb.__class__.__name__:
-                    stream_handler = cb
-                    break
+        # Welcome-screen prompts opening a conversation are answered from the stored answers
+        precomputed, cache_scope, entry = self._precomputed_lookup(question, chat_history)
+        if entry is not None:
+            self._replay_answer(entry["answer"], stream_handler)
+            memory_manager.save_context({"question": question}, {"answer": entry["answer"]})
+            return self._precomputed_result(entry)
+        
+        # A standalone question close to an already answered one is served from the cache
+        cache_trace, question_vector = {}, None
+        if self.answer_cache is not None and not chat_history:
+            started_at = time.perf_counter()
+            cache_scope = cache_scope or self.answer_scope()
+            question_vector = self.embeddings.embed_query(question)
+            cache_trace, cached = self._answer_cache_lookup(cache_scope, question_vector, started_at)
+            if cached is not None:
+                self._replay_answer(cached.answer, stream_handler)
+                memory_manager.save_context({"question": question}, {"answer": cached.answer})
+                return {"answer": cached.answer, "trace": {"answer_cache": cache_trace}}
         
         # Run the workflow
-        final_state = self.app.invoke(initial_state)
+        def run_workflow(handler) -> Tuple[Dict[str, Any], float]:
+            workflow_started_at = time.perf_counter()
+            final_state = self.app.invoke(
+                RAGState(question=question, original_question=question, chat_history=chat_history),
+                config={"configurable": {"stream_handler": handler, "workflow_started_at": workflow_started_at}}
+            )
+            workflow_ms = (time.perf_counter() - workflow_started_at) * 1000
+            self._store_answer(question, final_state["answer"], final_state, cache_scope, question_vector,
+                               precomputed)
+            return final_state, workflow_ms
         
-        answer = final_state["answer"]
+        # The same question asked concurrently with the same history attaches to the running workflow
+        flight_trace = {}
+        if self.single_flight is not None:
+            (final_state, workflow_ms), flight_trace = self.single_flight.run(
+                self._flight_key(question, chat_history), run_workflow, stream_handler)
+        else:
+            final_state, workflow_ms = run_workflow(stream_handler)
         
-        # Handle streaming display
-        if stream_handler:
-            import time
-            words = answer.split()
-            displayed_text = ""
-            
-            for i, word in enumerate(words):
-                displayed_text += word + " "
-                if i % 3 == 0:  # Update every 3 words
-                    try:
-                        stream_handler.placeholder.markdown(displayed_text + "▌")
-                        time.sleep(0.05)
-                    except:
-                        pass
-            
-            # Final update without cursor
-            try:
-                stream_handler.placeholder.markdown(displayed_text.strip())
-            except:
-                pass
+        answer = final_state["answer"]
         
         # Save context to memory
-        self.memory_manager.save_context(
+        memory_manager.save_context(
             {"question": question},
             {"answer": answer}
         )
         
-        return {"answer": answer}
+        return {"answer": answer, "trace": self._workflow_trace(final_state, workflow_ms, cache_trace, flight_trace)}
+    
+    async def ainvoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None,
+                      memory_manager: Optional[LangGraphMemoryManager] = None) -> Dict[str, Any]:
+        """
+        Async invoke: same behaviour and result as invoke, without blocking a thread per question
+        
+        The nodes use the async LLM and embeddings clients; the local lookups (answer
+        cache, memory persistence) run in worker threads.
+        """
+        memory_manager = self._resolve_memory_manager(memory_manager)
+        stream_handler, _ = split_stream_handler((config or {}).get("callbacks"))
+        return await self._ainvoke(inputs["question"], memory_manager, stream_handler)
+    
+    async def astream(self, inputs: Dict[str, Any],
+                      memory_manager: Optional[LangGraphMemoryManager] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async stream of the answer: yields {"token": ...} as tokens arrive, then the
+        ainvoke result ({"answer": ..., "trace": ...})
+        """
+        memory_manager = self._resolve_memory_manager(memory_manager)
+        queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(self._ainvoke(inputs["question"], memory_manager,
+                                                 AsyncQueueStreamHandler(queue, asyncio.get_running_loop())))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        
+        while (token := await queue.get()) is not None:
+            yield {"token": token}
+        yield await task
+    
+    async def _ainvoke(self, question: str, memory_manager, stream_handler) -> Dict[str, Any]:
+        chat_history = memory_manager.get_chat_history()
+        
+        precomputed, cache_scope, entry = await asyncio.to_thread(self._precomputed_lookup, question, chat_history)
+        if entry is not None:
+            await asyncio.to_thread(self._replay_answer, entry["answer"], stream_handler)
+            await asave_context(memory_manager, question, entry["answer"])
+            return self._precomputed_result(entry)
+        
+        cache_trace, question_vector = {}, None
+        if self.answer_cache is not None and not chat_history:
+            started_at = time.perf_counter()
+            cache_scope = cache_scope or await asyncio.to_thread(self.answer_scope)
+            question_vector = await self.embeddings.aembed_query(question)
+            cache_trace, cached = await asyncio.to_thread(self._answer_cache_lookup, cache_scope, question_vector,
+                                                          started_at)
+            if cached is not None:
+                await asyncio.to_thread(self._replay_answer, cached.answer, stream_handler)
+                await asave_context(memory_manager, question, cached.answer)
+                return {"answer": cached.answer, "trace": {"answer_cache": cache_trace}}
+        
+        async def run_workflow(handler) -> Tuple[Dict[str, Any], float]:
+            workflow_started_at = time.perf_counter()
+            final_state = await self.app.ainvoke(
+                RAGState(question=question, original_question=question, chat_history=chat_history),
+                config={"configurable": {"stream_handler": handler, "workflow_started_at": workflow_started_at}}
+            )
+            workflow_ms = (time.perf_counter() - workflow_started_at) * 1000
+            await asyncio.to_thread(self._store_answer, question, final_state["answer"], final_state, cache_scope,
+                                    question_vector, precomputed)
+            return final_state, workflow_ms
+        
+        flight_trace = {}
+        if self.single_flight is not None:
+            (final_state, workflow_ms), flight_trace = await self.single_flight.arun(
+                self._flight_key(question, chat_history), run_workflow, stream_handler)
+        else:
+            final_state, workflow_ms = await run_workflow(stream_handler)
+        
+        answer = final_state["answer"]
+        await asave_context(memory_manager, question, answer)
+        
+        return {"answer": answer, "trace": self._workflow_trace(final_state, workflow_ms, cache_trace, flight_trace)}
+
+
+async def asave_context(memory_manager, question: str, answer: str):
+    """Save a turn through the memory manager's async API, or its sync one in a worker thread"""
+    if hasattr(memory_manager, "asave_context"):
+        await memory_manager.asave_context({"question": question}, {"answer": answer})
+    else:
+        await asyncio.to_thread(memory_manager.save_context, {"question": question}, {"answer": answer})
+
+
+class ConversationRAGChain:
+    """
+    Binds a process-wide LangGraphRAGChain to the memory manager of one conversation
+    
+    Cheap to create on every Streamlit rerun: the LLM clients, retriever and compiled
+    workflow live in the shared chain, only the memory is per conversation.
+    """
+    
+    def __init__(self, chain: LangGraphRAGChain, memory_manager: LangGraphMemoryManager):
+        self.chain = chain
+        self.memory_manager = memory_manager
+    
+    def invoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Invoke the shared chain with this conversation's memory"""
+        return self.chain.invoke(inputs, config=config, memory_manager=self.memory_manager)
+    
+    async def ainvoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Async invoke of the shared chain with this conversation's memory"""
+        return await self.chain.ainvoke(inputs, config=config, memory_manager=self.memory_manager)
+    
+    def astream(self, inputs: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Async stream of the shared chain with this conversation's memory"""
+        return self.chain.astream(inputs, memory_manager=self.memory_manager)
 
 
 def setup_langgraph_qa_chain(memory_manager: LangGraphMemoryManager, collection_key: str = None, 
-                            prompt_name: str = "caracterologie_qa", prompt_version: int = None) -> LangGraphRAGChain:
+                            prompt_name: str = "caracterologie_qa", prompt_version: int = None) -> ConversationRAGChain:
     """
     Set up a LangGraph-based RAG chain with memory management
     
@@ -297,9 +894,12 @@ def setup_langgraph_qa_chain(memory_manager: LangGraphMemoryManager, collection_
         prompt_version: Prompt version
         
     Returns:
-        LangGraphRAGChain instance
+        ConversationRAGChain binding the process-wide chain to memory_manager
     """
-    return LangGraphRAGChain(memory_manager, collection_key, prompt_name, prompt_version)
+    from core.resources import get_shared_rag_chain
+    
+    shared_chain = get_shared_rag_chain(collection_key, prompt_name, prompt_version)
+    return ConversationRAGChain(shared_chain, memory_manager)
 
 
 # Backward compatibility function
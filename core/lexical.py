@@ -0,0 +1,171 @@
+from typing import Dict, List, Tuple, Iterable, Optional
+from collections import Counter
+import heapq
+import json
+import math
+import os
+import re
+import unicodedata
+
+
+LEXICAL_DIRECTORY = "lexical"
+
+FRENCH_STOPWORDS = frozenset("""
+a au aux avec ce ces c d dans de des du elle elles en est et eu il ils j je l la le les leur leurs lui m ma
+mais me meme mes moi mon n ne nos notre nous on ou par pas pour qu que qui s sa se ses son sont sur t ta te
+tes toi ton tu un une vos votre vous y etre avoir ete etait sont cette cet comme plus tout tous toute toutes
+""".split())
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def fold_accents(text: str) -> str:
+    """Lowercase and strip diacritics ("Émotivité" -> "emotivite")"""
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def light_stem(token: str) -> str:
+    """
+    Light French stemmer: plural and feminine inflections only
+
+    "émotifs", "émotive" and "émotives" all become "emotiv"; derivational
+    suffixes are kept so that "secondarité" and "secondaire" stay distinct.
+    Short tokens are left alone, so type codes like "nEAS" and "nEA" differ.
+    """
+    if len(token) <= 4:
+        return token
+    if token.endswith("aux") and len(token) > 5:
+        return token[:-3] + "al"
+    if token[-1] in "sx":
+        token = token[:-1]
+    if token.endswith("euse"):
+        return token[:-2]
+    if token.endswith("if"):
+        return token[:-1] + "v"
+    if token.endswith("e") and len(token) > 4:
+        token = token[:-1]
+    return token
+
+
+def analyze(text: str) -> List[str]:
+    """Tokenize French text for the lexical index (accent folding, stopwords, light stemming)"""
+    return [
+        light_stem(token)
+        for token in _TOKEN_PATTERN.findall(fold_accents(text))
+        if token not in FRENCH_STOPWORDS
+    ]
+
+
+class BM25Index:
+    """
+    Okapi BM25 index over the chunks of a collection
+
+    Stores postings (term -> [(chunk position, term frequency)]) and chunk
+    lengths only; chunk texts stay in Chroma and are fetched by ID.
+    """
+
+    def __init__(self, ids: List[str] = None, lengths: List[int] = None,
+                 postings: Dict[str, List[Tuple[int, int]]] = None, k1: float = 1.5, b: float = 0.75):
+        self.ids = ids or []
+        self.lengths = lengths or []
+        self.postings = postings or {}
+        self.k1 = k1
+        self.b = b
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    @classmethod
+    def build(cls, chunks: Iterable[Tuple[str, str]], **params) -> "BM25Index":
+        """Build an index from (chunk ID, text) pairs"""
+        builder = BM25IndexBuilder()
+        for chunk_id, text in chunks:
+            builder.add(chunk_id, text)
+        return builder.build(**params)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (chunk ID, BM25 score) for a query, best first"""
+        if not self.ids:
+            return []
+
+        scores: Dict[int, float] = {}
+        count = len(self.ids)
+        for term in set(analyze(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / self.average_length)
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.ids[position], score) for position, score in best]
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "ids": self.ids,
+                "lengths": self.lengths,
+                "postings": self.postings
+            }, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        postings = {term: [tuple(entry) for entry in entries] for term, entries in data["postings"].items()}
+        return cls(data["ids"], data["lengths"], postings, data["k1"], data["b"])
+
+
+class BM25IndexBuilder:
+    """Accumulates chunk term frequencies, e.g. while chunks stream through ingestion"""
+
+    def __init__(self):
+        self._chunks: Dict[str, Counter] = {}
+
+    def add(self, chunk_id: str, text: str):
+        self._chunks[chunk_id] = Counter(analyze(text))
+
+    def build(self, exclude: Iterable[str] = (), **params) -> BM25Index:
+        excluded = set(exclude)
+        ids, lengths, postings = [], [], {}
+        for chunk_id, frequencies in self._chunks.items():
+            if chunk_id in excluded:
+                continue
+            position = len(ids)
+            ids.append(chunk_id)
+            lengths.append(sum(frequencies.values()))
+            for term, frequency in frequencies.items():
+                postings.setdefault(term, []).append((position, frequency))
+        return BM25Index(ids, lengths, postings, **params)
+
+
+def lexical_index_path(persist_directory: str, collection_name: str) -> str:
+    return os.path.join(persist_directory, LEXICAL_DIRECTORY, f"{collection_name}.json")
+
+
+def load_lexical_index(persist_directory: str, collection_name: str, vectorstore=None) -> Optional[BM25Index]:
+    """
+    Load the lexical index of a collection
+
+    If it was never built (collection indexed before hybrid search existed), it is
+    built from the chunks stored in the vectorstore and saved. Returns None when
+    neither is available.
+    """
+    path = lexical_index_path(persist_directory, collection_name)
+    if os.path.exists(path):
+        return BM25Index.load(path)
+    if vectorstore is None:
+        return None
+
+    stored = vectorstore.get(include=["documents"])
+    index = BM25Index.build(zip(stored["ids"], stored["documents"]))
+    if len(index):
+        index.save(path)
+    return index
@@ -0,0 +1,144 @@
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config.settings import LLM_CACHE_CONFIG
+
+
+def llm_response_key(llm, prompt: str) -> str:
+    """Hash of the model settings that shape a completion and of the rendered prompt"""
+    settings = {
+        "model": getattr(llm, "model_name", llm.__class__.__name__),
+        "temperature": getattr(llm, "temperature", None),
+        "max_tokens": getattr(llm, "max_tokens", None),
+        "prompt": prompt
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Persistent SQLite store of chat model responses keyed by llm_response_key
+
+    Only exact repeats of a rendered prompt hit (e.g. the same contextualization
+    prompt, or the same final prompt after context packing). Entries expire after
+    ttl_seconds; least recently used entries are evicted beyond max_entries or
+    when the stored responses exceed max_size_mb. Hits and misses are counted
+    per workflow node.
+    """
+
+    def __init__(self, db_path: str = None, max_entries: int = None, max_size_mb: float = None,
+                 ttl_seconds: float = None):
+        self.db_path = db_path or LLM_CACHE_CONFIG["db_path"]
+        self.max_entries = max_entries or LLM_CACHE_CONFIG["max_entries"]
+        self.max_bytes = int((max_size_mb or LLM_CACHE_CONFIG["max_size_mb"]) * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds or LLM_CACHE_CONFIG["ttl_seconds"]
+        self.evictions = 0
+        self.node_stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._init_database()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_database(self):
+        """Initialize SQLite table for cached responses"""
+        os.makedirs(os.path.dirname(self.db_path) if os.path.dirname(self.db_path) else ".", exist_ok=True)
+
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                node TEXT,
+                response TEXT,
+                size INTEGER,
+                created_at REAL,
+                last_used REAL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+        conn.commit()
+        conn.close()
+
+    def _record(self, node: str, hit: bool):
+        stats = self.node_stats.setdefault(node, {"hits": 0, "misses": 0})
+        stats["hits" if hit else "misses"] += 1
+
+    def get(self, key: str, node: str) -> Optional[str]:
+        """Cached response for a key (None when missing or expired), counted for node"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute("SELECT response FROM responses WHERE key = ? AND created_at >= ?",
+                           (key, now - self.ttl_seconds))
+            row = cursor.fetchone()
+            if row is not None:
+                cursor.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                conn.commit()
+            conn.close()
+            self._record(node, row is not None)
+        return row[0] if row is not None else None
+
+    def put(self, key: str, node: str, response: str):
+        """Store a response, then drop expired entries and evict beyond max_entries / max_size_mb"""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT OR REPLACE INTO responses (key, node, response, size, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, node, response, size, now, now))
+            cursor.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+
+            cursor.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses")
+            count, total_size = cursor.fetchone()
+            if count > self.max_entries or total_size > self.max_bytes:
+                # Walk the least recently used entries until both limits hold again
+                cursor.execute("SELECT key, size FROM responses ORDER BY last_used ASC")
+                evicted = []
+                for old_key, old_size in cursor.fetchall():
+                    if count <= self.max_entries and total_size <= self.max_bytes:
+                        break
+                    evicted.append((old_key,))
+                    count -= 1
+                    total_size -= old_size
+                cursor.executemany("DELETE FROM responses WHERE key = ?", evicted)
+                self.evictions += len(evicted)
+
+            conn.commit()
+            conn.close()
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            conn.close()
+
+    def __len__(self) -> int:
+        conn = self._connect()
+        count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        conn.close()
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per node since this cache object was created"""
+        with self._lock:
+            return {
+                "evictions": self.evictions,
+                "nodes": {
+                    node: {**stats, "hit_rate": stats["hits"] / (stats["hits"] + stats["misses"])}
+                    for node, stats in self.node_stats.items()
+                }
+            }
@@ -2,23 +2,27 @@ from langchain_openai import ChatOpenAI
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 from config.settings import get_openai_api_key, LLM_CONFIG, get_vectorstore_config
+from core.embedding_cache import with_embedding_cache
+from core.lexical import load_lexical_index
+from core.retrievers import build_retriever
 
-def setup_llm():
-    """Set up the OpenAI LLM"""
+def setup_llm(llm_config: dict = None):
+    """Set up the OpenAI LLM (default: LLM_CONFIG)"""
     openai_api_key = get_openai_api_key()
     return ChatOpenAI(
         openai_api_key=openai_api_key,
-        **LLM_CONFIG
+        **(llm_config or LLM_CONFIG)
     )
 
 def setup_embeddings():
-    """Set up OpenAI embeddings"""
+    """Set up OpenAI embeddings, backed by the persistent embedding cache"""
     openai_api_key = get_openai_api_key()
-    return OpenAIEmbeddings(openai_api_key=openai_api_key)
+    return with_embedding_cache(OpenAIEmbeddings(openai_api_key=openai_api_key))
 
-def setup_vectorstore(collection_key: str = None):
+def setup_vectorstore(collection_key: str = None, embeddings=None):
     """Set up ChromaDB vectorstore with specified collection"""
-    embeddings = setup_embeddings()
+    if embeddings is None:
+        embeddings = setup_embeddings()
     config = get_vectorstore_config(collection_key)
     
     vectorstore = Chroma(
@@ -28,8 +32,13 @@ def setup_vectorstore(collection_key: str = None):
     )
     return vectorstore
 
-def setup_retriever(collection_key: str = None):
-    """Set up the retriever from vectorstore with specified collection"""
-    vectorstore = setup_vectorstore(collection_key)
+def setup_retriever(collection_key: str = None, vectorstore=None):
+    """Set up the retriever of a collection (dense or hybrid BM25 + dense, see its retrieval config)"""
+    if vectorstore is None:
+        vectorstore = setup_vectorstore(collection_key)
     config = get_vectorstore_config(collection_key)
-    return vectorstore.as_retriever(search_kwargs=config["search_kwargs"]) 
\ No newline at end of file
+    
+    lexical_index = None
+    if config["retrieval"]["mode"] == "hybrid":
+        lexical_index = load_lexical_index(config["persist_directory"], config["collection_name"], vectorstore)
+    return build_retriever(vectorstore, config["retrieval"], lexical_index) 
\ No newline at end of file
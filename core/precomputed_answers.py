@@ -0,0 +1,75 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import json
+import os
+import threading
+
+from config.welcome_config import TEMPLATED_PROMPTS
+
+PRECOMPUTED_DIRECTORY = "precomputed"
+
+
+def templated_prompt_id(question: str) -> Optional[str]:
+    """ID of the welcome-screen prompt with this exact text, if any"""
+    for prompt_config in TEMPLATED_PROMPTS:
+        if prompt_config["prompt"] == question.strip():
+            return prompt_config["id"]
+    return None
+
+
+def precomputed_answers_path(persist_directory: str, collection_name: str) -> str:
+    return os.path.join(persist_directory, PRECOMPUTED_DIRECTORY, f"{collection_name}.json")
+
+
+class PrecomputedAnswers:
+    """
+    Stored answers of the welcome-screen prompts for one collection
+
+    Each entry records the retrieved chunk IDs, the generated answer and the
+    version stamps it was generated with (index version of the collection and
+    prompt key); an entry whose stamps differ from the current ones is stale
+    and is never served.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries: Dict[str, Dict[str, Any]] = json.load(f)["entries"]
+        except (OSError, ValueError, KeyError):
+            self.entries = {}
+
+    def get(self, question: str, index_version: str, prompt_key: str) -> Optional[Dict[str, Any]]:
+        """Fresh stored entry for a templated prompt, or None (unknown prompt, missing or stale)"""
+        prompt_id = templated_prompt_id(question)
+        entry = self.entries.get(prompt_id) if prompt_id else None
+        if entry is None or entry["index_version"] != index_version or entry["prompt_key"] != prompt_key:
+            return None
+        return entry
+
+    def is_fresh(self, index_version: str, prompt_key: str) -> bool:
+        """Whether every templated prompt has an up-to-date entry"""
+        return all(self.get(prompt_config["prompt"], index_version, prompt_key) is not None
+                   for prompt_config in TEMPLATED_PROMPTS)
+
+    def put(self, question: str, chunk_ids: List[str], answer: str, index_version: str, prompt_key: str):
+        """Store the answer of a templated prompt (ignored for any other question) and save the file"""
+        prompt_id = templated_prompt_id(question)
+        if prompt_id is None:
+            return
+
+        with self._lock:
+            self.entries[prompt_id] = {
+                "prompt": question.strip(),
+                "chunk_ids": chunk_ids,
+                "answer": answer,
+                "index_version": index_version,
+                "prompt_key": prompt_key,
+                "generated_at": datetime.now().isoformat()
+            }
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temporary = self.path + ".tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump({"entries": self.entries}, f, ensure_ascii=False, indent=2)
+            os.replace(temporary, self.path)
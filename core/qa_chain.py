@@ -3,9 +3,13 @@ from langchain.prompts import PromptTemplate
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains.history_aware_retriever import create_history_aware_retriever
 from langchain.chains.retrieval import create_retrieval_chain
-from core.llm_setup import setup_llm, setup_retriever
+from core.resources import get_shared_llm, get_shared_retriever
+from core.callbacks import split_stream_handler
+from core.contextualization import ContextualizationCounter, create_selective_history_aware_retriever
 from config.prompts import get_qa_prompt
+from config.settings import CONTEXTUALIZATION_CONFIG, get_llm_profile
 import re
+import time
 
 def clean_response(response: str, user_question: str) -> str:
     """
@@ -32,8 +36,9 @@ def clean_response(response: str, user_question: str) -> str:
 
 def setup_qa_chain_with_memory(memory, collection_key: str = None, prompt_name: str = "caracterologie_qa", prompt_version: int = None):
     """Set up a modern RAG chain with proper conversation history integration"""
-    llm = setup_llm()
-    retriever = setup_retriever(collection_key)
+    llm = get_shared_llm()
+    rewrite_llm = get_shared_llm(get_llm_profile("contextualize_question"))
+    retriever = get_shared_retriever(collection_key)
     
     # Create contextualize prompt that includes chat history
     contextualize_q_system_prompt = """Étant donné un historique de conversation et la dernière question de l'utilisateur qui pourrait faire référence au contexte de l'historique de conversation, formulez une question autonome qui peut être comprise sans l'historique de conversation. Ne répondez PAS à la question, reformulez-la uniquement si nécessaire, sinon retournez-la telle quelle."""
@@ -42,10 +47,17 @@ def setup_qa_chain_with_memory(memory, collection_key: str = None, prompt_name:
         contextualize_q_system_prompt + "\n\nHistorique de conversation:\n{chat_history}\n\nQuestion: {input}"
     )
     
-    # Create history-aware retriever
-    history_aware_retriever = create_history_aware_retriever(
-        llm, retriever, contextualize_q_prompt
-    )
+    # Create history-aware retriever (rewriting only history-dependent questions when selective)
+    contextualization_stats = ContextualizationCounter()
+    if CONTEXTUALIZATION_CONFIG["selective"]:
+        history_aware_retriever = create_selective_history_aware_retriever(
+            rewrite_llm, retriever, contextualize_q_prompt, contextualization_stats,
+            CONTEXTUALIZATION_CONFIG["max_followup_tokens"]
+        )
+    else:
+        history_aware_retriever = create_history_aware_retriever(
+            rewrite_llm, retriever, contextualize_q_prompt
+        )
     
     # Create a new prompt template that includes chat history
     # Since the original template uses {context} and {question}, we need to adapt it
@@ -98,6 +110,7 @@ IMPORTANT - Utilise les informations suivantes dans cet ordre de priorité :
             self.rag_chain = rag_chain
             self.memory = memory
             self.stream_handler = None
+            self.contextualization_stats = contextualization_stats
         
         def invoke(self, inputs, config=None):
             # Get chat history from memory
@@ -130,43 +143,46 @@ IMPORTANT - Utilise les informations suivantes dans cet ordre de priorité :
             
             # Extract and store streaming handler separately to avoid threading issues
             stream_handler = None
-            safe_callbacks = []
             
             if config and "callbacks" in config:
-                for cb in config["callbacks"]:
-                    if hasattr(cb, '__class__') and 'StreamlitCallbackHandler' in cb.__class__.__name__:
-                        stream_handler = cb
-                    elif hasattr(cb, '__class__') and 'Streamlit' not in cb.__class__.__name__:
-                        safe_callbacks.append(cb)
-                
+                stream_handler, safe_callbacks = split_stream_handler(config["callbacks"])
                 config = {**config, "callbacks": safe_callbacks}
             
+            trace = {}
+            
             # Invoke the RAG chain (without problematic streaming callbacks)
             if stream_handler:
-                # For streaming, we'll simulate the streaming by chunking the response
-                result = self.rag_chain.invoke(rag_inputs, config=config)
-                answer = result["answer"]
+                # Stream the answer tokens to the placeholder as they are generated
+                result = {}
+                answer_parts = []
+                started_at = time.perf_counter()
+                first_token_at = None
                 
-                # Simulate streaming by updating the placeholder progressively
-                import time
-                words = answer.split()
-                displayed_text = ""
+                for chunk in self.rag_chain.stream(rag_inputs, config=config):
+                    token = chunk.get("answer")
+                    if token is None:
+                        # Non-answer keys (context, input, chat_history) arrive whole
+                        result.update(chunk)
+                        continue
+                    if not token:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    answer_parts.append(token)
+                    stream_handler.on_llm_new_token(token)
                 
-                for i, word in enumerate(words):
-                    displayed_text += word + " "
-                    if i % 3 == 0:  # Update every 3 words
-                        try:
-                            stream_handler.placeholder.markdown(displayed_text + "▌")
-                            time.sleep(0.05)
-                        except:
-                            # If streaming fails, just continue
-                            pass
+                finished_at = time.perf_counter()
+                result["answer"] = "".join(answer_parts)
+                stream_handler.on_llm_end(None)
                 
-                # Final update without cursor
-                try:
-                    stream_handler.placeholder.markdown(displayed_text.strip())
-                except:
-                    pass
+                ttft_ms = (first_token_at - started_at) * 1000 if first_token_at is not None else None
+                trace["generate_answer"] = {
+                    "ttft_ms": ttft_ms,
+                    "total_ms": (finished_at - started_at) * 1000,
+                    "streamed_tokens": len(answer_parts)
+                }
+                if ttft_ms is not None:
+                    print(f"⏱️ Premier token après {ttft_ms:.0f} ms")
             else:
                 # No streaming, just invoke normally
                 result = self.rag_chain.invoke(rag_inputs, config=config)
@@ -201,6 +217,6 @@ IMPORTANT - Utilise les informations suivantes dans cet ordre de priorité :
                 {"answer": result["answer"]}
             )
             
-            return {"answer": result["answer"]}
+            return {"answer": result["answer"], "trace": trace}
     
     return MemoryAwareRAGChain(rag_chain, memory) 
\ No newline at end of file
@@ -0,0 +1,207 @@
+from typing import List, Tuple
+import json
+import os
+import shutil
+
+import numpy as np
+
+from core.indexing import get_index_version
+
+QUANTIZED_DIRECTORY = "quantized"
+READ_PAGE_SIZE = 5000  # Rows fetched from Chroma per request while building
+SCORE_BLOCK_ROWS = 65536  # Codes de-quantized per block during the first pass
+
+
+class QuantizedVectorStore:
+    """
+    Compact on-disk copy of a collection's embeddings for first-pass search
+
+    Files in the store directory:
+        vectors.f32   full-precision float32 matrix, memory-mapped, only read to re-score
+        codes.npy     int8 (per-dimension scaled) or float16 codes, loaded in RAM
+        scales.npy    int8 scale per dimension (x ~= code * scale)
+        norms.npy     exact squared norms of the float32 vectors
+        meta.json     chunk IDs, shape, quantization and the index version it was built from
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.ids: List[str] = self.meta["ids"]
+        self.quantization: str = self.meta["quantization"]
+        count, dimensions = self.meta["count"], self.meta["dimensions"]
+
+        self.codes = np.load(os.path.join(directory, "codes.npy"))
+        self.scales = np.load(os.path.join(directory, "scales.npy")) if self.quantization == "int8" else None
+        self.norms = np.load(os.path.join(directory, "norms.npy"))
+        self.vectors = (
+            np.memmap(os.path.join(directory, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dimensions))
+            if count else np.zeros((0, dimensions), dtype=np.float32)
+        )
+
+    @classmethod
+    def empty(cls, quantization: str = "int8", index_version: str = "unknown") -> "QuantizedVectorStore":
+        """In-memory store of an empty collection (nothing is written to disk)"""
+        store = cls.__new__(cls)
+        store.directory = None
+        store.meta = {"ids": [], "count": 0, "dimensions": 0, "quantization": quantization,
+                      "index_version": index_version}
+        store.ids = []
+        store.quantization = quantization
+        store.codes = np.zeros((0, 0), dtype=np.int8 if quantization == "int8" else np.float16)
+        store.scales = np.ones(0, dtype=np.float32) if quantization == "int8" else None
+        store.norms = np.zeros(0, dtype=np.float32)
+        store.vectors = np.zeros((0, 0), dtype=np.float32)
+        return store
+
+    @property
+    def memory_bytes(self) -> int:
+        """Resident size of the first-pass data (codes, scales, norms)"""
+        return self.codes.nbytes + self.norms.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    @property
+    def full_precision_bytes(self) -> int:
+        return self.meta["count"] * self.meta["dimensions"] * 4
+
+    @staticmethod
+    def build(directory: str, ids: List[str], vector_pages, quantization: str = "int8",
+              index_version: str = "unknown") -> "QuantizedVectorStore":
+        """
+        Write a store from pages of float32 vectors (iterable of (rows, dimensions) arrays)
+
+        Full-precision vectors are streamed to disk first, then quantized block by
+        block from the memory map, so the float32 matrix is never fully in RAM.
+        """
+        if quantization not in ("int8", "float16"):
+            raise ValueError(f"Unknown quantization '{quantization}' (expected 'int8' or 'float16')")
+
+        building = directory + ".building"
+        shutil.rmtree(building, ignore_errors=True)
+        os.makedirs(building)
+
+        count, dimensions = 0, 0
+        with open(os.path.join(building, "vectors.f32"), "wb") as f:
+            for page in vector_pages:
+                page = np.asarray(page, dtype=np.float32)
+                if not len(page):
+                    continue
+                dimensions = page.shape[1]
+                count += len(page)
+                f.write(np.ascontiguousarray(page).tobytes())
+        if count != len(ids):
+            raise ValueError(f"{len(ids)} IDs for {count} vectors")
+
+        vectors = (np.memmap(os.path.join(building, "vectors.f32"), dtype=np.float32, mode="r",
+                             shape=(count, dimensions)) if count else np.zeros((0, 0), dtype=np.float32))
+        blocks = [vectors[start:start + SCORE_BLOCK_ROWS] for start in range(0, count, SCORE_BLOCK_ROWS)]
+
+        norms = np.concatenate([np.einsum("ij,ij->i", block, block) for block in blocks]) if blocks \
+            else np.zeros(0, dtype=np.float32)
+        scales = np.ones(dimensions, dtype=np.float32)
+        if quantization == "int8":
+            maxima = np.max([np.abs(block).max(axis=0) for block in blocks], axis=0) if blocks else scales
+            scales = np.where(maxima > 0, maxima / 127.0, 1.0).astype(np.float32)
+            codes = np.concatenate([np.round(block / scales).astype(np.int8) for block in blocks]) if blocks \
+                else np.zeros((0, dimensions), dtype=np.int8)
+        else:
+            codes = np.concatenate([block.astype(np.float16) for block in blocks]) if blocks \
+                else np.zeros((0, dimensions), dtype=np.float16)
+        del vectors, blocks
+
+        np.save(os.path.join(building, "codes.npy"), codes)
+        np.save(os.path.join(building, "scales.npy"), scales)
+        np.save(os.path.join(building, "norms.npy"), norms.astype(np.float32))
+        with open(os.path.join(building, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": ids,
+                "count": count,
+                "dimensions": dimensions,
+                "quantization": quantization,
+                "index_version": index_version
+            }, f)
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(building, directory)
+        return QuantizedVectorStore(directory)
+
+    def search_vectors(self, query_vectors, k: int, rescore_factor: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k rows for a batch of queries by L2 distance
+
+        The first pass ranks every row on the quantized codes; the best
+        k * rescore_factor candidates are re-scored against the memory-mapped
+        float32 vectors, so only those rows are read from disk.
+
+        Returns:
+            (positions, distances) arrays of shape (queries, k), nearest first
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        count = len(self.ids)
+        k = min(k, count)
+        if k == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty
+
+        projected = queries * self.scales if self.scales is not None else queries
+        approximate = np.empty((len(queries), count), dtype=np.float32)
+        for start in range(0, count, SCORE_BLOCK_ROWS):
+            block = self.codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            approximate[:, start:start + len(block)] = projected @ block.T
+        approximate = self.norms - 2.0 * approximate
+
+        candidate_count = min(count, k * max(rescore_factor, 1))
+        if candidate_count < count:
+            candidates = np.argpartition(approximate, candidate_count - 1, axis=1)[:, :candidate_count]
+        else:
+            candidates = np.broadcast_to(np.arange(count), (len(queries), count))
+
+        positions = np.empty((len(queries), k), dtype=np.int64)
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        query_norms = np.einsum("ij,ij->i", queries, queries)
+        for row, (query, query_candidates) in enumerate(zip(queries, candidates)):
+            rows = np.sort(query_candidates)  # Sequential reads from the memory map
+            exact = self.norms[rows] - 2.0 * (np.asarray(self.vectors[rows]) @ query)
+            best = np.argsort(exact, kind="stable")[:k]
+            positions[row] = rows[best]
+            distances[row] = exact[best] + query_norms[row]
+        return positions, distances
+
+
+def quantized_store_directory(persist_directory: str, collection_name: str) -> str:
+    return os.path.join(persist_directory, QUANTIZED_DIRECTORY, collection_name)
+
+
+def open_quantized_store(vectorstore, persist_directory: str, collection_name: str,
+                         quantization: str = "int8") -> QuantizedVectorStore:
+    """
+    Open the quantized store of a collection, (re)building it from Chroma when it is
+    missing, was built with another quantization, or is older than the collection
+
+    A missing or empty collection gets an in-memory empty store: nothing is
+    persisted until the collection has been indexed.
+    """
+    directory = quantized_store_directory(persist_directory, collection_name)
+    index_version = get_index_version(persist_directory, collection_name)
+    collection = vectorstore._collection
+    count = collection.count()
+    if count == 0:
+        return QuantizedVectorStore.empty(quantization, index_version)
+
+    if os.path.exists(os.path.join(directory, "meta.json")):
+        store = QuantizedVectorStore(directory)
+        if (store.quantization == quantization and store.meta["count"] == count
+                and store.meta["index_version"] == index_version):
+            return store
+
+    print(f"🗜️ Construction de l'index quantifié ({quantization}) pour '{collection_name}'...")
+    ids = []
+
+    def vector_pages():
+        for offset in range(0, count, READ_PAGE_SIZE):
+            page = collection.get(include=["embeddings"], limit=READ_PAGE_SIZE, offset=offset)
+            ids.extend(page["ids"])
+            yield page["embeddings"]
+
+    # ids is filled while build() consumes the pages
+    return QuantizedVectorStore.build(directory, ids, vector_pages(), quantization, index_version)
@@ -0,0 +1,136 @@
+"""
+Process-wide registry of the heavy RAG resources
+
+LLM clients, embeddings, Chroma vectorstores, retrievers and compiled LangGraph
+chains are built once per process with st.cache_resource, keyed by collection
+and LLM configuration, and shared across Streamlit reruns and sessions.
+Per-conversation memory is never stored here: it is passed to each invoke call.
+"""
+import streamlit as st
+from config.settings import (
+    LLM_CONFIG, ANSWER_CACHE_CONFIG, LLM_CACHE_CONFIG, PRECOMPUTED_ANSWERS_CONFIG, SINGLE_FLIGHT_CONFIG,
+    resolve_collection_key, get_vectorstore_config, get_llm_profile
+)
+from core.answer_cache import SemanticAnswerCache
+from core.llm_cache import LLMResponseCache
+from core.single_flight import SingleFlight
+from core.precomputed_answers import PrecomputedAnswers, precomputed_answers_path
+from core.llm_setup import setup_llm, setup_embeddings, setup_vectorstore, setup_retriever
+
+
+def _freeze_config(config: dict) -> tuple:
+    """Turn a config dict into a hashable, order-independent cache key"""
+    return tuple(sorted(config.items()))
+
+
+@st.cache_resource(show_spinner=False)
+def _build_llm(llm_config_key: tuple):
+    return setup_llm(dict(llm_config_key))
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_embeddings():
+    """Get the process-wide embeddings client"""
+    return setup_embeddings()
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_answer_cache():
+    """Get the process-wide semantic answer cache (None when disabled in ANSWER_CACHE_CONFIG)"""
+    if not ANSWER_CACHE_CONFIG["enabled"]:
+        return None
+    return SemanticAnswerCache()
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_llm_cache():
+    """Get the process-wide LLM response cache (None when disabled in LLM_CACHE_CONFIG)"""
+    if not LLM_CACHE_CONFIG["enabled"]:
+        return None
+    return LLMResponseCache()
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_single_flight():
+    """Get the process-wide request coalescing layer (None when disabled in SINGLE_FLIGHT_CONFIG)"""
+    if not SINGLE_FLIGHT_CONFIG["enabled"]:
+        return None
+    return SingleFlight()
+
+
+@st.cache_resource(show_spinner=False)
+def _build_precomputed_answers(collection_key: str):
+    if not PRECOMPUTED_ANSWERS_CONFIG["enabled"]:
+        return None
+    config = get_vectorstore_config(collection_key)
+    return PrecomputedAnswers(precomputed_answers_path(config["persist_directory"], config["collection_name"]))
+
+
+@st.cache_resource(show_spinner=False)
+def _build_vectorstore(collection_key: str):
+    return setup_vectorstore(collection_key, embeddings=get_shared_embeddings())
+
+
+@st.cache_resource(show_spinner=False)
+def _build_retriever(collection_key: str):
+    return setup_retriever(collection_key, vectorstore=_build_vectorstore(collection_key))
+
+
+@st.cache_resource(show_spinner=False)
+def _build_rag_chain(collection_key: str, prompt_name: str, prompt_version, llm_config_key: tuple,
+                     rewrite_llm_config_key: tuple):
+    from core.langgraph_qa_chain import LangGraphRAGChain
+    
+    return LangGraphRAGChain(
+        None,
+        collection_key,
+        prompt_name,
+        prompt_version,
+        llm=_build_llm(llm_config_key),
+        rewrite_llm=_build_llm(rewrite_llm_config_key),
+        retriever=_build_retriever(collection_key),
+        answer_cache=get_shared_answer_cache(),
+        embeddings=get_shared_embeddings(),
+        precomputed_answers=_build_precomputed_answers(collection_key),
+        llm_cache=get_shared_llm_cache(),
+        single_flight=get_shared_single_flight()
+    )
+
+
+def get_shared_llm(llm_config: dict = None):
+    """Get the process-wide chat model for an LLM config (default: LLM_CONFIG)"""
+    return _build_llm(_freeze_config(llm_config or LLM_CONFIG))
+
+
+def get_shared_vectorstore(collection_key: str = None):
+    """Get the process-wide Chroma vectorstore for a collection"""
+    return _build_vectorstore(resolve_collection_key(collection_key))
+
+
+def get_shared_retriever(collection_key: str = None):
+    """Get the process-wide retriever for a collection"""
+    return _build_retriever(resolve_collection_key(collection_key))
+
+
+def get_shared_rag_chain(collection_key: str = None, prompt_name: str = "caracterologie_qa",
+                         prompt_version: int = None):
+    """
+    Get the process-wide LangGraph RAG chain for a collection and prompt
+    
+    The chain holds no conversation state: pass the memory manager to invoke().
+    """
+    return _build_rag_chain(
+        resolve_collection_key(collection_key),
+        prompt_name,
+        prompt_version,
+        _freeze_config(get_llm_profile("generate_answer")),
+        _freeze_config(get_llm_profile("contextualize_question"))
+    )
+
+
+def clear_shared_resources():
+    """Drop every cached resource (e.g. after re-indexing a collection)"""
+    for builder in (_build_rag_chain, _build_retriever, _build_vectorstore, _build_precomputed_answers,
+                    get_shared_answer_cache, get_shared_llm_cache, get_shared_single_flight, get_shared_embeddings,
+                    _build_llm):
+        builder.clear()
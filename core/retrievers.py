@@ -0,0 +1,565 @@
+from typing import Any, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+
+import numpy as np
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from core.quantized_store import open_quantized_store
+
+# Shared by all retrievers: runs the dense search while the lexical search runs in the caller thread
+_SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+
+class ChromaSearchEngine:
+    """
+    Dense search over a Chroma collection, returning documents with their chunk IDs
+
+    All search engines share this interface: embed_query, aembed_query, embed_queries,
+    search, search_by_vector, search_batch, search_batch_by_vector,
+    get_documents and get_vectors (used by the MMR stage).
+    """
+
+    def __init__(self, vectorstore):
+        self.vectorstore = vectorstore
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.vectorstore.embeddings.embed_query(query)
+
+    async def aembed_query(self, query: str) -> List[float]:
+        return await self.vectorstore.embeddings.aembed_query(query)
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several queries with one embeddings request"""
+        return self.vectorstore.embeddings.embed_documents(queries) if queries else []
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """Top-k (document, similarity) pairs, best first (document.id is the chunk ID)"""
+        return self.search_by_vector(self.embed_query(query), k)
+
+    def search_by_vector(self, query_vector, k: int) -> List[Tuple[Document, float]]:
+        return self.search_batch_by_vector([query_vector], k)[0]
+
+    def search_batch(self, queries: List[str], k: int) -> List[List[Tuple[Document, float]]]:
+        """Top-k (document, similarity) pairs for each query"""
+        return self.search_batch_by_vector(self.embed_queries(queries), k)
+
+    def search_batch_by_vector(self, query_vectors, k: int) -> List[List[Tuple[Document, float]]]:
+        if not len(query_vectors):
+            return []
+        results = self.vectorstore._collection.query(
+            query_embeddings=[list(map(float, vector)) for vector in query_vectors],
+            n_results=k,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [
+                (Document(id=chunk_id, page_content=text, metadata=metadata or {}), -distance)
+                for chunk_id, text, metadata, distance in zip(ids, texts, metadatas, distances)
+            ]
+            for ids, texts, metadatas, distances in zip(
+                results["ids"], results["documents"], results["metadatas"], results["distances"]
+            )
+        ]
+
+    def get_documents(self, ids: List[str]) -> Dict[str, Document]:
+        """Fetch documents by chunk ID"""
+        if not ids:
+            return {}
+        stored = self.vectorstore._collection.get(ids=ids, include=["documents", "metadatas"])
+        return {
+            chunk_id: Document(id=chunk_id, page_content=text, metadata=metadata or {})
+            for chunk_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        }
+
+    def get_vectors(self, ids: List[str]) -> np.ndarray:
+        """Embeddings of chunks, one row per ID (in the order of ids)"""
+        stored = self.vectorstore._collection.get(ids=ids, include=["embeddings"])
+        rows = dict(zip(stored["ids"], stored["embeddings"]))
+        return np.asarray([rows[chunk_id] for chunk_id in ids], dtype=np.float32)
+
+
+class NumpySearchEngine:
+    """
+    Exact in-process search over a collection loaded into a float32 NumPy matrix
+
+    For small collections (a few thousand chunks) one matrix multiply beats the
+    Chroma/HNSW round trip. Ranking matches Chroma's default L2 distance:
+    ||q - x||² = ||q||² - 2 q.x + ||x||², with the ||x||² norms precomputed.
+    """
+
+    def __init__(self, vectorstore=None, ids: List[str] = None, embeddings=None,
+                 texts: List[str] = None, metadatas: List[dict] = None, embedding_function=None):
+        if vectorstore is not None:
+            stored = vectorstore._collection.get(include=["embeddings", "documents", "metadatas"])
+            ids, embeddings = stored["ids"], stored["embeddings"]
+            texts, metadatas = stored["documents"], stored["metadatas"]
+            embedding_function = vectorstore.embeddings
+
+        self.embedding_function = embedding_function
+        self.ids = list(ids)
+        self.texts = list(texts)
+        self.metadatas = [metadata or {} for metadata in metadatas]
+        self.positions = {chunk_id: position for position, chunk_id in enumerate(self.ids)}
+        if self.ids:
+            self.matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32).reshape(len(self.ids), -1))
+        else:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.squared_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search_vectors(self, query_vectors, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k rows for a batch of query vectors (one matrix multiply for the whole batch)
+
+        Returns:
+            (positions, distances) arrays of shape (queries, k), nearest first
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        k = min(k, len(self.ids))
+        if k == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty
+
+        # ||x||² - 2 q.x: same order as the L2 distance (||q||² is constant per query)
+        scores = self.squared_norms - 2.0 * (queries @ self.matrix.T)
+        if k < len(self.ids):
+            candidates = np.argpartition(scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(len(self.ids)), (len(queries), len(self.ids)))
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(candidate_scores, axis=1, kind="stable")
+        positions = np.take_along_axis(candidates, order, axis=1)
+
+        query_norms = np.einsum("ij,ij->i", queries, queries)[:, None]
+        distances = np.take_along_axis(candidate_scores, order, axis=1) + query_norms
+        return positions, distances
+
+    def _document(self, position: int) -> Document:
+        return Document(id=self.ids[position], page_content=self.texts[position],
+                        metadata=self.metadatas[position])
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.embedding_function.embed_query(query)
+
+    async def aembed_query(self, query: str) -> List[float]:
+        return await self.embedding_function.aembed_query(query)
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several queries with one embeddings request"""
+        return self.embedding_function.embed_documents(queries) if queries else []
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """Top-k (document, similarity) pairs, best first (document.id is the chunk ID)"""
+        return self.search_by_vector(self.embed_query(query), k)
+
+    def search_by_vector(self, query_vector, k: int) -> List[Tuple[Document, float]]:
+        return self.search_batch_by_vector([query_vector], k)[0]
+
+    def search_batch(self, queries: List[str], k: int) -> List[List[Tuple[Document, float]]]:
+        """Top-k (document, similarity) pairs for each query"""
+        return self.search_batch_by_vector(self.embed_queries(queries), k)
+
+    def search_batch_by_vector(self, query_vectors, k: int) -> List[List[Tuple[Document, float]]]:
+        if not len(query_vectors):
+            return []
+        positions, distances = self.search_vectors(query_vectors, k)
+        return [
+            [(self._document(position), -float(distance)) for position, distance in zip(row, row_distances)]
+            for row, row_distances in zip(positions, distances)
+        ]
+
+    def get_documents(self, ids: List[str]) -> Dict[str, Document]:
+        """Fetch documents by chunk ID"""
+        return {chunk_id: self._document(self.positions[chunk_id]) for chunk_id in ids if chunk_id in self.positions}
+
+    def get_vectors(self, ids: List[str]) -> np.ndarray:
+        """Embeddings of chunks, one row per ID (in the order of ids)"""
+        return self.matrix[[self.positions[chunk_id] for chunk_id in ids]]
+
+
+class QuantizedSearchEngine(ChromaSearchEngine):
+    """
+    Two-stage search over a QuantizedVectorStore (int8 or float16 codes in RAM,
+    float32 vectors re-scored from disk); documents are fetched from Chroma by ID
+    """
+
+    def __init__(self, vectorstore, store, rescore_factor: int = 4):
+        super().__init__(vectorstore)
+        self.store = store
+        self.rescore_factor = rescore_factor
+        self.positions = {chunk_id: position for position, chunk_id in enumerate(store.ids)}
+
+    def __len__(self) -> int:
+        return len(self.store.ids)
+
+    def search_vectors(self, query_vectors, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self.store.search_vectors(query_vectors, k, self.rescore_factor)
+
+    def search_batch_by_vector(self, query_vectors, k: int) -> List[List[Tuple[Document, float]]]:
+        if not len(query_vectors):
+            return []
+        positions, distances = self.search_vectors(query_vectors, k)
+        documents = self.get_documents(list({self.store.ids[position] for position in positions.ravel()}))
+        return [
+            [(documents[self.store.ids[position]], -float(distance))
+             for position, distance in zip(row, row_distances) if self.store.ids[position] in documents]
+            for row, row_distances in zip(positions, distances)
+        ]
+
+    def get_vectors(self, ids: List[str]) -> np.ndarray:
+        """Full-precision embeddings of chunks (read from the memory map), in the order of ids"""
+        return np.asarray(self.store.vectors[[self.positions[chunk_id] for chunk_id in ids]])
+
+
+def make_search_engine(vectorstore, retrieval_config: Dict[str, Any]):
+    """Build the vector search engine selected by a collection's retrieval config"""
+    engine = retrieval_config["engine"]
+    if engine == "numpy":
+        return NumpySearchEngine(vectorstore)
+    if engine == "quantized":
+        store = open_quantized_store(vectorstore, vectorstore._persist_directory, vectorstore._collection.name,
+                                     retrieval_config["quantization"])
+        return QuantizedSearchEngine(vectorstore, store, retrieval_config["rescore_factor"])
+    if engine == "chroma":
+        return ChromaSearchEngine(vectorstore)
+    raise ValueError(f"Unknown search engine '{engine}' (expected 'chroma', 'numpy' or 'quantized')")
+
+
+def reciprocal_rank_fusion(rankings: List[Tuple[List[str], float]], rrf_k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse weighted rankings of chunk IDs: score = sum(weight / (rrf_k + rank))
+
+    Args:
+        rankings: (chunk IDs best first, weight) for each engine
+        rrf_k: Damping constant (60 in the original RRF paper)
+
+    Returns:
+        (chunk ID, fused score) pairs, best first
+    """
+    scores: Dict[str, float] = {}
+    for ids, weight in rankings:
+        for rank, chunk_id in enumerate(ids, 1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + weight / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def maximal_marginal_relevance(relevance, candidate_vectors, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """
+    Greedy maximal marginal relevance selection, vectorized with NumPy
+
+    Cosine similarities between all candidates are computed with one matrix
+    multiply; each of the k steps is then an argmax over
+    lambda * relevance - (1 - lambda) * (max similarity to the selected chunks).
+
+    Args:
+        relevance: Relevance of each candidate to the query (higher is better)
+        candidate_vectors: Candidate embeddings, one row per candidate
+        k: Number of candidates to select
+        lambda_mult: 1 = pure relevance, 0 = pure diversity
+
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    vectors = np.asarray(candidate_vectors, dtype=np.float32)
+    count = len(vectors)
+    if count == 0:
+        return []
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms > 0, norms, 1.0)
+    similarity = unit @ unit.T
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    available = np.ones(count, dtype=bool)
+    # The most relevant candidate always comes first
+    best = int(np.argmax(relevance))
+    selected = [best]
+    available[best] = False
+    redundancy = similarity[best].copy()
+    while len(selected) < min(k, count):
+        scores = np.where(available, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
+
+
+def cosine_relevance(query_vector, candidate_vectors) -> np.ndarray:
+    """Cosine similarity of each candidate to the query"""
+    query = np.asarray(query_vector, dtype=np.float32)
+    vectors = np.asarray(candidate_vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(query) or 1.0)
+    return (vectors @ query) / np.where(norms > 0, norms, 1.0)
+
+
+def dense_relevance(similarity: float) -> float:
+    """Cosine similarity from a search engine score (-squared L2 distance, unit-norm embeddings)"""
+    return 1.0 + similarity / 2.0
+
+
+def adaptive_cutoff(relevance, min_k: int, max_k: int, score_threshold: float = 0.5,
+                    score_gap: float = 0.3) -> int:
+    """
+    Number of candidates to keep from relevance scores sorted best first
+
+    The list is cut before the first candidate beyond min_k that scores below
+    score_threshold * best, or that follows a drop larger than score_gap times
+    the spread of the first max_k scores (a clear break in the distribution).
+
+    Returns:
+        k between min(min_k, candidates) and min(max_k, candidates)
+    """
+    relevance = np.asarray(relevance, dtype=np.float64)[:max_k]
+    count = len(relevance)
+    if count <= min_k:
+        return count
+
+    cut = np.zeros(count, dtype=bool)
+    if relevance[0] > 0:
+        cut |= relevance < score_threshold * relevance[0]
+    spread = relevance[0] - relevance[-1]
+    if spread > 0:
+        cut[1:] |= (relevance[:-1] - relevance[1:]) > score_gap * spread
+    cut[:min_k] = False
+    breaks = np.flatnonzero(cut)
+    return int(breaks[0]) if len(breaks) else count
+
+
+class DenseRetriever(BaseRetriever):
+    """
+    Vector-only retrieval through a search engine (e.g. NumpySearchEngine)
+
+    With mmr enabled, fetch_k candidates are re-ranked by maximal marginal
+    relevance and the k most relevant yet diverse ones are returned. With
+    adaptive_k, k is chosen per query between min_k and max_k from the score
+    distribution (see adaptive_cutoff) and each document carries its cosine
+    similarity in metadata["relevance_score"].
+
+    retrieve_batch answers many queries with one embeddings request and one
+    batched index search. ainvoke embeds with the async embeddings client and
+    runs the index search in the retrieval thread pool.
+    """
+
+    engine: Any
+    k: int = 10
+    mmr: bool = False
+    fetch_k: int = 20
+    mmr_lambda: float = 0.5
+    adaptive_k: bool = False
+    min_k: int = 3
+    max_k: int = 12
+    score_threshold: float = 0.5
+    score_gap: float = 0.3
+
+    def _search_k(self) -> int:
+        """Candidates fetched from the engine for each query"""
+        k = self.max_k if self.adaptive_k else self.k
+        return max(self.fetch_k, k) if self.mmr else k
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        query_vector = self.engine.embed_query(query)
+        return self._select(query_vector, self.engine.search_by_vector(query_vector, self._search_k()))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        query_vector = await self.engine.aembed_query(query)
+        return await asyncio.get_running_loop().run_in_executor(
+            _SEARCH_EXECUTOR, lambda: self._select(query_vector, self.engine.search_by_vector(query_vector,
+                                                                                              self._search_k())))
+
+    def retrieve_batch(self, queries: List[str]) -> List[List[Document]]:
+        """Documents for each query (one embeddings request, one batched search)"""
+        query_vectors = self.engine.embed_queries(queries)
+        return [
+            self._select(query_vector, results)
+            for query_vector, results in zip(query_vectors, self.engine.search_batch_by_vector(query_vectors,
+                                                                                                self._search_k()))
+        ]
+
+    def _select(self, query_vector, results: List[Tuple[Document, float]]) -> List[Document]:
+        """Final documents from the engine candidates (adaptive k, MMR)"""
+        if not self.mmr and not self.adaptive_k:
+            return [document for document, _ in results]
+
+        k = self.max_k if self.adaptive_k else self.k
+        if not results:
+            return []
+        candidates = [document for document, _ in results]
+        relevance = [dense_relevance(score) for _, score in results]
+        if self.adaptive_k:
+            k = adaptive_cutoff(relevance, self.min_k, self.max_k, self.score_threshold, self.score_gap)
+
+        if self.mmr:
+            vectors = self.engine.get_vectors([document.id for document in candidates])
+            selected = maximal_marginal_relevance(cosine_relevance(query_vector, vectors), vectors, k,
+                                                  self.mmr_lambda)
+        else:
+            selected = range(k)
+
+        if not self.adaptive_k:
+            return [candidates[index] for index in selected]
+        return [
+            Document(id=candidates[index].id, page_content=candidates[index].page_content,
+                     metadata={**candidates[index].metadata, "relevance_score": relevance[index]})
+            for index in selected
+        ]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Lexical (BM25) + dense retrieval fused with reciprocal rank fusion
+
+    Both searches run concurrently; the fused top-k documents carry their fused
+    score in metadata["rrf_score"]. With mmr enabled, the fused top fetch_k are
+    re-ranked by maximal marginal relevance (relevance = fused score). With
+    adaptive_k, k is chosen per query between min_k and max_k from the cosine
+    similarities of the fused candidates (see adaptive_cutoff), which each
+    document carries in metadata["relevance_score"]; fused ranks only measure
+    agreement between the two lists, not closeness to the query.
+
+    retrieve_batch embeds and searches all queries at once on the dense side
+    while the BM25 searches run in the caller thread. ainvoke embeds with the
+    async embeddings client, then runs both searches in the retrieval thread pool.
+    """
+
+    engine: Any
+    lexical_index: Any = None
+    k: int = 10
+    dense_k: int = 20
+    lexical_k: int = 20
+    dense_weight: float = 1.0
+    lexical_weight: float = 1.0
+    rrf_k: int = 60
+    mmr: bool = False
+    fetch_k: int = 20
+    mmr_lambda: float = 0.5
+    adaptive_k: bool = False
+    min_k: int = 3
+    max_k: int = 12
+    score_threshold: float = 0.5
+    score_gap: float = 0.3
+
+    def _dense_search(self, query: str) -> Tuple[List[float], List[Tuple[Document, float]]]:
+        query_vector = self.engine.embed_query(query)
+        return query_vector, self.engine.search_by_vector(query_vector, self.dense_k)
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        dense_future = _SEARCH_EXECUTOR.submit(self._dense_search, query)
+        lexical_results = self.lexical_index.search(query, self.lexical_k) if self.lexical_index else []
+        query_vector, dense_results = dense_future.result()
+        return self._fuse(dense_results, lexical_results, query_vector)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        loop = asyncio.get_running_loop()
+        query_vector = await self.engine.aembed_query(query)
+        dense_results, lexical_results = await asyncio.gather(
+            loop.run_in_executor(_SEARCH_EXECUTOR, self.engine.search_by_vector, query_vector, self.dense_k),
+            loop.run_in_executor(_SEARCH_EXECUTOR, self.lexical_index.search, query, self.lexical_k)
+            if self.lexical_index else asyncio.sleep(0, result=[])
+        )
+        return await loop.run_in_executor(_SEARCH_EXECUTOR, self._fuse, dense_results, lexical_results, query_vector)
+
+    def retrieve_batch(self, queries: List[str]) -> List[List[Document]]:
+        """Documents for each query (one embeddings request, one batched dense search)"""
+        def dense_search():
+            query_vectors = self.engine.embed_queries(queries)
+            return query_vectors, self.engine.search_batch_by_vector(query_vectors, self.dense_k)
+
+        dense_future = _SEARCH_EXECUTOR.submit(dense_search)
+        lexical_results = [self.lexical_index.search(query, self.lexical_k) if self.lexical_index else []
+                           for query in queries]
+        query_vectors, dense_results = dense_future.result()
+        return [self._fuse(dense, lexical, query_vector)
+                for query_vector, dense, lexical in zip(query_vectors, dense_results, lexical_results)]
+
+    def _fuse(self, dense_results: List[Tuple[Document, float]], lexical_results: List[Tuple[str, float]],
+              query_vector=None) -> List[Document]:
+        """Fuse the dense and BM25 rankings of one query into the final documents"""
+        k = self.max_k if self.adaptive_k else self.k
+        fused = reciprocal_rank_fusion([
+            ([document.id for document, _ in dense_results], self.dense_weight),
+            ([chunk_id for chunk_id, _ in lexical_results], self.lexical_weight)
+        ], self.rrf_k)[:max(self.fetch_k, k) if self.mmr else k]
+
+        documents = {document.id: document for document, _ in dense_results}
+        documents.update(self.engine.get_documents([chunk_id for chunk_id, _ in fused if chunk_id not in documents]))
+        fused = [(chunk_id, score) for chunk_id, score in fused if chunk_id in documents]
+
+        relevance = {}
+        if self.adaptive_k and fused:
+            relevance = self._relevance(fused, dense_results, query_vector)
+            ranked = sorted(fused, key=lambda item: relevance[item[0]], reverse=True)
+            k = adaptive_cutoff([relevance[chunk_id] for chunk_id, _ in ranked], self.min_k, self.max_k,
+                                self.score_threshold, self.score_gap)
+            if not self.mmr:
+                # Keep the k most similar candidates, in fused order
+                kept = {chunk_id for chunk_id, _ in ranked[:k]}
+                fused = [(chunk_id, score) for chunk_id, score in fused if chunk_id in kept]
+        if self.mmr and fused:
+            vectors = self.engine.get_vectors([chunk_id for chunk_id, _ in fused])
+            mmr_relevance = np.array([score for _, score in fused]) / fused[0][1]
+            fused = [fused[index] for index in maximal_marginal_relevance(mmr_relevance, vectors, k,
+                                                                          self.mmr_lambda)]
+        else:
+            fused = fused[:k]
+
+        return [
+            Document(
+                id=chunk_id,
+                page_content=documents[chunk_id].page_content,
+                metadata={**documents[chunk_id].metadata, "rrf_score": score,
+                          **({"relevance_score": relevance[chunk_id]} if relevance else {})}
+            )
+            for chunk_id, score in fused
+        ]
+
+    def _relevance(self, fused: List[Tuple[str, float]], dense_results: List[Tuple[Document, float]],
+                   query_vector) -> Dict[str, float]:
+        """Cosine similarity to the query of each fused candidate (engine vectors for BM25-only hits)"""
+        relevance = {document.id: dense_relevance(score) for document, score in dense_results}
+        lexical_only = [chunk_id for chunk_id, _ in fused if chunk_id not in relevance]
+        if lexical_only:
+            similarities = cosine_relevance(query_vector, self.engine.get_vectors(lexical_only))
+            relevance.update(zip(lexical_only, similarities.tolist()))
+        return relevance
+
+
+def retrieve_batch(retriever: BaseRetriever, queries: List[str]) -> List[List[Document]]:
+    """
+    Documents for each query, with one embeddings request and one batched search
+    when the retriever supports it (engine-based retrievers and plain Chroma
+    similarity retrievers), falling back to concurrent single queries otherwise
+    """
+    if hasattr(retriever, "retrieve_batch"):
+        return retriever.retrieve_batch(queries)
+    if getattr(retriever, "search_type", None) == "similarity" and hasattr(retriever.vectorstore, "_collection") \
+            and not retriever.search_kwargs.keys() - {"k"}:
+        engine = ChromaSearchEngine(retriever.vectorstore)
+        k = retriever.search_kwargs.get("k", 4)
+        return [[document for document, _ in results] for results in engine.search_batch(queries, k)]
+    return retriever.batch(queries)
+
+
+def build_retriever(vectorstore, retrieval_config: Dict[str, Any], lexical_index=None) -> BaseRetriever:
+    """Build the retriever described by a collection's retrieval config (mode, search engine, MMR, adaptive k)"""
+    if retrieval_config["mode"] != "hybrid" and retrieval_config["engine"] == "chroma" \
+            and not retrieval_config["mmr"] and not retrieval_config["adaptive_k"]:
+        return vectorstore.as_retriever(search_kwargs={"k": retrieval_config["k"]})
+    
+    engine = make_search_engine(vectorstore, retrieval_config)
+    selection_params = {name: retrieval_config[name] for name in
+                  ("mmr", "fetch_k", "mmr_lambda", "adaptive_k", "min_k", "max_k", "score_threshold", "score_gap")}
+    if retrieval_config["mode"] == "hybrid":
+        return HybridRetriever(
+            engine=engine,
+            lexical_index=lexical_index,
+            **{name: retrieval_config[name] for name in
+               ("k", "dense_k", "lexical_k", "dense_weight", "lexical_weight", "rrf_k")},
+            **selection_params
+        )
+    return DenseRetriever(engine=engine, k=retrieval_config["k"], **selection_params)
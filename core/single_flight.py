@@ -0,0 +1,180 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import threading
+
+from config.settings import SINGLE_FLIGHT_CONFIG
+
+
+class _Flight:
+    """One in-flight computation: the tokens streamed so far, then its result or error"""
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.done = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+        self.condition = threading.Condition()
+        # (event loop, event) of each async waiter, set from whichever thread publishes
+        self.listeners: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def _notify(self):
+        """Wake the thread waiters and the async waiters (caller holds the condition)"""
+        self.condition.notify_all()
+        for loop, event in self.listeners:
+            loop.call_soon_threadsafe(event.set)
+
+    def publish(self, token: str):
+        with self.condition:
+            self.tokens.append(token)
+            self._notify()
+
+    def finish(self, result: Any, error: Optional[BaseException]):
+        with self.condition:
+            self.result, self.error, self.done = result, error, True
+            self._notify()
+
+    def wait(self, seen: int, timeout: float) -> Tuple[List[str], bool]:
+        """Tokens after the first `seen` ones (blocking until there are some or the flight ends)"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.done or len(self.tokens) > seen, timeout):
+                raise TimeoutError("Timed out waiting for the in-flight answer")
+            return self.tokens[seen:], self.done
+
+    async def await_tokens(self, seen: int, timeout: float) -> Tuple[List[str], bool]:
+        """Async wait: the event loop is woken through an asyncio.Event, no thread is parked"""
+        event = asyncio.Event()
+        listener = (asyncio.get_running_loop(), event)
+        with self.condition:
+            if self.done or len(self.tokens) > seen:
+                return self.tokens[seen:], self.done
+            self.listeners.append(listener)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("Timed out waiting for the in-flight answer") from None
+        finally:
+            with self.condition:
+                self.listeners.remove(listener)
+        with self.condition:
+            return self.tokens[seen:], self.done
+
+
+class _FanOutHandler:
+    """Stream handler of the leader: records every token for the waiters and forwards it to the leader's handler"""
+
+    def __init__(self, flight: _Flight, stream_handler):
+        self.flight = flight
+        self.stream_handler = stream_handler
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.flight.publish(token)
+        if self.stream_handler:
+            self.stream_handler.on_llm_new_token(token)
+
+    def on_llm_end(self, *args, **kwargs):
+        if self.stream_handler:
+            self.stream_handler.on_llm_end(*args, **kwargs)
+
+
+class SingleFlight:
+    """
+    Process-wide coalescing of identical in-flight requests
+
+    The first request for a key (the leader) runs the computation; requests for
+    the same key arriving before it finishes (waiters) attach to it instead of
+    computing again. Every waiter receives the leader's streamed tokens on its
+    own stream handler, then the leader's result (or its exception).
+    """
+
+    def __init__(self, wait_timeout_seconds: float = None):
+        self.wait_timeout_seconds = wait_timeout_seconds or SINGLE_FLIGHT_CONFIG["wait_timeout_seconds"]
+        self.leaders = 0
+        self.coalesced = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: str) -> Tuple[_Flight, bool]:
+        """The flight of a key and whether the caller leads it"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                return flight, True
+            flight.waiters += 1
+            self.coalesced += 1
+            return flight, False
+
+    def _land(self, key: str, flight: _Flight, result: Any = None, error: BaseException = None):
+        with self._lock:
+            del self._flights[key]
+        flight.finish(result, error)
+
+    @staticmethod
+    def _trace(flight: _Flight, leader: bool) -> Dict[str, Any]:
+        return {"coalesced": not leader, "waiters": flight.waiters}
+
+    def run(self, key: str, compute: Callable[[Any], Any], stream_handler=None) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Result of compute(stream_handler) for a key, shared with concurrent callers of the same key
+
+        Returns:
+            Tuple (result, {"coalesced": whether another request computed it, "waiters": count})
+        """
+        flight, leader = self._join(key)
+        if leader:
+            try:
+                result = compute(_FanOutHandler(flight, stream_handler))
+            except BaseException as e:
+                self._land(key, flight, error=e)
+                raise
+            self._land(key, flight, result=result)
+            return result, self._trace(flight, leader)
+
+        seen, done = 0, False
+        while not done:
+            tokens, done = flight.wait(seen, self.wait_timeout_seconds)
+            seen += len(tokens)
+            for token in tokens:
+                if stream_handler:
+                    stream_handler.on_llm_new_token(token)
+        return self._follow(flight, stream_handler), self._trace(flight, leader)
+
+    async def arun(self, key: str, acompute: Callable[[Any], Any], stream_handler=None) -> Tuple[Any, Dict[str, Any]]:
+        """Async run: the leader awaits acompute, waiters are woken on their event loop as tokens arrive"""
+        flight, leader = self._join(key)
+        if leader:
+            try:
+                result = await acompute(_FanOutHandler(flight, stream_handler))
+            except BaseException as e:
+                self._land(key, flight, error=e)
+                raise
+            self._land(key, flight, result=result)
+            return result, self._trace(flight, leader)
+
+        seen, done = 0, False
+        while not done:
+            tokens, done = await flight.await_tokens(seen, self.wait_timeout_seconds)
+            seen += len(tokens)
+            for token in tokens:
+                if stream_handler:
+                    stream_handler.on_llm_new_token(token)
+        return self._follow(flight, stream_handler), self._trace(flight, leader)
+
+    @staticmethod
+    def _follow(flight: _Flight, stream_handler) -> Any:
+        if flight.error is not None:
+            raise flight.error
+        if stream_handler:
+            stream_handler.on_llm_end(None)
+        return flight.result
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.coalesced
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+            "coalesced_rate": self.coalesced / total if total else 0.0
+        }
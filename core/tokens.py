@@ -0,0 +1,69 @@
+from typing import Any, Callable, Dict, Optional
+from functools import lru_cache
+
+import tiktoken
+
+from config.settings import LLM_PRICING
+
+
+def _approximate_token_count(text: str) -> int:
+    """Rough estimate (~4 characters per token) used when no tokenizer is available"""
+    return len(text) // 4 + 1
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(model_name: str) -> Callable[[str], int]:
+    """
+    Get a cached token counting function for a model
+
+    Falls back to the cl100k_base encoding for unknown models, and to a character
+    based estimate when tiktoken cannot load its encoding files (e.g. offline).
+    """
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"⚠️ Tokenizer indisponible pour {model_name} ({e}), estimation approximative des tokens")
+        return _approximate_token_count
+
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str, model_name: str) -> int:
+    """Count the tokens of text for a model"""
+    return get_token_counter(model_name)(text)
+
+
+def llm_cost(model_name: str, input_tokens: int, output_tokens: int) -> Optional[float]:
+    """Cost in USD of a call (None for a model missing from LLM_PRICING)"""
+    pricing = LLM_PRICING.get(model_name)
+    if pricing is None:
+        return None
+    return (input_tokens * pricing["input"] + output_tokens * pricing["output"]) / 1_000_000
+
+
+def llm_usage(llm, prompt: str, completion: str, usage_metadata: Optional[Dict[str, Any]] = None,
+              cached: bool = False) -> Dict[str, Any]:
+    """
+    Model, token counts and cost of one LLM call
+
+    Token counts come from the API usage report when available, otherwise they
+    are estimated with the model's tokenizer; a cached completion costs nothing.
+    """
+    model_name = getattr(llm, "model_name", llm.__class__.__name__)
+    if cached:
+        input_tokens, output_tokens, estimated = 0, 0, False
+    elif usage_metadata:
+        input_tokens, output_tokens, estimated = usage_metadata["input_tokens"], usage_metadata["output_tokens"], False
+    else:
+        input_tokens, output_tokens = count_tokens(prompt, model_name), count_tokens(completion, model_name)
+        estimated = True
+    return {
+        "model": model_name,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "estimated": estimated,
+        "cost_usd": llm_cost(model_name, input_tokens, output_tokens)
+    }
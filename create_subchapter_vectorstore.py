@@ -2,10 +2,13 @@ from langchain_community.document_loaders import PyPDFLoader
 from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain.schema import Document
+from core.embedding_cache import with_embedding_cache
+from core.indexing import sync_collection
+from core.corpus import CorpusStore, CorpusChunk, TextSpan, content_size, merge_chunks
 import os
 import re
 from datetime import datetime
-from typing import List, Tuple
+from typing import List, Tuple, Iterable, Iterator
 
 # Configuration
 PDF_PATH = "documents/traite_caracterologie.pdf"
@@ -38,36 +41,53 @@ class SubChapterChunker:
         self.roman_pattern = re.compile(r'^(\s*)([IVX]+)\.\s+([A-ZÀÂÄÉÈÊËÏÎÔÖÙÛÜÇ][^\n]{10,100})', re.MULTILINE)
         # Major headings
         self.major_pattern = re.compile(r'^(\s*)(CHAPITRE|PARTIE|SECTION|INTRODUCTION|PRÉFACE|CONCLUSION)\s*([^\n]*)', re.MULTILINE)
+        # All three patterns as one alternation, so the text is scanned in a single pass
+        self.section_pattern = re.compile(
+            r'^(\s*)(?:'
+            r'(?P<numbered>\d+)\.\s+(?P<numbered_title>[A-ZÀÂÄÉÈÊËÏÎÔÖÙÛÜÇ][^\n]{10,100})'
+            r'|(?P<roman>[IVX]+)\.\s+(?P<roman_title>[A-ZÀÂÄÉÈÊËÏÎÔÖÙÛÜÇ][^\n]{10,100})'
+            r'|(?P<major>CHAPITRE|PARTIE|SECTION|INTRODUCTION|PRÉFACE|CONCLUSION)\s*(?P<major_title>[^\n]*)'
+            r')',
+            re.MULTILINE
+        )
     
-    def find_section_breaks(self, text: str) -> List[Tuple[int, str, str]]:
-        """Find all section breaks in the text"""
+    def find_section_breaks(self, text: str, start: int = 0) -> List[Tuple[int, str, str]]:
+        """
+        Find all section breaks in the text (from position start), sorted by position
+
+        Single pass over the text with the combined section pattern. A heading whose
+        title runs onto the following lines (e.g. "PRÉFACE\n\n1. ...") does not hide
+        the headings on those lines: scanning resumes at the end of the heading line,
+        while a pattern cannot match again before the end of its previous match.
+        This gives the same breaks as scanning separately with each pattern.
+        """
         breaks = []
-        
-        # Find numbered sections
-        for match in self.numbered_pattern.finditer(text):
-            start_pos = match.start()
-            section_num = match.group(2)
-            title = match.group(3).strip()
-            breaks.append((start_pos, f"Section {section_num}", title))
-        
-        # Find roman numeral sections
-        for match in self.roman_pattern.finditer(text):
-            start_pos = match.start()
-            roman_num = match.group(2)
-            title = match.group(3).strip()
-            breaks.append((start_pos, f"Chapter {roman_num}", title))
-        
-        # Find major headings
-        for match in self.major_pattern.finditer(text):
-            start_pos = match.start()
-            heading_type = match.group(2)
-            title = match.group(3).strip() if match.group(3) else ""
-            breaks.append((start_pos, heading_type, title))
-        
-        # Sort by position
-        breaks.sort(key=lambda x: x[0])
+        blocked_until = {"numbered": 0, "roman": 0, "major": 0}
+
+        pos = start
+        while True:
+            match = self.section_pattern.search(text, pos)
+            if not match:
+                break
+
+            kind = "numbered" if match.group("numbered") else "roman" if match.group("roman") else "major"
+            if match.start() >= blocked_until[kind]:
+                blocked_until[kind] = match.end()
+                if kind == "numbered":
+                    breaks.append((match.start(), f"Section {match.group('numbered')}", match.group("numbered_title").strip()))
+                elif kind == "roman":
+                    breaks.append((match.start(), f"Chapter {match.group('roman')}", match.group("roman_title").strip()))
+                else:
+                    breaks.append((match.start(), match.group("major"), match.group("major_title").strip()))
+
+            line_end = text.find("\n", match.end(1))
+            if line_end == -1 or line_end >= match.end():
+                pos = match.end()
+            else:
+                pos = line_end
+
         return breaks
-    
+
     def split_text_by_sections(self, text: str, source_metadata: dict = None) -> List[Document]:
         """Split text into documents based on section breaks"""
         breaks = self.find_section_breaks(text)
@@ -112,129 +132,291 @@ class SubChapterChunker:
         
         return documents
     
-    def optimize_chunk_sizes(self, documents: List[Document]) -> List[Document]:
-        """Optimize chunk sizes by merging small chunks and splitting large ones"""
-        optimized = []
-        i = 0
+    def iter_sections(self, pages: Iterable[Document], source_metadata: dict = None,
+                      corpus: CorpusStore = None, corpus_doc_id: str = None) -> Iterator[Document]:
+        """
+        Split a stream of pages into section documents, yielding each section as soon as it is complete
+        
+        Only the currently open section is kept in memory. Pages are joined with a
+        blank line, as in split_text_by_sections. Breaks are only accepted once they
+        are further than a carry-over window from the end of the buffer; the window
+        is re-scanned when the next page arrives, so a heading at the edge of a page
+        is matched exactly as in the whole text. Section metadata records the first
+        and last page the section spans.
+        
+        With a corpus store, the joined text is appended to corpus_doc_id as pages
+        arrive and sections are yielded as CorpusChunk spans instead of text copies.
+        """
+        carry_window = 200  # Longer than any heading line
+        # Buffer text as a list of parts (separators and pages), only joined when a section is closed
+        parts = []
+        buffer_length = 0
+        buffer_start = 0  # Offset of buffer[0] in the joined text (and in the corpus document)
+        page_offsets = []  # (offset in buffer, page number), ascending
+        section = None  # (section_type, title) of the open section, starting at buffer[0]
+        section_number = 0
         
-        while i < len(documents):
-            current_doc = documents[i]
-            current_size = len(current_doc.page_content)
+        def page_at(offset):
+            page = page_offsets[0][1]
+            for page_offset, page_number in page_offsets:
+                if page_offset > offset:
+                    break
+                page = page_number
+            return page
+        
+        def buffer_text():
+            if len(parts) > 1:
+                parts[:] = ["".join(parts)]
+            return parts[0] if parts else ""
+        
+        def buffer_tail(offset):
+            """buffer[offset:], joining only the parts it spans"""
+            tail, end = [], buffer_length
+            for part in reversed(parts):
+                if end <= offset:
+                    break
+                end -= len(part)
+                tail.append(part[max(offset - end, 0):])
+            return "".join(reversed(tail))
+        
+        def make_document(start, end, section_type, title, page_start, page_end, strip=True):
+            content = buffer_text()[start:end]
+            if strip:
+                stripped = content.lstrip()
+                start += len(content) - len(stripped)
+                content = stripped.rstrip()
+                end = start + len(content)
+                if not content:
+                    return None
+            
+            metadata = {
+                "section_type": section_type,
+                "section_title": title,
+                "section_number": section_number,
+                "chunk_size": len(content),
+                "page_start": page_start,
+                "page_end": page_end,
+                **(source_metadata or {})
+            }
+            if corpus is not None:
+                return CorpusChunk(corpus, [TextSpan(corpus_doc_id, buffer_start + start, buffer_start + end)], metadata)
+            return Document(page_content=content, metadata=metadata)
+        
+        def close_sections(scan_from, limit):
+            nonlocal parts, buffer_length, buffer_start, page_offsets, section, section_number
+            cut = 0
+            # Scan the text after scan_from, with the character before it for the ^ anchor
+            window_start = max(scan_from - 1, 0)
+            breaks = self.find_section_breaks(buffer_tail(window_start), scan_from - window_start)
+            for start_pos, section_type, title in ((window_start + position, section_type, title)
+                                                   for position, section_type, title in breaks):
+                if start_pos >= limit:
+                    break
+                if section is not None and start_pos == 0:
+                    continue
+                if section is not None:
+                    document = make_document(cut, start_pos, *section, page_at(cut), page_at(start_pos))
+                    if document is not None:
+                        yield document
+                # Text before the first break is dropped, as in split_text_by_sections
+                section = (section_type, title)
+                section_number += 1
+                cut = start_pos
+            if cut:
+                page_offsets = [(0, page_at(cut))] + [(offset - cut, number) for offset, number in page_offsets
+                                                      if offset > cut]
+                parts = [buffer_text()[cut:]]
+                buffer_length -= cut
+                buffer_start += cut
+        
+        scan_from = 0
+        for page in pages:
+            separator = "\n\n" if page_offsets else ""
+            parts.append(separator)
+            page_offsets.append((buffer_length + len(separator), page.metadata.get("page", len(page_offsets)) + 1))
+            parts.append(page.page_content)
+            buffer_length += len(separator) + len(page.page_content)
+            if corpus is not None:
+                corpus.append(corpus_doc_id, separator + page.page_content)
+            
+            limit = buffer_length - carry_window
+            if limit > scan_from:
+                before = buffer_length
+                yield from close_sections(scan_from, limit)
+                # Next scan starts at the carry-over window (shifted if the buffer was cut)
+                scan_from = limit - (before - buffer_length)
+        
+        if not page_offsets:
+            return
+        
+        yield from close_sections(scan_from, buffer_length + 1)
+        
+        if section is not None:
+            document = make_document(0, buffer_length, *section, page_at(0), page_offsets[-1][1])
+            if document is not None:
+                yield document
+        else:
+            # Fallback: no section break in the whole text, return it as one document
+            document = make_document(0, buffer_length, "full_document", "Complete Document",
+                                     page_offsets[0][1], page_offsets[-1][1], strip=False)
+            del document.metadata["section_number"]
+            yield document
+    
+    def iter_optimized_chunks(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """
+        Optimize chunk sizes by merging small chunks and splitting large ones
+        
+        Works on a stream of documents with a one-document lookahead, yielding each
+        final chunk as soon as it is decided. Corpus chunks stay spans: merged
+        chunks list the spans of their sections and split parts are sub-spans.
+        """
+        iterator = iter(documents)
+        pending = next(iterator, None)
+        
+        while pending is not None:
+            current_doc = pending
+            pending = next(iterator, None)
+            current_size = content_size(current_doc)
             
             # If chunk is too small, try to merge with next chunks
-            if current_size < MIN_CHUNK_SIZE and i + 1 < len(documents):
-                merged_content = current_doc.page_content
+            if current_size < MIN_CHUNK_SIZE and pending is not None:
+                # Collect the parts and track the merged size; the text is joined once
+                merged_parts = [current_doc]
+                merged_size = current_size
                 merged_metadata = current_doc.metadata.copy()
                 merged_sections = [merged_metadata.get("section_title", "")]
                 
-                j = i + 1
-                while j < len(documents) and len(merged_content) < TARGET_CHUNK_SIZE:
-                    next_doc = documents[j]
-                    if len(merged_content) + len(next_doc.page_content) <= MAX_CHUNK_SIZE:
-                        merged_content += "\n\n" + next_doc.page_content
-                        merged_sections.append(next_doc.metadata.get("section_title", ""))
-                        j += 1
+                while pending is not None and merged_size < TARGET_CHUNK_SIZE:
+                    pending_size = content_size(pending)
+                    if merged_size + pending_size <= MAX_CHUNK_SIZE:
+                        merged_parts.append(pending)
+                        merged_size += 2 + pending_size
+                        merged_sections.append(pending.metadata.get("section_title", ""))
+                        if "page_end" in pending.metadata:
+                            merged_metadata["page_end"] = pending.metadata["page_end"]
+                        pending = next(iterator, None)
                     else:
                         break
                 
                 # Update metadata for merged chunk
                 merged_metadata.update({
                     "section_title": " | ".join(filter(None, merged_sections)),
-                    "chunk_size": len(merged_content),
+                    "chunk_size": merged_size,
                     "merged_sections": len(merged_sections)
                 })
                 
-                optimized.append(Document(page_content=merged_content, metadata=merged_metadata))
-                i = j
+                if all(isinstance(part, CorpusChunk) for part in merged_parts):
+                    yield merge_chunks(merged_parts, merged_metadata)
+                else:
+                    yield Document(page_content="\n\n".join(part.page_content for part in merged_parts),
+                                   metadata=merged_metadata)
             
             # If chunk is too large, split it at paragraph boundaries
             elif current_size > MAX_CHUNK_SIZE:
-                split_docs = self.split_large_chunk(current_doc)
-                optimized.extend(split_docs)
-                i += 1
+                yield from self.split_large_chunk(current_doc)
             
             # Chunk is good size, keep as is
             else:
-                optimized.append(current_doc)
-                i += 1
-        
-        return optimized
+                yield current_doc
+    
+    def optimize_chunk_sizes(self, documents: List[Document]) -> List[Document]:
+        """Optimize chunk sizes by merging small chunks and splitting large ones"""
+        return list(self.iter_optimized_chunks(documents))
     
     def split_large_chunk(self, document: Document) -> List[Document]:
-        """Split a large chunk at paragraph boundaries"""
+        """
+        Split a large chunk at paragraph boundaries
+        
+        Paragraphs are grouped as (start, end) offsets into the chunk text: since
+        consecutive paragraphs are separated by "\n\n" in the text itself, each part
+        is a single slice, materialized once (or a sub-span of a corpus chunk).
+        """
         content = document.page_content
-        paragraphs = content.split('\n\n')
         
-        if len(paragraphs) <= 1:
+        if "\n\n" not in content:
             # Can't split further, return as is
             return [document]
         
         chunks = []
-        current_chunk = ""
-        chunk_num = 1
         
-        for paragraph in paragraphs:
-            if len(current_chunk) + len(paragraph) + 2 <= MAX_CHUNK_SIZE:
-                if current_chunk:
-                    current_chunk += "\n\n" + paragraph
-                else:
-                    current_chunk = paragraph
-            else:
-                if current_chunk:
-                    # Save current chunk
-                    metadata = document.metadata.copy()
-                    metadata.update({
-                        "chunk_size": len(current_chunk),
-                        "split_part": chunk_num,
-                        "section_title": f"{metadata.get('section_title', '')} (Part {chunk_num})"
-                    })
-                    chunks.append(Document(page_content=current_chunk, metadata=metadata))
-                    chunk_num += 1
-                
-                current_chunk = paragraph
-        
-        # Add final chunk
-        if current_chunk:
+        def make_part(start, end):
             metadata = document.metadata.copy()
             metadata.update({
-                "chunk_size": len(current_chunk),
-                "split_part": chunk_num,
-                "section_title": f"{metadata.get('section_title', '')} (Part {chunk_num})"
+                "chunk_size": end - start,
+                "split_part": len(chunks) + 1,
+                "section_title": f"{metadata.get('section_title', '')} (Part {len(chunks) + 1})"
             })
-            chunks.append(Document(page_content=current_chunk, metadata=metadata))
+            if isinstance(document, CorpusChunk) and len(document.spans) == 1:
+                span = document.spans[0]
+                return CorpusChunk(document.store, [TextSpan(span.doc_id, span.start + start, span.start + end)],
+                                   metadata)
+            return Document(page_content=content[start:end], metadata=metadata)
+        
+        chunk_start = chunk_end = 0
+        for start, end in iter_paragraph_spans(content):
+            if chunk_end == chunk_start:
+                # Empty current chunk: restart at this paragraph
+                if end - start + 2 <= MAX_CHUNK_SIZE:
+                    chunk_start, chunk_end = start, end
+                    continue
+            elif chunk_end - chunk_start + end - start + 2 <= MAX_CHUNK_SIZE:
+                chunk_end = end
+                continue
+            
+            if chunk_end > chunk_start:
+                chunks.append(make_part(chunk_start, chunk_end))
+            chunk_start, chunk_end = start, end
+        
+        # Add final chunk
+        if chunk_end > chunk_start:
+            chunks.append(make_part(chunk_start, chunk_end))
         
         return chunks
 
-def load_and_chunk_pdf() -> List[Document]:
-    """Load PDF and create sub-chapter chunks"""
-    print(f"Loading PDF from {PDF_PATH}...")
-    
-    # Load PDF
-    loader = PyPDFLoader(PDF_PATH)
-    pages = loader.load()
+def iter_paragraph_spans(content: str) -> Iterator[Tuple[int, int]]:
+    """(start, end) offsets of the paragraphs of content, as delimited by content.split("\n\n")"""
+    start = 0
+    while True:
+        end = content.find("\n\n", start)
+        if end == -1:
+            yield start, len(content)
+            return
+        yield start, end
+        start = end + 2
+
+def iter_pdf_chunks(corpus: CorpusStore = None) -> Iterator[Document]:
+    """
+    Stream sub-chapter chunks from the PDF page by page
     
-    print(f"Loaded {len(pages)} pages from PDF")
+    Pages are parsed lazily and each final chunk is yielded as soon as its section
+    is complete, so downstream embedding starts before the whole PDF is parsed.
+    With a corpus store, the extracted text is written to it and chunks are
+    CorpusChunk spans whose text is only read when embedded.
+    """
+    print(f"Streaming PDF from {PDF_PATH}...")
     
-    # Combine all pages into one text
-    full_text = "\n\n".join([page.page_content for page in pages])
+    loader = PyPDFLoader(PDF_PATH)
     
-    # Create metadata from first page
     source_metadata = {
         "source": PDF_PATH,
-        "total_pages": len(pages),
+        "total_pages": None,  # Filled from the first page: the loader's reader already counted them
         "processing_date": datetime.now().isoformat()
     }
     
-    # Initialize chunker and process text
-    chunker = SubChapterChunker()
-    
-    print("Splitting text by sections...")
-    documents = chunker.split_text_by_sections(full_text, source_metadata)
-    print(f"Created {len(documents)} initial chunks")
+    def pages():
+        for page in loader.lazy_load():
+            source_metadata["total_pages"] = page.metadata.get("total_pages")
+            yield page
     
-    print("Optimizing chunk sizes...")
-    optimized_documents = chunker.optimize_chunk_sizes(documents)
-    print(f"Optimized to {len(optimized_documents)} final chunks")
+    chunker = SubChapterChunker()
+    corpus_doc_id = os.path.splitext(os.path.basename(PDF_PATH))[0]
+    sections = chunker.iter_sections(pages(), source_metadata, corpus, corpus_doc_id)
+    yield from chunker.iter_optimized_chunks(sections)
+
+def load_and_chunk_pdf() -> List[Document]:
+    """Load PDF and create sub-chapter chunks"""
+    optimized_documents = list(iter_pdf_chunks())
+    print(f"Created {len(optimized_documents)} final chunks")
     
     # Print statistics
     sizes = [len(doc.page_content) for doc in optimized_documents]
@@ -246,58 +428,35 @@ def load_and_chunk_pdf() -> List[Document]:
     
     return optimized_documents
 
-def create_vectorstore(documents: List[Document]):
-    """Create new ChromaDB collection with sub-chapter chunks"""
-    print(f"Creating embeddings for {len(documents)} documents...")
-    
+def create_vectorstore(documents: Iterable[Document]):
+    """Incrementally sync the ChromaDB collection with sub-chapter chunks"""
     # Setup embeddings
     api_key = get_openai_api_key()
-    embeddings = OpenAIEmbeddings(openai_api_key=api_key)
+    embeddings = with_embedding_cache(OpenAIEmbeddings(openai_api_key=api_key))
     
-    # Create empty vectorstore first
-    print(f"Creating Chroma vectorstore with collection '{COLLECTION_NAME}'...")
+    # Open (or create) the collection
+    print(f"Opening Chroma vectorstore with collection '{COLLECTION_NAME}'...")
     vectorstore = Chroma(
         persist_directory=PERSIST_DIRECTORY,
         collection_name=COLLECTION_NAME,
         embedding_function=embeddings
     )
     
-    # Process documents in batches to avoid token limits
-    batch_size = 20  # Process 20 documents at a time
-    total_batches = (len(documents) + batch_size - 1) // batch_size
-    
-    for i in range(0, len(documents), batch_size):
-        batch_num = (i // batch_size) + 1
-        batch = documents[i:i + batch_size]
-        
-        print(f"Processing batch {batch_num}/{total_batches} ({len(batch)} documents)...")
-        
-        try:
-            # Add batch to vectorstore
-            texts = [doc.page_content for doc in batch]
-            metadatas = [doc.metadata for doc in batch]
-            
-            vectorstore.add_texts(texts=texts, metadatas=metadatas)
-            
-        except Exception as e:
-            print(f"Error processing batch {batch_num}: {e}")
-            # Try smaller batch size
-            if len(batch) > 1:
-                print(f"Retrying with smaller chunks...")
-                for doc in batch:
-                    try:
-                        vectorstore.add_texts(
-                            texts=[doc.page_content], 
-                            metadatas=[doc.metadata]
-                        )
-                    except Exception as e2:
-                        print(f"Failed to add document: {e2}")
-                        print(f"Document size: {len(doc.page_content)} chars")
+    # Only new or changed chunks (source + section + content hash) are embedded,
+    # in concurrent token-budgeted batches, then bulk-written to the collection
+    print("Syncing documents...")
+    stats = sync_collection(vectorstore, documents, PERSIST_DIRECTORY, COLLECTION_NAME)
+    print(f"Sync: {stats['added']} added, {stats['deleted']} deleted, {stats['unchanged']} unchanged, "
+          f"{stats['failed']} failed ({stats['requests']} embedding requests, {stats['retries']} rate-limit retries)")
     
     vectorstore.persist()
-    print(f"Vectorstore created and persisted to {PERSIST_DIRECTORY}")
+    print(f"Vectorstore synced and persisted to {PERSIST_DIRECTORY}")
     
-    return vectorstore
+    if hasattr(embeddings, "cache"):
+        cache_stats = embeddings.cache.get_stats()
+        print(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    
+    return vectorstore, stats
 
 def main():
     """Main execution function"""
@@ -308,15 +467,14 @@ def main():
     print()
     
     try:
-        # Load and chunk PDF
-        documents = load_and_chunk_pdf()
-        
-        # Create vectorstore
-        vectorstore = create_vectorstore(documents)
+        # Stream chunks from the PDF straight into the embedding pipeline; chunks are
+        # spans of the extracted text, memory-mapped from the corpus store
+        with CorpusStore() as corpus:
+            vectorstore, stats = create_vectorstore(iter_pdf_chunks(corpus))
         
         print()
         print("=== SUCCESS ===")
-        print(f"Created vectorstore with {len(documents)} sub-chapter chunks")
+        print(f"Synced vectorstore with {stats['added'] + stats['unchanged']} sub-chapter chunks")
         print(f"To use this collection, update config/settings.py:")
         print(f"  'collection_name': '{COLLECTION_NAME}'")
         
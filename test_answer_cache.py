@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the semantic answer cache
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+
+
+def test_similar_questions_hit():
+    """A question close enough to a cached one gets its answer, within the same scope only"""
+    print("Testing semantic lookups...")
+
+    from core.answer_cache import SemanticAnswerCache
+
+    rng = np.random.default_rng(0)
+    question = rng.normal(size=64)
+    paraphrase = question + rng.normal(scale=0.05, size=64)
+    other = rng.normal(size=64)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = SemanticAnswerCache(db_path=os.path.join(tmp_dir, "answers.db"), similarity_threshold=0.95)
+        cache.put("traite", "v1", "qa:1", "Qu'est-ce que l'émotivité ?", question, "L'émotivité est...")
+
+        hit = cache.lookup("traite", "v1", "qa:1", paraphrase)
+        assert hit is not None and hit.answer == "L'émotivité est..." and hit.similarity >= 0.95
+        assert cache.lookup("traite", "v1", "qa:1", other) is None, "Unrelated question should miss"
+        assert cache.lookup("traite", "v1", "qa:2", question) is None, "Other prompt version should miss"
+        assert cache.lookup("traite_subchapters", "v1", "qa:1", question) is None, "Other collection should miss"
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 3 and stats["hit_rate"] == 0.25
+        print(f"[OK] Paraphrase served (similarity {hit.similarity:.3f}), stats: {stats}")
+
+        reopened = SemanticAnswerCache(db_path=cache.db_path)
+        assert reopened.lookup("traite", "v1", "qa:1", question) is not None, "Answers should persist"
+        print("[OK] Cached answers persist across processes")
+
+    return True
+
+
+def test_expiry_eviction_and_reindex():
+    """Entries expire after the TTL, are evicted beyond max_entries and dropped on re-indexing"""
+    print("\nTesting cache lifecycle...")
+
+    from core.answer_cache import SemanticAnswerCache
+
+    vectors = np.eye(8)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = SemanticAnswerCache(db_path=os.path.join(tmp_dir, "answers.db"), max_entries=3)
+        for i in range(5):
+            cache.put("traite", "v1", "qa", f"Question {i}", vectors[i], f"Réponse {i}")
+        assert len(cache) == 3 and cache.evictions == 2
+        assert cache.lookup("traite", "v1", "qa", vectors[0]) is None, "Oldest entries evicted"
+        assert cache.lookup("traite", "v1", "qa", vectors[4]).answer == "Réponse 4"
+
+        cache.put("traite", "v2", "qa", "Question 5", vectors[5], "Réponse 5")
+        assert len(cache) == 1, "Answers of the previous index version should be dropped"
+        assert cache.lookup("traite", "v1", "qa", vectors[4]) is None
+        print("[OK] LRU eviction and invalidation on re-indexing")
+
+        expiring = SemanticAnswerCache(db_path=cache.db_path, ttl_seconds=0.05)
+        time.sleep(0.1)
+        assert expiring.lookup("traite", "v2", "qa", vectors[5]) is None and len(expiring) == 0
+        print("[OK] Answers expire after the TTL")
+
+    return True
+
+
+def test_chain_serves_cached_answers():
+    """The RAG chain answers a repeated standalone question without retrieval or LLM call"""
+    print("\nTesting answer cache in the RAG chain...")
+
+    from langchain_core.documents import Document
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from core.answer_cache import SemanticAnswerCache
+    from core.callbacks import StreamlitCallbackHandler
+    from core.langgraph_qa_chain import LangGraphRAGChain
+    from test_streaming import FakeMemoryManager, FakePlaceholder, FakeRetriever
+    from test_vector_search import RandomEmbeddings
+
+    class HistoryMemoryManager(FakeMemoryManager):
+        def get_chat_history(self):
+            return [HumanMessage(content="Parlons des flegmatiques."), AIMessage(content="Volontiers.")]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = SemanticAnswerCache(db_path=os.path.join(tmp_dir, "answers.db"))
+        llm = GenericFakeChatModel(messages=iter([AIMessage(content="L'émotivité est une disposition."),
+                                                  AIMessage(content="Réponse avec historique.")]))
+        retriever = FakeRetriever(documents=[Document(page_content="L'émotivité est une disposition.")])
+        chain = LangGraphRAGChain(FakeMemoryManager(), llm=llm, retriever=retriever, answer_cache=cache,
+                                  embeddings=RandomEmbeddings())
+
+        first = chain.invoke({"question": "Qu'est-ce que l'émotivité ?"})
+        assert first["trace"]["answer_cache"]["hit"] is False and "generate_answer" in first["trace"]
+
+        handler = StreamlitCallbackHandler(FakePlaceholder(), max_fps=0)
+        second = chain.invoke({"question": "Qu'est-ce que l'émotivité ?"}, config={"callbacks": [handler]})
+        assert second["answer"] == first["answer"] and second["trace"]["answer_cache"]["hit"] is True
+        assert "generate_answer" not in second["trace"], "Cached answer should skip the workflow"
+        assert handler.text == first["answer"], "Cached answer should reach the stream handler"
+        assert chain.memory_manager.saved[-1][1] == {"answer": first["answer"]}, "Hit saved to memory"
+        print(f"[OK] Repeated question served in {second['trace']['answer_cache']['lookup_ms']:.1f} ms")
+
+        with_history = chain.invoke({"question": "Qu'est-ce que l'émotivité ?"},
+                                    memory_manager=HistoryMemoryManager())
+        assert with_history["answer"] == "Réponse avec historique." and "answer_cache" not in with_history["trace"]
+        print("[OK] Questions with conversation history bypass the cache")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Semantic Answer Cache...\n")
+
+    tests = [
+        test_similar_questions_hit,
+        test_expiry_eviction_and_reindex,
+        test_chain_serves_cached_answers
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
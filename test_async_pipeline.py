@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the async RAG pipeline (ainvoke / astream)
+"""
+
+import asyncio
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.retrievers import BaseRetriever
+
+LATENCY = 0.2
+
+
+class AsyncLatencyChatModel(BaseChatModel):
+    """Answers every prompt with the same text after LATENCY seconds, without blocking the event loop"""
+
+    answer: str = "Le passionné est émotif, actif et secondaire."
+
+    @property
+    def _llm_type(self) -> str:
+        return "async-latency"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(LATENCY)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(LATENCY)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(LATENCY)
+        for word in re.findall(r"\S+\s*", self.answer):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+
+class AsyncLatencyRetriever(BaseRetriever):
+    """Returns a fixed document after LATENCY seconds, without blocking the event loop"""
+
+    def _get_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        time.sleep(LATENCY)
+        return [Document(id="chunk-1", page_content="Le passionné...")]
+
+    async def _aget_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        await asyncio.sleep(LATENCY)
+        return [Document(id="chunk-1", page_content="Le passionné...")]
+
+
+def test_ainvoke_matches_invoke():
+    """ainvoke gives the same answer and trace entries as invoke, and saves the turn"""
+    print("Testing ainvoke...")
+
+    from core.langgraph_qa_chain import LangGraphRAGChain
+    from test_streaming import FakeMemoryManager
+
+    chain = LangGraphRAGChain(FakeMemoryManager(), llm=AsyncLatencyChatModel(), retriever=AsyncLatencyRetriever())
+    expected = chain.invoke({"question": "Décris le type passionné"})
+    result = asyncio.run(chain.ainvoke({"question": "Décris le type passionné"}))
+
+    assert result["answer"] == expected["answer"]
+    assert set(result["trace"]) == set(expected["trace"])
+    assert chain.memory_manager.saved[-1][1] == {"answer": result["answer"]}, "Turn saved to memory"
+    print(f"[OK] Same answer and trace nodes: {sorted(result['trace'])}")
+
+    return True
+
+
+def test_astream_yields_tokens_then_result():
+    """astream yields the answer tokens as they arrive, then the full result"""
+    print("\nTesting astream...")
+
+    from core.langgraph_qa_chain import LangGraphRAGChain
+    from test_streaming import FakeMemoryManager
+
+    chain = LangGraphRAGChain(FakeMemoryManager(), llm=AsyncLatencyChatModel(), retriever=AsyncLatencyRetriever())
+
+    async def collect():
+        return [event async for event in chain.astream({"question": "Décris le type passionné"})]
+
+    events = asyncio.run(collect())
+    tokens = [event["token"] for event in events[:-1]]
+    assert len(tokens) > 1 and "".join(tokens) == events[-1]["answer"]
+    assert "generate_answer" in events[-1]["trace"]
+    print(f"[OK] {len(tokens)} tokens streamed before the result")
+
+    return True
+
+
+def test_conversations_run_concurrently():
+    """Many conversations in flight on one event loop take about as long as one"""
+    print("\nTesting concurrent conversations...")
+
+    from core.langgraph_qa_chain import ConversationRAGChain, LangGraphRAGChain
+    from test_streaming import FakeMemoryManager
+
+    class HistoryMemoryManager(FakeMemoryManager):
+        def get_chat_history(self):
+            return [HumanMessage(content="Parle-moi du colérique."), AIMessage(content="Volontiers.")]
+
+    chain = LangGraphRAGChain(llm=AsyncLatencyChatModel(), retriever=AsyncLatencyRetriever())
+    conversations = [ConversationRAGChain(chain, HistoryMemoryManager()) for _ in range(20)]
+
+    async def ask_all():
+        return await asyncio.gather(*(conversation.ainvoke({"question": "Quels sont ses défauts ?"})
+                                      for conversation in conversations))
+
+    started_at = time.perf_counter()
+    results = asyncio.run(ask_all())
+    elapsed = time.perf_counter() - started_at
+
+    # One conversation: rewrite || retrieval, second retrieval, generation = 3 latencies
+    assert len(results) == 20 and all(result["answer"] for result in results)
+    assert elapsed < 20 * LATENCY, f"20 conversations took {elapsed:.2f}s"
+    print(f"[OK] 20 follow-up questions answered concurrently in {elapsed:.2f}s")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Async RAG Pipeline...\n")
+
+    tests = [
+        test_ainvoke_matches_invoke,
+        test_astream_yields_tokens_then_result,
+        test_conversations_run_concurrently
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the sub-chapter chunking pipeline
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.documents import Document
+
+TRAITE_PATH = project_root / "documents" / "traite_de_caracterologie.txt"
+
+
+def load_traite():
+    """Load the full text of the treatise"""
+    return TRAITE_PATH.read_text(encoding="utf-8")
+
+
+def split_into_pages(text, page_count, seed=0):
+    """Cut text into pseudo-pages at random positions (mid-line, mid-heading...)"""
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(text)), page_count - 1))
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+
+def section_signature(documents):
+    return [
+        (doc.page_content, doc.metadata["section_type"], doc.metadata["section_title"], doc.metadata.get("section_number"))
+        for doc in documents
+    ]
+
+
+def three_pass_section_breaks(chunker, text, start=0):
+    """Reference scanner: one finditer pass per pattern, then a sort by position"""
+    breaks = []
+    for match in chunker.numbered_pattern.finditer(text, start):
+        breaks.append((match.start(), f"Section {match.group(2)}", match.group(3).strip()))
+    for match in chunker.roman_pattern.finditer(text, start):
+        breaks.append((match.start(), f"Chapter {match.group(2)}", match.group(3).strip()))
+    for match in chunker.major_pattern.finditer(text, start):
+        breaks.append((match.start(), match.group(2), match.group(3).strip() if match.group(3) else ""))
+    breaks.sort(key=lambda x: x[0])
+    return breaks
+
+
+def test_single_pass_scanner_matches_three_passes():
+    """The combined section pattern finds exactly the breaks of the three separate patterns"""
+    print("Testing single-pass section scanner...")
+
+    from create_subchapter_vectorstore import SubChapterChunker
+
+    chunker = SubChapterChunker()
+    text = load_traite()
+
+    expected = three_pass_section_breaks(chunker, text)
+    assert chunker.find_section_breaks(text) == expected, "Breaks differ on the treatise"
+
+    # Headings spilling onto the next line(s), which the separate patterns report twice
+    tricky = (
+        "PRÉFACE\n\n1. Deux sens de caractérologie et leur portée.\n"
+        "CHAPITRE\nII. Les éléments constitutifs du caractère\n"
+        "3.\nIntroduction à la méthode des profils\n"
+        "  INTRODUCTION  \nIV. Les propriétés complémentaires du caractère\n"
+    )
+    for sample in [tricky, tricky * 3, text[:20000] + tricky + text[20000:40000]]:
+        for start in [0, 1, len(sample) // 2]:
+            assert chunker.find_section_breaks(sample, start) == three_pass_section_breaks(chunker, sample, start), \
+                f"Breaks differ on synthetic sample (start={start})"
+
+    print(f"[OK] {len(expected)} breaks identical to the three-pass scanner")
+    return True
+
+
+def test_split_large_chunk_slices_paragraphs():
+    """Large chunks are split into slices of the original text bounded by MAX_CHUNK_SIZE"""
+    print("Testing span-based chunk splitting...")
+
+    from create_subchapter_vectorstore import SubChapterChunker, MAX_CHUNK_SIZE, MIN_CHUNK_SIZE
+
+    rng = random.Random(0)
+    paragraphs = [" ".join(["mot"] * rng.randint(20, 800)) for _ in range(300)]
+    content = "\n\n".join(paragraphs)
+    document = Document(page_content=content, metadata={"section_title": "Grande section"})
+
+    chunker = SubChapterChunker()
+    parts = chunker.split_large_chunk(document)
+
+    assert "\n\n".join(part.page_content for part in parts) == content, "Splitting should be lossless"
+    assert all(len(part.page_content) <= MAX_CHUNK_SIZE for part in parts), "Parts bounded by MAX_CHUNK_SIZE"
+    assert [part.metadata["split_part"] for part in parts] == list(range(1, len(parts) + 1))
+    assert all(part.metadata["chunk_size"] == len(part.page_content) for part in parts)
+    print(f"[OK] {len(content)} chars split into {len(parts)} parts")
+
+    small = [Document(page_content="x" * 100, metadata={"section_title": f"s{i}", "page_end": i}) for i in range(50)]
+    merged = chunker.optimize_chunk_sizes(small)
+    assert "\n\n".join(doc.page_content for doc in merged) == "\n\n".join(doc.page_content for doc in small)
+    assert all(doc.metadata["chunk_size"] == len(doc.page_content) for doc in merged), "Merged size tracked exactly"
+    assert all(len(doc.page_content) >= MIN_CHUNK_SIZE for doc in merged[:-1])
+    print(f"[OK] {len(small)} small sections merged into {len(merged)} chunks")
+
+    return True
+
+
+def test_streaming_sections_match_full_text():
+    """Page-by-page section detection gives the same sections as the joined text"""
+    print("Testing streaming section detection...")
+
+    from create_subchapter_vectorstore import SubChapterChunker
+
+    chunker = SubChapterChunker()
+    text = load_traite()
+
+    for seed in range(3):
+        pages = split_into_pages(text, 500, seed)
+        expected = chunker.split_text_by_sections("\n\n".join(pages))
+        streamed = list(chunker.iter_sections(
+            Document(page_content=page, metadata={"page": i}) for i, page in enumerate(pages)
+        ))
+        assert section_signature(streamed) == section_signature(expected), f"Mismatch for seed {seed}"
+
+        page_ranges = [(doc.metadata["page_start"], doc.metadata["page_end"]) for doc in streamed]
+        assert all(1 <= start <= end <= len(pages) for start, end in page_ranges), "Page numbers kept"
+        assert page_ranges == sorted(page_ranges), "Sections come out in page order"
+
+    print(f"[OK] {len(expected)} sections identical to full-text chunking, with page numbers")
+    return True
+
+
+def test_streaming_sections_are_lazy():
+    """Sections are yielded before the last page is read"""
+    print("\nTesting lazy section emission...")
+
+    from create_subchapter_vectorstore import SubChapterChunker
+
+    pages = split_into_pages(load_traite(), 200)
+    pages_read = []
+
+    def page_stream():
+        for i, page in enumerate(pages):
+            pages_read.append(i)
+            yield Document(page_content=page, metadata={"page": i})
+
+    first_section = next(SubChapterChunker().iter_sections(page_stream()))
+    assert first_section.page_content, "First section should not be empty"
+    assert len(pages_read) < len(pages), "First section should be emitted before the whole book is read"
+    print(f"[OK] First section emitted after reading {len(pages_read)}/{len(pages)} pages")
+
+    return True
+
+
+def test_pdf_chunks_count_pages_while_streaming():
+    """total_pages comes from the pages being streamed, the PDF is not opened a second time"""
+    print("\nTesting PDF page count...")
+
+    from unittest import mock
+    import create_subchapter_vectorstore
+
+    pages = split_into_pages(load_traite(), 50)
+
+    class FakePyPDFLoader:
+        def __init__(self, path):
+            self.path = path
+
+        def lazy_load(self):
+            for i, page in enumerate(pages):
+                yield Document(page_content=page, metadata={"page": i, "total_pages": len(pages)})
+
+    with mock.patch.object(create_subchapter_vectorstore, "PyPDFLoader", FakePyPDFLoader):
+        chunks = list(create_subchapter_vectorstore.iter_pdf_chunks())
+
+    assert chunks and all(chunk.metadata["total_pages"] == len(pages) for chunk in chunks)
+    print(f"[OK] {len(chunks)} chunks with total_pages={len(pages)} from the streamed pages")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Sub-Chapter Chunking...\n")
+
+    tests = [
+        test_single_pass_scanner_matches_three_passes,
+        test_split_large_chunk_slices_paragraphs,
+        test_streaming_sections_match_full_text,
+        test_streaming_sections_are_lazy,
+        test_pdf_chunks_count_pages_while_streaming
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the token-budgeted context packing of the answer prompt
+"""
+
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, HumanMessage
+
+
+def count_words(text: str) -> int:
+    """Deterministic stand-in for the tokenizer: one token per word"""
+    return len(text.split())
+
+
+def test_overlapping_chunks_deduplicated():
+    """Sentences already packed from a better chunk are not sent twice"""
+    print("Testing overlap deduplication...")
+
+    from core.context_packing import pack_documents
+
+    first = Document(page_content="Le flegmatique est non-émotif, actif et secondaire. Il est ponctuel et méthodique.")
+    overlapping = Document(page_content="Il est ponctuel et méthodique. Ses habitudes règlent sa journée entière.")
+    duplicate = Document(page_content="Le flegmatique est non-émotif, actif et secondaire.")
+
+    texts, stats = pack_documents([first, overlapping, duplicate], count_words, budget=1000)
+    assert texts == [first.page_content, "Ses habitudes règlent sa journée entière."], texts
+    assert stats["deduplicated"] == 1 and stats["packed"] == 2
+    print("[OK] Overlapping sentences removed, duplicate chunk dropped")
+
+    return True
+
+
+def test_chunks_ordered_by_score():
+    """Chunks with a fused retrieval score are packed best first"""
+    print("\nTesting score ordering...")
+
+    from core.context_packing import pack_documents
+
+    documents = [
+        Document(page_content="Chunk moyen.", metadata={"rrf_score": 0.02}),
+        Document(page_content="Chunk excellent.", metadata={"rrf_score": 0.05}),
+        Document(page_content="Chunk faible.", metadata={"rrf_score": 0.01})
+    ]
+    texts, _ = pack_documents(documents, count_words, budget=1000)
+    assert texts == ["Chunk excellent.", "Chunk moyen.", "Chunk faible."], texts
+
+    unscored = [Document(page_content="Premier."), Document(page_content="Second.")]
+    assert pack_documents(unscored, count_words, budget=1000)[0] == ["Premier.", "Second."]
+    print("[OK] Best scored chunks first, retriever order kept without scores")
+
+    return True
+
+
+def test_budget_truncates_at_sentence_boundary():
+    """A chunk that does not fit is cut after its last whole sentence, weaker ones are dropped"""
+    print("\nTesting token budget...")
+
+    from core.context_packing import pack_documents
+
+    documents = [
+        Document(page_content="Un deux trois quatre."),
+        Document(page_content="Cinq six sept. Huit neuf dix. Onze douze treize."),
+        Document(page_content="Quatorze quinze.")
+    ]
+    texts, stats = pack_documents(documents, count_words, budget=10, min_truncated_tokens=3)
+    assert texts == ["Un deux trois quatre.", "Cinq six sept. Huit neuf dix."], texts
+    assert stats["tokens"] == 10 and stats["truncated"] == 1
+    assert stats["dropped"] == 1, "No budget left for the last chunk"
+
+    texts, stats = pack_documents(documents, count_words, budget=6, min_truncated_tokens=3)
+    assert texts == ["Un deux trois quatre.", "Quatorze quinze."], "Too little room to cut, smaller chunk fits"
+    assert stats["dropped"] == 1
+    print("[OK] Budget honoured with sentence-boundary truncation")
+
+    return True
+
+
+def test_history_keeps_recent_messages():
+    """The oldest messages are dropped first when the history exceeds its budget"""
+    print("\nTesting history budget...")
+
+    from core.context_packing import format_history
+
+    history = [HumanMessage(content="Question ancienne très longue " * 5),
+               AIMessage(content="Réponse ancienne."),
+               HumanMessage(content="Et le colérique ?"),
+               AIMessage(content="Il est émotif et actif.")]
+    text, tokens, kept = format_history(history, count_words, max_tokens=14)
+    assert kept == 3 and text.startswith("Assistant: Réponse ancienne.")
+    assert text.endswith("Assistant: Il est émotif et actif.\n") and tokens == 14
+    assert format_history([], count_words, 10)[0] == "(Aucun historique)"
+    print("[OK] Most recent messages kept within the history budget")
+
+    return True
+
+
+def test_prompt_token_counts_in_trace():
+    """The answer node reports the prompt token breakdown in the trace"""
+    print("\nTesting prompt token counts in the trace...")
+
+    from test_streaming import build_chain
+
+    chain = build_chain("Le flegmatique est nEAS.")
+    result = chain.invoke({"question": "Qu'est-ce qu'un flegmatique ?"})
+
+    prompt_trace = result["trace"]["generate_answer"]["prompt"]
+    assert prompt_trace["chunks_packed"] == prompt_trace["chunks_retrieved"] == 1
+    assert prompt_trace["prompt_tokens"] == (prompt_trace["template_tokens"] + prompt_trace["history_tokens"]
+                                             + prompt_trace["context_tokens"] + prompt_trace["question_tokens"])
+    print(f"[OK] Prompt of {prompt_trace['prompt_tokens']} tokens traced")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Context Packing...\n")
+
+    tests = [
+        test_overlapping_chunks_deduplicated,
+        test_chunks_ordered_by_score,
+        test_budget_truncates_at_sentence_boundary,
+        test_history_keeps_recent_messages,
+        test_prompt_token_counts_in_trace
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
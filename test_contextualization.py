@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the local decision to rewrite follow-up questions
+"""
+
+import sys
+from pathlib import Path
+from typing import List
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+HISTORY = [HumanMessage(content="Parle-moi du colérique."),
+           AIMessage(content="Le colérique est émotif, actif et primaire.")]
+
+
+def test_classifier_detects_history_dependent_questions():
+    """Pronouns, possessives, demonstratives, ellipses and one-sided comparisons need a rewrite"""
+    print("Testing contextualization classifier...")
+
+    from core.contextualization import needs_contextualization
+
+    expected = {
+        "Décris le type passionné": (False, "standalone"),
+        "Qu'est-ce que la secondarité ?": (False, "standalone"),
+        "Le nerveux est-il émotif ?": (False, "standalone"),
+        "Que faut-il retenir de la caractérologie ?": (False, "standalone"),
+        "Comment se manifeste-t-il au travail ?": (True, "pronoun"),
+        "Comment se manifeste-t-elle chez le nerveux ?": (True, "pronoun"),
+        "Quelle est la différence avec le sanguin ?": (True, "comparison"),
+        "Quelle est la différence entre le nerveux et le sanguin ?": (False, "standalone"),
+        "Compare le nerveux avec le sanguin": (False, "standalone"),
+        "Comment ça marche ?": (True, "pronoun"),
+        "Quels sont ses défauts ?": (True, "possessive"),
+        "Explique cette notion": (True, "demonstrative"),
+        "Et le sentimental ?": (True, "ellipsis"),
+        "Peux-tu donner un exemple ?": (True, "entity_overlap"),
+    }
+    for question, (needed, reason) in expected.items():
+        decision = needs_contextualization(question, HISTORY)
+        assert (decision.needed, decision.reason) == (needed, reason), f"{question}: {decision}"
+
+    assert needs_contextualization("Comment se manifeste-t-il ?", []).reason == "no_history"
+    print(f"[OK] {len(expected)} questions classified as expected")
+
+    return True
+
+
+def test_chain_skips_rewrite_for_standalone_questions():
+    """The LangGraph chain only calls the LLM to rewrite history-dependent questions"""
+    print("\nTesting selective contextualization in the RAG chain...")
+
+    from langchain_core.documents import Document
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from core.langgraph_qa_chain import LangGraphRAGChain
+    from test_streaming import FakeMemoryManager, FakeRetriever
+
+    class HistoryMemoryManager(FakeMemoryManager):
+        def get_chat_history(self):
+            return HISTORY
+
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content="Le passionné est émotif, actif et secondaire."),
+                                              AIMessage(content="Quels sont les défauts du colérique ?"),
+                                              AIMessage(content="Impulsivité, dispersion.")]))
+    retriever = FakeRetriever(documents=[Document(page_content="Le passionné...")])
+    chain = LangGraphRAGChain(HistoryMemoryManager(), llm=llm, retriever=retriever)
+
+    standalone = chain.invoke({"question": "Décris le type passionné"})
+    assert standalone["answer"] == "Le passionné est émotif, actif et secondaire.", "No rewrite call expected"
+    assert standalone["trace"]["contextualize_question"]["rewritten"] is False
+
+    follow_up = chain.invoke({"question": "Quels sont ses défauts ?"})
+    assert follow_up["answer"] == "Impulsivité, dispersion."
+    assert follow_up["trace"]["contextualize_question"]["reason"] == "possessive"
+
+    stats = chain.contextualization_stats.get_stats()
+    assert stats["skipped"] == 1 and stats["performed"] == 1 and stats["skip_rate"] == 0.5
+    print(f"[OK] Standalone question answered without rewrite, stats: {stats}")
+
+    return True
+
+
+def test_selective_history_aware_retriever():
+    """The history-aware retriever of core/qa_chain.py retrieves on the raw standalone question"""
+    print("\nTesting selective history-aware retriever...")
+
+    from langchain.prompts import PromptTemplate
+    from langchain_core.callbacks import CallbackManagerForRetrieverRun
+    from langchain_core.documents import Document
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.retrievers import BaseRetriever
+    from core.contextualization import ContextualizationCounter, create_selective_history_aware_retriever
+
+    class EchoRetriever(BaseRetriever):
+        queries: List[str] = []
+
+        def _get_relevant_documents(self, query, *, run_manager: CallbackManagerForRetrieverRun = None):
+            self.queries.append(query)
+            return [Document(page_content=query)]
+
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content="Quels sont les défauts du colérique ?")]))
+    retriever = EchoRetriever()
+    counter = ContextualizationCounter()
+    prompt = PromptTemplate.from_template("Historique:\n{chat_history}\n\nQuestion: {input}")
+    chain = create_selective_history_aware_retriever(llm, retriever, prompt, counter)
+
+    chain.invoke({"input": "Décris le type passionné", "chat_history": HISTORY})
+    chain.invoke({"input": "Quels sont ses défauts ?", "chat_history": HISTORY})
+    assert retriever.queries == ["Décris le type passionné", "Quels sont les défauts du colérique ?"]
+    assert counter.get_stats()["skipped"] == 1 and counter.get_stats()["performed"] == 1
+    print("[OK] Only the follow-up question went through the rewrite chain")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Question Contextualization...\n")
+
+    tests = [
+        test_classifier_detects_history_dependent_questions,
+        test_chain_skips_rewrite_for_standalone_questions,
+        test_selective_history_aware_retriever
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the memory-mapped corpus store and span-based chunks
+"""
+
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.documents import Document
+
+TRAITE_PATH = project_root / "documents" / "traite_de_caracterologie.txt"
+
+
+def test_span_reads_match_text():
+    """Spans read from the mmap equal slices of the decoded text, accents included"""
+    print("Testing span reads from a registered file...")
+
+    from core.corpus import CorpusStore, TextSpan
+
+    text = TRAITE_PATH.read_text(encoding="utf-8")
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = CorpusStore(directory, checkpoint_chars=97)
+        assert store.add_file("traite", str(TRAITE_PATH)) == len(text)
+        assert store.text("traite") == text, "Full text should round-trip"
+
+        for _ in range(500):
+            start = rng.randrange(len(text))
+            end = min(len(text), start + rng.randrange(1, 5000))
+            assert store.read(TextSpan("traite", start, end)) == text[start:end], f"Span {start}:{end} differs"
+        store.close()
+
+    print("[OK] 500 random spans identical to text slices")
+    return True
+
+
+def test_appended_corpus_is_readable_while_writing():
+    """Spans of a corpus being appended to can be read before writing is finished"""
+    print("\nTesting incremental corpus writing...")
+
+    from core.corpus import CorpusStore
+
+    with tempfile.TemporaryDirectory() as directory:
+        pieces = ["Caractérologie — ", "émotivité, activité, ", "retentissement. " * 20, "Fin."]
+        spans = []
+        with CorpusStore(directory, checkpoint_chars=16) as store:
+            for piece in pieces:
+                spans.append(store.append("livre", piece))
+                assert [store.read(span) for span in spans] == pieces[:len(spans)], "Earlier spans stay readable"
+            assert store.text("livre") == "".join(pieces)
+        assert all(corpus_file.writer is None for corpus_file in store._files.values()), "Closed on exit"
+        assert store.text("livre") == "".join(pieces), "Spans are re-opened after close"
+
+    print(f"[OK] {len(pieces)} appended pieces readable as they are written")
+    return True
+
+
+def test_corpus_chunks_match_documents():
+    """Streaming chunking with a corpus gives the same chunks as plain documents"""
+    print("\nTesting span-based chunks against text chunks...")
+
+    from core.corpus import CorpusStore, CorpusChunk
+    from create_subchapter_vectorstore import SubChapterChunker
+
+    text = TRAITE_PATH.read_text(encoding="utf-8")
+    rng = random.Random(1)
+    cuts = sorted(rng.sample(range(1, len(text)), 399))
+    pages = [Document(page_content=text[a:b], metadata={"page": i})
+             for i, (a, b) in enumerate(zip([0] + cuts, cuts + [len(text)]))]
+
+    chunker = SubChapterChunker()
+    expected = list(chunker.iter_optimized_chunks(chunker.iter_sections(pages, {"source": "traite"})))
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = CorpusStore(directory)
+        chunks = list(chunker.iter_optimized_chunks(
+            chunker.iter_sections(pages, {"source": "traite"}, store, "traite")
+        ))
+
+        assert all(isinstance(chunk, CorpusChunk) for chunk in chunks), "Chunks should be spans"
+        assert [chunk.size for chunk in chunks] == [len(doc.page_content) for doc in expected]
+        assert [(chunk.page_content, chunk.metadata) for chunk in chunks] == \
+            [(doc.page_content, doc.metadata) for doc in expected], "Chunks should match text chunks"
+        store.close()
+
+    print(f"[OK] {len(chunks)} span chunks identical to text chunks")
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Corpus Store...\n")
+
+    tests = [
+        test_span_reads_match_text,
+        test_appended_corpus_is_readable_while_writing,
+        test_corpus_chunks_match_documents
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the persistent embedding cache
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import List
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.embeddings import Embeddings
+
+
+class CountingEmbeddings(Embeddings):
+    """Deterministic fake embeddings that count the texts sent to the 'network'"""
+
+    model = "fake-embedding-model"
+
+    def __init__(self):
+        self.embedded_texts = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded_texts.extend(texts)
+        return [[float(len(text)), float(sum(map(ord, text)) % 97), 0.5] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class AsyncOnlyEmbeddings(CountingEmbeddings):
+    """Fake async embeddings client whose sync methods must never be called"""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        raise AssertionError("Sync embed_documents called from the async path")
+
+    def embed_query(self, text: str) -> List[float]:
+        raise AssertionError("Sync embed_query called from the async path")
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return CountingEmbeddings.embed_documents(self, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return CountingEmbeddings.embed_documents(self, [text])[0]
+
+
+def test_cached_embeddings_skip_repeated_texts():
+    """Already embedded texts (after normalization) are served from the cache"""
+    print("Testing embedding cache hits and misses...")
+
+    from core.embedding_cache import EmbeddingCache, CachedEmbeddings
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = EmbeddingCache(db_path=os.path.join(tmp_dir, "embeddings.db"), max_entries=100)
+        underlying = CountingEmbeddings()
+        embeddings = CachedEmbeddings(underlying, cache)
+
+        first = embeddings.embed_documents(["L'émotivité", "La secondarité", "L'émotivité"])
+        assert underlying.embedded_texts == ["L'émotivité", "La secondarité"], "Duplicates embedded once"
+
+        second = embeddings.embed_documents(["La secondarité", "  L'émotivité \n"])
+        assert len(underlying.embedded_texts) == 2, "Cached texts should not be re-embedded"
+        assert second[1] == first[0], "Normalized text should share the cached vector"
+
+        embeddings.embed_query("La secondarité")
+        assert len(underlying.embedded_texts) == 2, "Queries should hit the same cache"
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 3 and stats["misses"] == 3, f"Unexpected stats: {stats}"
+        print(f"[OK] Cache stats: {stats}")
+
+        # A new cache object on the same file keeps the vectors (persistence)
+        reopened = CachedEmbeddings(CountingEmbeddings(), EmbeddingCache(db_path=cache.db_path))
+        reopened.embed_query("L'émotivité")
+        assert reopened.embeddings.embedded_texts == [], "Vectors should persist on disk"
+        print("[OK] Cached vectors persist across processes")
+
+    return True
+
+
+def test_cache_eviction():
+    """The cache never grows beyond max_entries and evicts least recently used vectors"""
+    print("\nTesting embedding cache eviction...")
+
+    from core.embedding_cache import EmbeddingCache, CachedEmbeddings
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = EmbeddingCache(db_path=os.path.join(tmp_dir, "embeddings.db"), max_entries=3)
+        embeddings = CachedEmbeddings(CountingEmbeddings(), cache)
+
+        for text in ["a", "b", "c", "d", "e"]:
+            embeddings.embed_query(text)
+
+        assert cache.evictions == 2, "Two oldest entries should be evicted"
+        assert cache.get_many(embeddings.model_name, ["a", "b"]) == [None, None]
+        assert None not in cache.get_many(embeddings.model_name, ["c", "d", "e"])
+        print("[OK] Least recently used entries evicted beyond max_entries")
+
+    return True
+
+
+def test_async_path_uses_async_client():
+    """ainvoke embeds through the async client of the cached embeddings, never the sync one"""
+    print("\nTesting async cached embeddings...")
+
+    import numpy as np
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+    from core.answer_cache import SemanticAnswerCache
+    from core.embedding_cache import EmbeddingCache, CachedEmbeddings
+    from core.langgraph_qa_chain import LangGraphRAGChain
+    from core.retrievers import DenseRetriever, NumpySearchEngine
+    from test_streaming import FakeMemoryManager
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        underlying = AsyncOnlyEmbeddings()
+        embeddings = CachedEmbeddings(underlying, EmbeddingCache(db_path=os.path.join(tmp_dir, "embeddings.db")))
+
+        vectors = asyncio.run(embeddings.aembed_documents(["L'émotivité", "L'émotivité", "La secondarité"]))
+        assert underlying.embedded_texts == ["L'émotivité", "La secondarité"] and vectors[0] == vectors[1]
+        assert asyncio.run(embeddings.aembed_query("La secondarité")) == vectors[2]
+        assert len(underlying.embedded_texts) == 2, "Async queries hit the same cache"
+
+        texts = [f"Passage {i} sur le caractère." for i in range(10)]
+        engine = NumpySearchEngine(ids=[str(i) for i in range(10)],
+                                   embeddings=np.asarray(CountingEmbeddings().embed_documents(texts)),
+                                   texts=texts, metadatas=[None] * 10, embedding_function=embeddings)
+        llm = GenericFakeChatModel(messages=iter([AIMessage(content="L'émotivité est une disposition.")]))
+        chain = LangGraphRAGChain(FakeMemoryManager(), llm=llm, retriever=DenseRetriever(engine=engine, k=3),
+                                  answer_cache=SemanticAnswerCache(db_path=os.path.join(tmp_dir, "answers.db")),
+                                  embeddings=embeddings)
+
+        first = asyncio.run(chain.ainvoke({"question": "Qu'est-ce que l'émotivité ?"}))
+        second = asyncio.run(chain.ainvoke({"question": "Qu'est-ce que l'émotivité ?"}))
+        assert second["answer"] == first["answer"] and second["trace"]["answer_cache"]["hit"] is True
+        print("[OK] Retrieval and answer cache embed asynchronously through the cache")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Embedding Cache...\n")
+
+    tests = [
+        test_cached_embeddings_skip_repeated_texts,
+        test_cache_eviction,
+        test_async_path_uses_async_client
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
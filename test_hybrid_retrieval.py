@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script to verify hybrid BM25 + vector retrieval with reciprocal rank fusion
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.documents import Document
+
+from test_embedding_cache import CountingEmbeddings
+
+CHUNKS = [
+    "L'émotivité est la disposition à être ébranlé par les événements.",
+    "Le flegmatique (nEAS) est non-émotif, actif et secondaire.",
+    "Les émotifs actifs primaires sont des colériques.",
+    "La secondarité prolonge le retentissement des représentations.",
+    "Le sentimental est émotif, non-actif et secondaire.",
+    "Les passionnés sont émotifs, actifs et secondaires."
+]
+
+
+def test_french_analyzer():
+    """Accents are folded and inflections reduced to a common stem"""
+    print("Testing French analyzer...")
+
+    from core.lexical import analyze
+
+    assert analyze("Émotifs") == analyze("émotive") == analyze("EMOTIF"), "Inflections should share a stem"
+    assert analyze("secondarité") != analyze("secondaire"), "Derivations should stay distinct"
+    assert analyze("le nEAS et le nEA") == ["neas", "nea"], "Stopwords dropped, type codes kept"
+    print("[OK] Accent folding, stopwords and light stemming")
+
+    return True
+
+
+def test_bm25_ranks_exact_terms():
+    """BM25 ranks chunks containing rare query terms first"""
+    print("\nTesting BM25 ranking...")
+
+    from core.lexical import BM25Index
+
+    index = BM25Index.build((str(i), text) for i, text in enumerate(CHUNKS))
+    results = index.search("Qu'est-ce qu'un flegmatique ?", k=3)
+    assert results[0][0] == "1", f"Flegmatique chunk should rank first: {results}"
+    assert index.search("secondarité", k=1)[0][0] == "3"
+    assert index.search("zzz inconnu", k=3) == [], "Unknown terms match nothing"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = str(Path(tmp_dir) / "index.json")
+        index.save(path)
+        assert BM25Index.load(path).search("flegmatique", k=3) == index.search("flegmatique", k=3)
+    print("[OK] Exact caracterology terms ranked first, index persisted")
+
+    return True
+
+
+def test_reciprocal_rank_fusion():
+    """Chunks found by both engines rise to the top of the fused ranking"""
+    print("\nTesting reciprocal rank fusion...")
+
+    from core.retrievers import reciprocal_rank_fusion
+
+    fused = reciprocal_rank_fusion([(["a", "b", "c"], 1.0), (["c", "d"], 1.0)], rrf_k=60)
+    assert fused[0][0] == "c", "Chunk in both rankings should win"
+    assert [chunk_id for chunk_id, _ in fused] == ["c", "a", "b", "d"]
+
+    weighted = reciprocal_rank_fusion([(["a"], 1.0), (["d"], 3.0)], rrf_k=60)
+    assert weighted[0][0] == "d", "Weights should favour the heavier engine"
+    print("[OK] Fused ranking rewards agreement and honours weights")
+
+    return True
+
+
+def test_hybrid_retriever_on_chroma():
+    """Lexical matches are retrieved even when the embeddings miss them"""
+    print("\nTesting hybrid retriever on a Chroma collection...")
+
+    from langchain_community.vectorstores import Chroma
+    from core.indexing import sync_collection
+    from core.lexical import load_lexical_index
+    from core.retrievers import HybridRetriever, build_retriever
+    from config.settings import RETRIEVAL_CONFIG
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectorstore = Chroma(persist_directory=tmp_dir, collection_name="test_hybrid",
+                             embedding_function=CountingEmbeddings())
+        documents = [Document(page_content=text, metadata={"source": "traite", "section_title": f"S{i}"})
+                     for i, text in enumerate(CHUNKS)]
+        sync_collection(vectorstore, documents, tmp_dir, "test_hybrid")
+
+        lexical_index = load_lexical_index(tmp_dir, "test_hybrid")
+        assert lexical_index is not None and len(lexical_index) == len(CHUNKS), "Index built at ingestion"
+
+        retriever = build_retriever(vectorstore, {**RETRIEVAL_CONFIG, "mode": "hybrid", "k": 2,
+                                                  "dense_k": 2, "lexical_k": 2}, lexical_index)
+        assert isinstance(retriever, HybridRetriever)
+
+        results = retriever.invoke("flegmatique nEAS")
+        assert len(results) == 2
+        assert any("flegmatique" in doc.page_content for doc in results), "BM25 hit should be fused in"
+        assert all("rrf_score" in doc.metadata for doc in results)
+        print(f"[OK] Fused results: {[doc.page_content[:30] for doc in results]}")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Hybrid Retrieval...\n")
+
+    tests = [
+        test_french_analyzer,
+        test_bm25_ranks_exact_terms,
+        test_reciprocal_rank_fusion,
+        test_hybrid_retriever_on_chroma
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
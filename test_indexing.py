@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test script to verify incremental re-indexing of Chroma collections
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.documents import Document
+
+from test_embedding_cache import CountingEmbeddings
+
+
+def make_sections(contents):
+    """Build section documents as produced by SubChapterChunker"""
+    return [
+        Document(
+            page_content=content,
+            metadata={"source": "traite.pdf", "section_title": f"Section {i}"}
+        )
+        for i, content in enumerate(contents, 1)
+    ]
+
+
+def test_chunk_ids_are_stable():
+    """Chunk IDs depend on source, section and content only"""
+    print("Testing stable chunk IDs...")
+
+    from core.indexing import compute_chunk_id
+
+    doc = make_sections(["L'émotivité est la première propriété."])[0]
+    same = Document(page_content=doc.page_content, metadata={**doc.metadata, "processing_date": "2025-01-01"})
+    edited = Document(page_content=doc.page_content + " Modifié.", metadata=doc.metadata)
+
+    assert compute_chunk_id(doc) == compute_chunk_id(same), "Processing metadata should not change the ID"
+    assert compute_chunk_id(doc) != compute_chunk_id(edited), "Edited content should change the ID"
+    print("[OK] Chunk IDs stable across runs and sensitive to content")
+
+    return True
+
+
+def test_sync_only_embeds_changes():
+    """Editing one section costs one embedding; vanished sections are deleted"""
+    print("\nTesting incremental collection sync...")
+
+    from langchain_community.vectorstores import Chroma
+    from core.indexing import sync_collection, get_index_version
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        embeddings = CountingEmbeddings()
+        vectorstore = Chroma(
+            persist_directory=tmp_dir,
+            collection_name="test_sync",
+            embedding_function=embeddings
+        )
+
+        contents = ["Émotivité.", "Activité.", "Retentissement.", "Secondarité."]
+        stats = sync_collection(vectorstore, make_sections(contents), tmp_dir, "test_sync")
+        assert (stats["added"], stats["deleted"], stats["unchanged"]) == (4, 0, 0), stats
+        first_version = get_index_version(tmp_dir, "test_sync")
+
+        stats = sync_collection(vectorstore, make_sections(contents), tmp_dir, "test_sync")
+        assert (stats["added"], stats["deleted"], stats["unchanged"]) == (0, 0, 4), stats
+        assert len(embeddings.embedded_texts) == 4, "Unchanged collection should embed nothing"
+        assert get_index_version(tmp_dir, "test_sync") == first_version
+        print("[OK] Re-running on unchanged source embeds nothing")
+
+        edited = ["Émotivité.", "Activité (révisée).", "Retentissement."]
+        stats = sync_collection(vectorstore, make_sections(edited), tmp_dir, "test_sync")
+        assert (stats["added"], stats["deleted"], stats["unchanged"]) == (1, 2, 2), stats
+        assert embeddings.embedded_texts[4:] == ["Activité (révisée)."], "Only the edited section is embedded"
+        assert len(vectorstore.get(include=[])["ids"]) == 3
+        assert get_index_version(tmp_dir, "test_sync") != first_version, "Index version should change"
+        print("[OK] One edited section costs one embedding call, vanished chunks deleted")
+
+    return True
+
+
+class FlakyEmbeddings(CountingEmbeddings):
+    """Fake embeddings that rate-limit the first call and always reject one poison text"""
+
+    def __init__(self, poison):
+        super().__init__()
+        self.poison = poison
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("Error code: 429 - Rate limit reached for text-embedding-ada-002")
+        if self.poison in texts:
+            raise ValueError("This model's maximum context length is 8191 tokens")
+        return super().embed_documents(texts)
+
+
+class RateLimitedEmbeddings(CountingEmbeddings):
+    """Fake embeddings that always answer with a rate-limit error"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        raise RuntimeError("Error code: 429 - Rate limit reached for text-embedding-ada-002")
+
+
+def test_embedding_pipeline_retries_and_bisects():
+    """Rate limits are retried with backoff; failing batches are bisected, not degraded"""
+    print("\nTesting concurrent embedding pipeline...")
+
+    from core.embedding_pipeline import EmbeddingPipeline, token_budget_batches
+
+    texts = [f"Chunk numéro {i} sur la caractérologie." for i in range(16)]
+    batches = token_budget_batches(texts, max_tokens=40, max_texts=100)
+    assert len(batches) > 1 and sorted(sum(batches, [])) == list(range(16)), "Batches by token budget"
+    print(f"[OK] {len(texts)} texts grouped into {len(batches)} token-budgeted batches")
+
+    embeddings = FlakyEmbeddings(poison=texts[5])
+    pipeline = EmbeddingPipeline(embeddings, {
+        "max_tokens_per_batch": 10000,
+        "max_workers": 1,
+        "initial_backoff": 0.001
+    })
+    vectors = pipeline.embed(texts)
+
+    assert pipeline.retries == 1, "Rate-limit error should be retried once"
+    assert pipeline.failed_keys == [5], "Only the poison text should fail"
+    assert vectors[5] is None and all(v is not None for i, v in enumerate(vectors) if i != 5)
+    assert embeddings.calls < len(texts), "Bisection should need fewer calls than one per document"
+    print(f"[OK] Poison text isolated in {embeddings.calls} calls ({pipeline.retries} rate-limit retry)")
+
+    embeddings = RateLimitedEmbeddings()
+    pipeline = EmbeddingPipeline(embeddings, {
+        "max_tokens_per_batch": 10000,
+        "max_workers": 1,
+        "max_retries": 3,
+        "initial_backoff": 0.001,
+        "max_backoff": 0.001
+    })
+    vectors = pipeline.embed(texts)
+
+    assert embeddings.calls == 4, f"{embeddings.calls} calls: a rate-limited batch must not be bisected"
+    assert vectors == [None] * len(texts) and sorted(pipeline.failed_keys) == list(range(len(texts)))
+    print(f"[OK] Sustained rate limit: {embeddings.calls} calls for the batch, all documents reported failed")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Incremental Indexing...\n")
+
+    tests = [
+        test_chunk_ids_are_stable,
+        test_sync_only_embeds_changes,
+        test_embedding_pipeline_retries_and_bisects
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the exact-match LLM response cache
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+
+def test_keys_and_eviction():
+    """Keys depend on model settings and prompt; entries are evicted by count, size and age"""
+    print("Testing LLM response cache store...")
+
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from core.llm_cache import LLMResponseCache, llm_response_key
+
+    llm = GenericFakeChatModel(messages=iter([]))
+    assert llm_response_key(llm, "Question: a") == llm_response_key(llm, "Question: a")
+    assert llm_response_key(llm, "Question: a") != llm_response_key(llm, "Question: b")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = LLMResponseCache(db_path=os.path.join(tmp_dir, "llm.db"), max_entries=3)
+        for i in range(5):
+            cache.put(f"key-{i}", "generate_answer", f"Réponse {i}")
+        assert len(cache) == 3 and cache.evictions == 2
+        assert cache.get("key-0", "generate_answer") is None, "Oldest entries evicted"
+        assert cache.get("key-4", "generate_answer") == "Réponse 4"
+        assert cache.get("key-4", "contextualize_question") == "Réponse 4"
+
+        stats = cache.get_stats()["nodes"]
+        assert stats["generate_answer"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+        assert stats["contextualize_question"]["hits"] == 1
+        print(f"[OK] LRU eviction by count, per-node stats: {stats}")
+
+        sized = LLMResponseCache(db_path=os.path.join(tmp_dir, "sized.db"), max_size_mb=0.001)
+        for i in range(4):
+            sized.put(f"key-{i}", "generate_answer", "x" * 400)
+        assert len(sized) == 2, "Total response size kept under max_size_mb"
+        print("[OK] LRU eviction by total size")
+
+        expiring = LLMResponseCache(db_path=cache.db_path, ttl_seconds=0.05)
+        time.sleep(0.1)
+        assert expiring.get("key-4", "generate_answer") is None
+        print("[OK] Responses expire after the TTL")
+
+    return True
+
+
+def test_chain_reuses_identical_prompts():
+    """Repeating a turn replays both completions from the cache, in sync and async mode"""
+    print("\nTesting LLM response cache in the RAG chain...")
+
+    from langchain_core.documents import Document
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from core.callbacks import StreamlitCallbackHandler
+    from core.langgraph_qa_chain import LangGraphRAGChain
+    from core.llm_cache import LLMResponseCache
+    from test_streaming import FakeMemoryManager, FakePlaceholder, FakeRetriever
+
+    class HistoryMemoryManager(FakeMemoryManager):
+        def get_chat_history(self):
+            return [HumanMessage(content="Parle-moi du colérique."), AIMessage(content="Volontiers.")]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = LLMResponseCache(db_path=os.path.join(tmp_dir, "llm.db"))
+        # Only two completions available: a third LLM call would fail
+        llm = GenericFakeChatModel(messages=iter([AIMessage(content="Quels sont les défauts du colérique ?"),
+                                                  AIMessage(content="Impulsivité, dispersion.")]))
+        retriever = FakeRetriever(documents=[Document(id="chunk-1", page_content="Le colérique...")])
+        chain = LangGraphRAGChain(HistoryMemoryManager(), llm=llm, retriever=retriever, llm_cache=cache)
+
+        first = chain.invoke({"question": "Quels sont ses défauts ?"})
+        assert first["trace"]["generate_answer"]["llm_cache"] == "miss"
+
+        handler = StreamlitCallbackHandler(FakePlaceholder(), max_fps=0)
+        second = chain.invoke({"question": "Quels sont ses défauts ?"}, config={"callbacks": [handler]})
+        assert second["answer"] == first["answer"] and handler.text == first["answer"], "Replayed through the stream"
+        assert second["trace"]["contextualize_question"]["llm_cache"] == "hit"
+        assert second["trace"]["generate_answer"]["llm_cache"] == "hit"
+        assert second["trace"]["generate_answer"]["streamed_tokens"] > 1
+        print("[OK] Identical prompts served from the cache and re-streamed")
+
+        third = asyncio.run(chain.ainvoke({"question": "Quels sont ses défauts ?"}))
+        assert third["answer"] == first["answer"] and third["trace"]["generate_answer"]["llm_cache"] == "hit"
+        stats = cache.get_stats()["nodes"]
+        assert stats["generate_answer"]["hits"] == 2 and stats["contextualize_question"]["hits"] == 2
+        print(f"[OK] Async path shares the cache, per-node stats: {stats}")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing LLM Response Cache...\n")
+
+    tests = [
+        test_keys_and_eviction,
+        test_chain_reuses_identical_prompts
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the per-node LLM profiles and their usage report
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+ANSWER = "Impulsivité, dispersion."
+
+
+class ProfiledChatModel(BaseChatModel):
+    """Fixed reply reporting API token usage, named like an OpenAI model"""
+
+    model_name: str
+    reply: str
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "profiled"
+
+    def _usage(self):
+        return {"input_tokens": 100, "output_tokens": 10, "total_tokens": 110}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        message = AIMessage(content=self.reply, usage_metadata=self._usage())
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        for token in self.reply.split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage()))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for chunk in self._stream(messages, stop, run_manager, **kwargs):
+            yield chunk
+
+
+def test_profiles_and_cost():
+    """Each node resolves its own profile; costs follow LLM_PRICING"""
+    print("Testing LLM profiles...")
+
+    from config.settings import LLM_CONFIG, get_llm_profile
+    from core.tokens import llm_cost, llm_usage
+
+    rewrite = get_llm_profile("contextualize_question")
+    assert rewrite["model_name"] != LLM_CONFIG["model_name"] and rewrite["temperature"] == 0
+    assert rewrite["max_tokens"] <= 100 and not rewrite["streaming"]
+    assert get_llm_profile("generate_answer")["model_name"] == LLM_CONFIG["model_name"]
+    assert get_llm_profile("refine_context") == LLM_CONFIG, "Nodes without a profile use LLM_CONFIG"
+    get_llm_profile("generate_answer")["timeout"] = 1
+    assert get_llm_profile("generate_answer")["timeout"] == 60, "Profiles are returned as copies"
+    print(f"[OK] Rewrite profile: {rewrite}")
+
+    assert abs(llm_cost("gpt-4o-mini", 1_000_000, 1_000_000) - 0.75) < 1e-9
+    assert llm_cost("unknown-model", 10, 10) is None
+    llm = ProfiledChatModel(model_name="gpt-4.1-nano", reply="")
+    assert llm_usage(llm, "prompt", "réponse", cached=True)["cost_usd"] == 0
+    assert llm_usage(llm, "prompt " * 40, "réponse")["estimated"]
+    print("[OK] Cost from API usage, tokenizer estimate or cache")
+
+    return True
+
+
+def test_nodes_use_their_own_model():
+    """Rewrite and answer run on different models, each reported with its tokens and cost"""
+    print("\nTesting per-node models in the RAG chain...")
+
+    from langchain_core.documents import Document
+    from core.langgraph_qa_chain import LangGraphRAGChain
+    from test_streaming import FakeMemoryManager, FakeRetriever
+
+    class HistoryMemoryManager(FakeMemoryManager):
+        def get_chat_history(self):
+            return [HumanMessage(content="Parle-moi du colérique."), AIMessage(content="Volontiers.")]
+
+    answer_llm = ProfiledChatModel(model_name="gpt-4o-mini", reply=ANSWER)
+    rewrite_llm = ProfiledChatModel(model_name="gpt-4.1-nano", reply="Quels sont les défauts du colérique ?")
+    chain = LangGraphRAGChain(HistoryMemoryManager(), llm=answer_llm, rewrite_llm=rewrite_llm,
+                              retriever=FakeRetriever(documents=[Document(page_content="Le colérique...")]))
+
+    result = chain.invoke({"question": "Quels sont ses défauts ?"})
+    trace = result["trace"]
+    assert rewrite_llm.calls == 1 and answer_llm.calls == 1
+    assert trace["contextualize_question"]["llm"]["model"] == "gpt-4.1-nano"
+    assert trace["generate_answer"]["llm"]["model"] == "gpt-4o-mini"
+    assert trace["generate_answer"]["llm"]["output_tokens"] == 10, "Usage taken from the end of the stream"
+    expected = trace["contextualize_question"]["llm"]["cost_usd"] + trace["generate_answer"]["llm"]["cost_usd"]
+    assert abs(trace["workflow"]["cost_usd"] - expected) < 1e-12 and expected > 0
+    print(f"[OK] Rewrite on gpt-4.1-nano, answer on gpt-4o-mini, cost ${trace['workflow']['cost_usd']:.6f}")
+
+    result = asyncio.run(chain.ainvoke({"question": "Quels sont ses défauts ?"}))
+    assert result["trace"]["contextualize_question"]["llm"]["model"] == "gpt-4.1-nano"
+    assert result["trace"]["generate_answer"]["llm"]["input_tokens"] == 100
+    print("[OK] Async path reports the same per-node usage")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Per-Node LLM Profiles...\n")
+
+    tests = [
+        test_profiles_and_cost,
+        test_nodes_use_their_own_model
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the parallel retrieval and contextualization branches of the RAG workflow
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.retrievers import BaseRetriever
+
+DELAY = 0.2
+
+
+class SlowRetriever(BaseRetriever):
+    """Sleeps DELAY seconds per query and returns two documents per query"""
+
+    queries: List[str] = []
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        time.sleep(DELAY)
+        self.queries.append(query)
+        return [Document(id=f"chunk-{len(self.queries)}{part}", page_content=f"Passage {part} sur: {query}")
+                for part in "ab"]
+
+
+class SlowChatModel(GenericFakeChatModel):
+    """Fake chat model whose non-streamed calls (the rewrite) take DELAY seconds"""
+
+    def _generate(self, *args, **kwargs):
+        time.sleep(DELAY)
+        return super()._generate(*args, **kwargs)
+
+
+def build_chain():
+    from core.langgraph_qa_chain import LangGraphRAGChain
+    from test_streaming import FakeMemoryManager
+
+    class HistoryMemoryManager(FakeMemoryManager):
+        def get_chat_history(self):
+            return [HumanMessage(content="Parle-moi du colérique."),
+                    AIMessage(content="Le colérique est émotif, actif et primaire.")]
+
+    llm = SlowChatModel(messages=iter([AIMessage(content="Quels sont les défauts du tempérament colérique ?"),
+                                       AIMessage(content="Impulsivité, dispersion.")]))
+    return LangGraphRAGChain(HistoryMemoryManager(), llm=llm, retriever=SlowRetriever())
+
+
+def test_branches_run_concurrently():
+    """Retrieval and contextualization overlap, so the workflow is shorter than the sum of its nodes"""
+    print("Testing parallel workflow branches...")
+
+    chain = build_chain()
+    result = chain.invoke({"question": "Quels sont ses défauts ?"})
+    trace = result["trace"]
+
+    retrieve, contextualize = trace["retrieve_context"], trace["contextualize_question"]
+    assert contextualize["started_ms"] < retrieve["started_ms"] + retrieve["elapsed_ms"], "Branches should overlap"
+    assert trace["refine_context"]["started_ms"] >= max(retrieve["elapsed_ms"], contextualize["elapsed_ms"])
+    assert trace["workflow"]["total_ms"] < trace["workflow"]["nodes_ms"] - DELAY * 1000 / 2
+    print(f"[OK] Workflow {trace['workflow']['total_ms']:.0f} ms for {trace['workflow']['nodes_ms']:.0f} ms of nodes")
+
+    return True
+
+
+def test_second_retrieval_on_material_rewrite():
+    """A rewrite bringing new terms triggers a second retrieval whose results come first"""
+    print("\nTesting refined retrieval...")
+
+    from core.langgraph_qa_chain import interleave_documents, new_term_ratio
+
+    assert new_term_ratio("Décris le type passionné", "Décris le type passionné.") == 0.0
+    assert new_term_ratio("Quels sont ses défauts ?", "Quels sont les défauts du colérique ?") > 0.25
+
+    chain = build_chain()
+    result = chain.invoke({"question": "Quels sont ses défauts ?"})
+    assert chain.retriever.queries == ["Quels sont ses défauts ?", "Quels sont les défauts du tempérament colérique ?"]
+    assert result["trace"]["refine_context"]["refined"] is True
+    assert result["trace"]["refine_context"]["chunk_ids"] == ["chunk-2a", "chunk-1a"], "Same k, alternated"
+    print("[OK] Second retrieval on the rewritten question merged ahead of the first")
+
+    first = [Document(id="a", page_content="a"), Document(id="b", page_content="b")]
+    second = [Document(id="b", page_content="b"), Document(id="c", page_content="c")]
+    assert [doc.id for doc in interleave_documents(second, first, 3)] == ["b", "a", "c"]
+    print("[OK] Duplicate chunks dropped when merging both retrievals")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Parallel RAG Workflow...\n")
+
+    tests = [
+        test_branches_run_concurrently,
+        test_second_retrieval_on_material_rewrite
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
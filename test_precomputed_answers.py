@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the precomputed answers of the welcome-screen prompts
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.messages import AIMessage
+
+from config.welcome_config import TEMPLATED_PROMPTS
+
+PROMPT = TEMPLATED_PROMPTS[0]["prompt"]
+
+
+def test_store_checks_version_stamps():
+    """Entries are only served for the index version and prompt key they were generated with"""
+    print("Testing precomputed answer store...")
+
+    from core.precomputed_answers import PrecomputedAnswers
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "precomputed", "traite.json")
+        store = PrecomputedAnswers(path)
+        store.put(PROMPT, ["a", "b"], "La caractérologie est...", "v1", "qa:1")
+        store.put("Une question libre ?", [], "Réponse", "v1", "qa:1")
+
+        assert store.get(PROMPT, "v1", "qa:1")["answer"] == "La caractérologie est..."
+        assert store.get(PROMPT, "v2", "qa:1") is None, "Re-indexed collection makes the entry stale"
+        assert store.get(PROMPT, "v1", "qa:2") is None, "New prompt version makes the entry stale"
+        assert store.get("Une question libre ?", "v1", "qa:1") is None, "Only templated prompts are stored"
+        assert not store.is_fresh("v1", "qa:1"), "Other templated prompts are still missing"
+
+        reopened = PrecomputedAnswers(path)
+        assert reopened.get(PROMPT, "v1", "qa:1")["chunk_ids"] == ["a", "b"], "Entries should persist"
+    print("[OK] Version-stamped entries persisted next to the index")
+
+    return True
+
+
+def test_chain_serves_and_regenerates_precomputed_answers():
+    """A templated prompt is answered from the store, and regenerated once stale"""
+    print("\nTesting precomputed answers in the RAG chain...")
+
+    from langchain_core.documents import Document
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from config.settings import PRECOMPUTED_ANSWERS_CONFIG
+    from core.callbacks import StreamlitCallbackHandler
+    from core.langgraph_qa_chain import LangGraphRAGChain
+    from core.precomputed_answers import PrecomputedAnswers
+    from test_streaming import FakeMemoryManager, FakePlaceholder, FakeRetriever
+
+    class VersionedChain(LangGraphRAGChain):
+        index_version = "v1"
+
+        def answer_scope(self):
+            return "traite", self.index_version, "qa:1"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = PrecomputedAnswers(os.path.join(tmp_dir, "traite.json"))
+        llm = GenericFakeChatModel(messages=iter([AIMessage(content="Première génération."),
+                                                  AIMessage(content="Après ré-indexation.")]))
+        retriever = FakeRetriever(documents=[Document(id="chunk-1", page_content="La caractérologie...")])
+        chain = VersionedChain(FakeMemoryManager(), llm=llm, retriever=retriever, precomputed_answers=store)
+
+        first = chain.invoke({"question": PROMPT})
+        assert first["answer"] == "Première génération." and "generate_answer" in first["trace"]
+        assert store.get(PROMPT, "v1", "qa:1")["chunk_ids"] == ["chunk-1"], "Missing entry generated"
+
+        second = chain.invoke({"question": PROMPT})
+        assert second["answer"] == "Première génération." and second["trace"]["precomputed_answer"]["hit"]
+        assert chain.memory_manager.saved[-1][1] == {"answer": "Première génération."}
+        print("[OK] Templated prompt answered from the store without generation")
+
+        placeholder = FakePlaceholder()
+        handler = StreamlitCallbackHandler(placeholder, max_fps=0)
+        previous_speed = PRECOMPUTED_ANSWERS_CONFIG["replay_words_per_second"]
+        PRECOMPUTED_ANSWERS_CONFIG["replay_words_per_second"] = 1000
+        try:
+            chain.invoke({"question": PROMPT}, config={"callbacks": [handler]})
+        finally:
+            PRECOMPUTED_ANSWERS_CONFIG["replay_words_per_second"] = previous_speed
+        assert handler.text == "Première génération." and len(placeholder.updates) > 1, "Answer re-streamed"
+        print("[OK] Stored answer re-streamed word by word when a replay speed is set")
+
+        chain.index_version = "v2"
+        third = chain.invoke({"question": PROMPT})
+        assert third["answer"] == "Après ré-indexation." and "generate_answer" in third["trace"]
+        assert store.get(PROMPT, "v2", "qa:1")["answer"] == "Après ré-indexation.", "Stale entry regenerated"
+        print("[OK] Stale entry regenerated after re-indexing")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Precomputed Answers...\n")
+
+    tests = [
+        test_store_checks_version_stamps,
+        test_chain_serves_and_regenerates_precomputed_answers
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the process-wide RAG resource registry
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from test_streaming import FakeRetriever, FakeMemoryManager
+
+
+def test_resources_built_once_per_process():
+    """Repeated setup calls (reruns, sessions) reuse the same heavy objects"""
+    print("Testing shared resource registry...")
+
+    import core.resources as resources
+    from core.answer_cache import SemanticAnswerCache
+    from core.langgraph_qa_chain import setup_qa_chain_with_memory
+    from core.llm_cache import LLMResponseCache
+    from core.precomputed_answers import PrecomputedAnswers
+
+    resources.clear_shared_resources()
+    llm_factory = mock.Mock(side_effect=lambda config=None: GenericFakeChatModel(messages=iter([])))
+    retriever_factory = mock.Mock(side_effect=lambda key=None, vectorstore=None: FakeRetriever())
+    tmp_dir = tempfile.TemporaryDirectory()
+
+    # Shared caches are opened in a temporary directory, never in ./cache or index_stores
+    with tmp_dir, \
+         mock.patch.object(resources, "setup_llm", llm_factory), \
+         mock.patch.object(resources, "setup_embeddings", mock.Mock()), \
+         mock.patch.object(resources, "setup_vectorstore", mock.Mock()), \
+         mock.patch.object(resources, "setup_retriever", retriever_factory), \
+         mock.patch.object(resources, "SemanticAnswerCache",
+                           lambda: SemanticAnswerCache(db_path=os.path.join(tmp_dir.name, "answers.db"))), \
+         mock.patch.object(resources, "LLMResponseCache",
+                           lambda: LLMResponseCache(db_path=os.path.join(tmp_dir.name, "llm_responses.db"))), \
+         mock.patch.object(resources, "PrecomputedAnswers",
+                           lambda path: PrecomputedAnswers(os.path.join(tmp_dir.name, os.path.basename(path)))):
+
+        class Memory:
+            def __init__(self):
+                self.manager = FakeMemoryManager()
+                self.manager._is_langgraph_memory = True
+
+        first = setup_qa_chain_with_memory(Memory())
+        second = setup_qa_chain_with_memory(Memory(), collection_key=None)
+        third = setup_qa_chain_with_memory(Memory(), collection_key="Original (Character-based)")
+
+        assert first.chain is second.chain, "Same collection should share one compiled chain"
+        assert first.chain is not third.chain, "Each collection should get its own chain"
+        assert first.memory_manager is not second.memory_manager, "Memory should stay per conversation"
+        assert llm_factory.call_count == 2, "One LLM client per node profile, built once"
+        assert retriever_factory.call_count == 2, "One retriever per collection"
+        print("[OK] Chain, LLM and retrievers built once and shared")
+        resources.clear_shared_resources()
+
+    return True
+
+
+def test_memory_injected_per_call():
+    """A shared chain writes each answer into the memory passed to invoke"""
+    print("\nTesting per-call memory injection...")
+
+    from core.langgraph_qa_chain import LangGraphRAGChain, ConversationRAGChain
+
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content="Réponse A"), AIMessage(content="Réponse B")]))
+    shared = LangGraphRAGChain(llm=llm, retriever=FakeRetriever(documents=[Document(page_content="x")]))
+
+    memory_a, memory_b = FakeMemoryManager(), FakeMemoryManager()
+    ConversationRAGChain(shared, memory_a).invoke({"question": "Question A"})
+    ConversationRAGChain(shared, memory_b).invoke({"question": "Question B"})
+
+    assert memory_a.saved == [({"question": "Question A"}, {"answer": "Réponse A"})]
+    assert memory_b.saved == [({"question": "Question B"}, {"answer": "Réponse B"})]
+    assert shared.memory_manager is None, "Shared chain should hold no conversation memory"
+    print("[OK] Each conversation keeps its own memory on a shared chain")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Shared RAG Resources...\n")
+
+    tests = [
+        test_resources_built_once_per_process,
+        test_memory_injected_per_call
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the coalescing of identical in-flight questions
+"""
+
+import asyncio
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+ANSWER = "La caractérologie étudie les types de caractère."
+
+
+class RecordingHandler:
+    """Stream handler recording the tokens it receives"""
+
+    def __init__(self):
+        self.tokens = []
+        self.ended = False
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.tokens.append(token)
+
+    def on_llm_end(self, *args, **kwargs):
+        self.ended = True
+
+
+class CountingStreamingModel(BaseChatModel):
+    """Streams ANSWER word by word (slowly) and counts the generations"""
+
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting-streaming"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=ANSWER))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        for token in re.findall(r"\S+\s*", ANSWER):
+            time.sleep(0.05)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        for token in re.findall(r"\S+\s*", ANSWER):
+            await asyncio.sleep(0.05)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+def test_waiters_share_the_leader_stream():
+    """Concurrent calls with the same key run compute once and all receive its tokens and result"""
+    print("Testing single-flight coalescing...")
+
+    from core.single_flight import SingleFlight
+
+    flights = SingleFlight()
+    computes = []
+    barrier = threading.Barrier(5)
+
+    def compute(handler):
+        computes.append(1)
+        for token in ["Le ", "colérique ", "est ", "actif."]:
+            time.sleep(0.05)
+            handler.on_llm_new_token(token)
+        handler.on_llm_end(None)
+        return "Le colérique est actif."
+
+    def request(_):
+        handler = RecordingHandler()
+        barrier.wait()
+        result, trace = flights.run("colerique", compute, handler)
+        return result, trace, handler
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        outcomes = list(executor.map(request, range(5)))
+
+    assert len(computes) == 1, "Only the leader computes"
+    for result, trace, handler in outcomes:
+        assert result == "Le colérique est actif." and "".join(handler.tokens) == result and handler.ended
+    assert sum(trace["coalesced"] for _, trace, _ in outcomes) == 4
+    assert flights.get_stats()["in_flight"] == 0
+    print(f"[OK] 5 concurrent requests, 1 computation, stats: {flights.get_stats()}")
+
+    def failing(handler):
+        time.sleep(0.1)
+        raise RuntimeError("API indisponible")
+
+    def failing_request(_):
+        barrier.wait()
+        try:
+            flights.run("panne", failing)
+        except RuntimeError as e:
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        errors = list(executor.map(failing_request, range(5)))
+    assert errors == ["API indisponible"] * 5, "Waiters receive the leader's error"
+    print("[OK] The leader's error is raised in every waiter")
+
+    return True
+
+
+def test_async_waiters_do_not_hold_threads():
+    """Async waiters are woken on their event loop, leaving the default thread pool free"""
+    print("\nTesting async waiters...")
+
+    from core.single_flight import SingleFlight
+
+    flights = SingleFlight()
+    words = ["Le ", "sentimental ", "est ", "secondaire."]
+
+    async def acompute(handler):
+        for token in words:
+            await asyncio.sleep(0.3)
+            handler.on_llm_new_token(token)
+        handler.on_llm_end(None)
+        return "".join(words)
+
+    async def scenario():
+        # A one-thread default pool: a waiter parked in it would block any other to_thread call
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+        handlers = [RecordingHandler() for _ in range(11)]
+        requests = [asyncio.create_task(flights.arun("sentimental", acompute, handler)) for handler in handlers]
+        await asyncio.sleep(0.05)
+        started_at = time.perf_counter()
+        unrelated = await asyncio.wait_for(asyncio.to_thread(lambda: "libre"), timeout=0.2)
+        waited = time.perf_counter() - started_at
+        return await asyncio.gather(*requests), handlers, unrelated, waited
+
+    results, handlers, unrelated, waited = asyncio.run(scenario())
+    assert unrelated == "libre" and waited < 0.1, f"Unrelated to_thread call waited {waited:.2f}s"
+    assert all(result == "".join(words) for result, _ in results)
+    assert all("".join(handler.tokens) == "".join(words) and handler.ended for handler in handlers)
+    assert sum(trace["coalesced"] for _, trace in results) == 10
+    print(f"[OK] 10 async waiters, unrelated worker-thread call served in {waited * 1000:.0f} ms")
+
+    return True
+
+
+def test_chain_coalesces_identical_questions():
+    """Sessions asking the same question at once share one generation, each saving its own turn"""
+    print("\nTesting single-flight in the RAG chain...")
+
+    from langchain_core.documents import Document
+    from core.callbacks import StreamlitCallbackHandler
+    from core.langgraph_qa_chain import ConversationRAGChain, LangGraphRAGChain
+    from core.single_flight import SingleFlight
+    from test_streaming import FakeMemoryManager, FakePlaceholder, FakeRetriever
+
+    llm = CountingStreamingModel()
+    chain = LangGraphRAGChain(llm=llm, retriever=FakeRetriever(documents=[Document(page_content="Le traité...")]),
+                              single_flight=SingleFlight())
+    sessions = [ConversationRAGChain(chain, FakeMemoryManager()) for _ in range(4)]
+    barrier = threading.Barrier(len(sessions))
+
+    def ask(session):
+        handler = StreamlitCallbackHandler(FakePlaceholder(), max_fps=0)
+        barrier.wait()
+        result = session.invoke({"question": "Qu'est-ce que la caractérologie ?"}, config={"callbacks": [handler]})
+        return result, handler
+
+    with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+        outcomes = list(executor.map(ask, sessions))
+
+    assert llm.calls == 1, f"{llm.calls} generations for one question"
+    for (result, handler), session in zip(outcomes, sessions):
+        assert result["answer"] == ANSWER and handler.text == ANSWER
+        assert session.memory_manager.saved[-1][1] == {"answer": ANSWER}, "Every session saves its own turn"
+    assert sum(result["trace"]["single_flight"]["coalesced"] for result, _ in outcomes) == 3
+    print("[OK] 4 sessions, 1 generation, tokens streamed to every session")
+
+    llm.calls = 0
+
+    async def ask_all():
+        return await asyncio.gather(*(session.ainvoke({"question": "Décris le type passionné"})
+                                      for session in sessions))
+
+    results = asyncio.run(ask_all())
+    assert llm.calls == 1 and all(result["answer"] == ANSWER for result in results)
+    print("[OK] Concurrent ainvoke calls coalesced as well")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing Request Coalescing...\n")
+
+    tests = [
+        test_waiters_share_the_leader_stream,
+        test_async_waiters_do_not_hold_threads,
+        test_chain_coalesces_identical_questions
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
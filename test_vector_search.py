@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the in-process NumPy exact-search engine
+"""
+
+import hashlib
+import sys
+import tempfile
+from pathlib import Path
+from typing import List
+
+# Add the project root to Python path
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+
+class RandomEmbeddings(Embeddings):
+    """Deterministic pseudo-random vectors derived from the text"""
+
+    def __init__(self, dimensions: int = 32):
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [
+            np.random.default_rng(int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16))
+            .normal(size=self.dimensions).tolist()
+            for text in texts
+        ]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class CountingRandomEmbeddings(RandomEmbeddings):
+    """RandomEmbeddings counting the embeddings requests"""
+
+    def __init__(self, dimensions: int = 32):
+        super().__init__(dimensions)
+        self.requests = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        return super().embed_documents(texts)
+
+
+def build_collection(tmp_dir, size=200, embeddings=None):
+    """Temporary Chroma collection of numbered chunks"""
+    from langchain_community.vectorstores import Chroma
+    from core.indexing import sync_collection
+
+    vectorstore = Chroma(persist_directory=tmp_dir, collection_name="test_numpy",
+                         embedding_function=embeddings or RandomEmbeddings())
+    documents = [Document(page_content=f"Chunk numéro {i} sur le caractère.", metadata={"source": "traite"})
+                 for i in range(size)]
+    sync_collection(vectorstore, documents, tmp_dir, "test_numpy")
+    return vectorstore
+
+
+def test_numpy_engine_matches_chroma():
+    """Exact NumPy search returns Chroma's nearest neighbours, in the same order"""
+    print("Testing NumPy exact search against Chroma...")
+
+    from core.retrievers import ChromaSearchEngine, NumpySearchEngine
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectorstore = build_collection(tmp_dir)
+        numpy_engine = NumpySearchEngine(vectorstore)
+        chroma_engine = ChromaSearchEngine(vectorstore)
+        assert len(numpy_engine) == 200 and numpy_engine.matrix.dtype == np.float32
+
+        for query in ["émotivité", "flegmatique", "secondarité", "Chunk numéro 42 sur le caractère."]:
+            expected = [document.id for document, _ in chroma_engine.search(query, 10)]
+            found = numpy_engine.search(query, 10)
+            assert [document.id for document, _ in found] == expected, f"Ranking differs for '{query}'"
+            scores = [score for _, score in found]
+            assert scores == sorted(scores, reverse=True), "Results should be sorted best first"
+
+        exact = numpy_engine.search("Chunk numéro 42 sur le caractère.", 1)[0][0]
+        assert exact.page_content == "Chunk numéro 42 sur le caractère."
+    print("[OK] Same top-10 as Chroma for every query")
+
+    return True
+
+
+def test_numpy_engine_batches_queries():
+    """A batch of queries gives the same results as one query at a time"""
+    print("\nTesting batched exact search...")
+
+    from core.retrievers import NumpySearchEngine
+
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(500, 16)).astype(np.float32)
+    engine = NumpySearchEngine(ids=[str(i) for i in range(500)], embeddings=matrix,
+                               texts=[""] * 500, metadatas=[None] * 500)
+
+    queries = rng.normal(size=(64, 16)).astype(np.float32)
+    positions, distances = engine.search_vectors(queries, 5)
+    assert positions.shape == (64, 5)
+
+    brute_force = ((queries[:, None, :] - matrix[None, :, :]) ** 2).sum(axis=2)
+    assert (positions == np.argsort(brute_force, axis=1)[:, :5]).all(), "Batch should match brute force"
+    assert np.allclose(distances, np.sort(brute_force, axis=1)[:, :5], atol=1e-3)
+
+    single_positions, _ = engine.search_vectors(queries[3], 5)
+    assert (single_positions[0] == positions[3]).all()
+
+    all_positions, _ = engine.search_vectors(queries[:2], 1000)
+    assert all_positions.shape == (2, 500), "k is capped at the collection size"
+    print("[OK] 64 queries answered with one matrix multiply")
+
+    return True
+
+
+def test_engine_selected_per_collection():
+    """The retrieval config picks the search engine"""
+    print("\nTesting per-collection engine selection...")
+
+    from config.settings import RETRIEVAL_CONFIG
+    from core.retrievers import build_retriever, DenseRetriever, HybridRetriever, NumpySearchEngine
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectorstore = build_collection(tmp_dir, size=20)
+
+        dense = build_retriever(vectorstore, {**RETRIEVAL_CONFIG, "engine": "numpy", "k": 3})
+        assert isinstance(dense, DenseRetriever) and len(dense.invoke("émotivité")) == 3
+
+        hybrid = build_retriever(vectorstore, {**RETRIEVAL_CONFIG, "mode": "hybrid", "engine": "numpy"})
+        assert isinstance(hybrid, HybridRetriever) and isinstance(hybrid.engine, NumpySearchEngine)
+    print("[OK] NumPy engine used for dense and hybrid retrieval")
+
+    return True
+
+
+def test_quantized_store_recall_and_memory():
+    """int8/float16 codes with float32 re-scoring find the exact neighbours in less memory"""
+    print("\nTesting quantized vector store...")
+
+    from core.quantized_store import QuantizedVectorStore
+
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(20, 64))
+    matrix = (centers[rng.integers(0, 20, 2000)] + rng.normal(scale=0.3, size=(2000, 64))).astype(np.float32)
+    queries = (matrix[rng.integers(0, 2000, 50)] + rng.normal(scale=0.1, size=(50, 64))).astype(np.float32)
+    exact = np.argsort(((queries[:, None, :] - matrix[None, :, :]) ** 2).sum(axis=2), axis=1)[:, :10]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for quantization, max_ratio in [("int8", 0.3), ("float16", 0.55)]:
+            directory = str(Path(tmp_dir) / quantization)
+            pages = [matrix[start:start + 300] for start in range(0, 2000, 300)]
+            store = QuantizedVectorStore.build(directory, [str(i) for i in range(2000)], pages, quantization)
+
+            assert isinstance(store.vectors, np.memmap), "Full precision should stay on disk"
+            assert store.memory_bytes <= max_ratio * store.full_precision_bytes, "Codes should be smaller"
+
+            positions, distances = store.search_vectors(queries, 10, rescore_factor=4)
+            recall = np.mean([len(set(found) & set(expected)) / 10 for found, expected in zip(positions, exact)])
+            assert recall >= 0.99, f"{quantization} recall@10 too low: {recall}"
+            assert (np.diff(distances, axis=1) >= 0).all(), "Results should be nearest first"
+            print(f"[OK] {quantization}: recall@10 = {recall:.3f}, "
+                  f"{store.memory_bytes / store.full_precision_bytes:.0%} of float32 memory")
+
+    return True
+
+
+def test_quantized_engine_rebuilds_when_stale():
+    """The quantized store is built from Chroma and rebuilt after re-indexing"""
+    print("\nTesting quantized engine lifecycle...")
+
+    from config.settings import RETRIEVAL_CONFIG
+    from core.indexing import sync_collection
+    from core.retrievers import ChromaSearchEngine, QuantizedSearchEngine, make_search_engine
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectorstore = build_collection(tmp_dir, size=100)
+        config = {**RETRIEVAL_CONFIG, "engine": "quantized"}
+
+        engine = make_search_engine(vectorstore, config)
+        assert isinstance(engine, QuantizedSearchEngine) and len(engine) == 100
+        expected = [document.id for document, _ in ChromaSearchEngine(vectorstore).search("émotivité", 5)]
+        assert [document.id for document, _ in engine.search("émotivité", 5)] == expected
+
+        documents = [Document(page_content=f"Chunk numéro {i} sur le caractère.", metadata={"source": "traite"})
+                     for i in range(120)]
+        sync_collection(vectorstore, documents, tmp_dir, "test_numpy")
+        assert len(make_search_engine(vectorstore, config)) == 120, "Store should follow the collection"
+    print("[OK] Quantized store built from Chroma, rebuilt after sync, same top-5 as Chroma")
+
+    import os
+    from langchain_community.vectorstores import Chroma
+    from core.quantized_store import quantized_store_directory
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        empty = Chroma(persist_directory=tmp_dir, collection_name="vide", embedding_function=RandomEmbeddings())
+        engine = make_search_engine(empty, config)
+        assert len(engine) == 0 and engine.search("émotivité", 5) == []
+        assert not os.path.exists(quantized_store_directory(tmp_dir, "vide")), "Empty store kept in memory"
+    print("[OK] Empty collection served by an in-memory store, nothing persisted")
+
+    return True
+
+
+def test_mmr_drops_near_duplicates():
+    """Vectorized MMR matches LangChain's selection and skips near-duplicate chunks"""
+    print("\nTesting maximal marginal relevance...")
+
+    from langchain_community.vectorstores.utils import maximal_marginal_relevance as langchain_mmr
+    from core.retrievers import maximal_marginal_relevance, cosine_relevance
+
+    rng = np.random.default_rng(2)
+    query = rng.normal(size=32)
+    candidates = rng.normal(size=(40, 32)) + query
+    for lambda_mult in (0.0, 0.3, 0.5, 0.9):
+        expected = langchain_mmr(query, candidates.tolist(), lambda_mult=lambda_mult, k=8)
+        found = maximal_marginal_relevance(cosine_relevance(query, candidates), candidates, 8, lambda_mult)
+        assert found == expected, f"Selection differs from LangChain for lambda={lambda_mult}"
+
+    relevance = cosine_relevance(query, candidates)
+    assert maximal_marginal_relevance(relevance, candidates, 5, 1.0) == list(np.argsort(-relevance)[:5])
+
+    best = int(np.argmax(relevance))
+    duplicated = np.vstack([candidates[best:best + 1]] * 5 + [np.delete(candidates, best, axis=0)[:9]])
+    selected = maximal_marginal_relevance(cosine_relevance(query, duplicated), duplicated, 4, 0.5)
+    assert sum(index < 5 for index in selected) == 1, "Only one copy of a duplicated chunk should be kept"
+    print("[OK] Same picks as LangChain's MMR, duplicates dropped")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        from config.settings import RETRIEVAL_CONFIG
+        from core.retrievers import build_retriever
+
+        vectorstore = build_collection(tmp_dir, size=30)
+        query_vector = np.array(RandomEmbeddings().embed_query("émotivité"))
+        duplicate = query_vector + rng.normal(scale=0.3, size=32)
+        others = query_vector + rng.normal(scale=0.6, size=(5, 32))
+        vectorstore._collection.add(ids=[f"copy-{i}" for i in range(5)] + [f"other-{i}" for i in range(5)],
+                                    embeddings=[duplicate.tolist()] * 5 + others.tolist(),
+                                    documents=["Chunk dupliqué."] * 5 + [f"Autre chunk {i}." for i in range(5)])
+        config = {**RETRIEVAL_CONFIG, "engine": "numpy", "k": 4, "fetch_k": 12}
+
+        plain = build_retriever(vectorstore, config).invoke("émotivité")
+        diverse = build_retriever(vectorstore, {**config, "mmr": True, "mmr_lambda": 0.3}).invoke("émotivité")
+        assert [doc.page_content for doc in plain].count("Chunk dupliqué.") == 4
+        assert [doc.page_content for doc in diverse].count("Chunk dupliqué.") == 1
+        print("[OK] MMR retriever sends one copy of duplicated chunks instead of four")
+
+        from core.retrievers import HybridRetriever, NumpySearchEngine
+
+        class CopiesLexicalIndex:
+            """BM25 stand-in ranking the duplicated chunks first"""
+
+            def search(self, query, k):
+                return [(f"copy-{i}", 5.0 - i) for i in range(5)]
+
+        hybrid_config = dict(engine=NumpySearchEngine(vectorstore), lexical_index=CopiesLexicalIndex(), k=4,
+                             fetch_k=12)
+        plain = HybridRetriever(**hybrid_config).invoke("émotivité")
+        ranked = HybridRetriever(**hybrid_config, mmr=True, mmr_lambda=1.0).invoke("émotivité")
+        diverse = HybridRetriever(**hybrid_config, mmr=True, mmr_lambda=0.3).invoke("émotivité")
+        assert [doc.id for doc in ranked] == [doc.id for doc in plain], "lambda=1 keeps the fused order"
+        assert [doc.page_content for doc in plain].count("Chunk dupliqué.") == 4
+        assert [doc.page_content for doc in diverse].count("Chunk dupliqué.") == 1
+        assert diverse[0].id == plain[0].id, "MMR starts from the best fused candidate"
+        scores = [doc.metadata["rrf_score"] for doc in diverse]
+        assert all(score > 0 for score in scores) and scores[0] == max(scores)
+        assert all(doc.metadata["source"] == "traite" for doc in diverse if not doc.id.startswith(("copy-", "other-")))
+    print("[OK] Hybrid MMR retriever keeps the fused order at lambda=1 and one copy of duplicates at 0.3")
+
+    return True
+
+
+def test_adaptive_k_cuts_at_score_break():
+    """Adaptive k keeps the chunks before a clear drop in scores, within min_k and max_k"""
+    print("\nTesting adaptive k...")
+
+    from core.retrievers import adaptive_cutoff
+
+    assert adaptive_cutoff([0.9, 0.89, 0.88, 0.5, 0.49, 0.48], 2, 6) == 3, "Cut at the score gap"
+    assert adaptive_cutoff([0.9, 0.3, 0.29, 0.28], 2, 4) == 2, "min_k chunks always kept"
+    assert adaptive_cutoff([0.9 - 0.01 * i for i in range(20)], 2, 8) == 8, "Smooth decline capped at max_k"
+    assert adaptive_cutoff([0.04, 0.035, 0.03, 0.016, 0.015], 1, 5, score_threshold=0.5) == 3, "Relative threshold"
+    assert adaptive_cutoff([0.9], 3, 8) == 1
+    print("[OK] Cut at score gaps and relative threshold, bounded by min_k/max_k")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        from config.settings import RETRIEVAL_CONFIG
+        from core.retrievers import build_retriever, DenseRetriever
+        from core.langgraph_qa_chain import LangGraphRAGChain
+        from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+        from langchain_core.messages import AIMessage
+        from test_streaming import FakeMemoryManager
+
+        vectorstore = build_collection(tmp_dir, size=30)
+        rng = np.random.default_rng(3)
+        query_vector = np.array(RandomEmbeddings().embed_query("émotivité"))
+        close = query_vector + rng.normal(scale=0.05, size=(3, 32))
+        vectorstore._collection.add(ids=[f"close-{i}" for i in range(3)], embeddings=close.tolist(),
+                                    documents=[f"Chunk pertinent {i}." for i in range(3)])
+
+        retriever = build_retriever(vectorstore, {**RETRIEVAL_CONFIG, "engine": "numpy", "adaptive_k": True,
+                                                  "min_k": 2, "max_k": 8})
+        assert isinstance(retriever, DenseRetriever)
+        results = retriever.invoke("émotivité")
+        assert [doc.id for doc in results] == [f"close-{i}" for i in np.argsort(np.linalg.norm(close - query_vector, axis=1))]
+        assert all(doc.metadata["relevance_score"] > 0.9 for doc in results)
+
+        chain = LangGraphRAGChain(FakeMemoryManager(), retriever=retriever,
+                                  llm=GenericFakeChatModel(messages=iter([AIMessage(content="Réponse.")])))
+        retrieval_trace = chain.invoke({"question": "émotivité"})["trace"]["retrieve_context"]
+        assert retrieval_trace["k"] == 3 and len(retrieval_trace["scores"]) == 3
+        print("[OK] Retriever kept the 3 relevant chunks out of 8 candidates, traced k and scores")
+
+        class FarLexicalIndex:
+            """BM25 stand-in ranking unrelated chunks first"""
+
+            def search(self, query, k):
+                far_ids = [chunk_id for chunk_id in vectorstore._collection.get()["ids"]
+                           if not chunk_id.startswith("close-")]
+                return [(chunk_id, 10.0 - rank) for rank, chunk_id in enumerate(far_ids[:2])]
+
+        hybrid = build_retriever(vectorstore, {**RETRIEVAL_CONFIG, "mode": "hybrid", "engine": "numpy",
+                                               "adaptive_k": True, "min_k": 2, "max_k": 8}, FarLexicalIndex())
+        results = hybrid.invoke("émotivité")
+        assert sorted(doc.id for doc in results) == [f"close-{i}" for i in range(3)], "Cut on similarity, not RRF"
+        assert all(doc.metadata["relevance_score"] > 0.9 and "rrf_score" in doc.metadata for doc in results)
+        print("[OK] Hybrid retriever cut the BM25-only unrelated chunks on cosine similarity")
+
+        for adaptive_k in (False, True):
+            hybrid_mmr = build_retriever(vectorstore, {**RETRIEVAL_CONFIG, "mode": "hybrid", "engine": "numpy",
+                                                       "mmr": True, "fetch_k": 10, "k": 4, "adaptive_k": adaptive_k,
+                                                       "min_k": 2, "max_k": 8}, FarLexicalIndex())
+            results = hybrid_mmr.invoke("émotivité")
+            assert results and all("rrf_score" in doc.metadata for doc in results)
+            assert all(("relevance_score" in doc.metadata) == adaptive_k for doc in results)
+    print("[OK] Hybrid retriever with MMR, with and without adaptive k")
+
+    return True
+
+
+def test_batch_retrieval_matches_single_queries():
+    """A batch of queries gives the same documents as one query at a time, with one embeddings request"""
+    print("\nTesting batched retrieval...")
+
+    from config.settings import RETRIEVAL_CONFIG
+    from core.lexical import load_lexical_index
+    from core.retrievers import build_retriever, retrieve_batch
+
+    queries = ["émotivité", "flegmatique", "Chunk numéro 7 sur le caractère.", "secondarité", "passion"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        embeddings = CountingRandomEmbeddings()
+        vectorstore = build_collection(tmp_dir, size=60, embeddings=embeddings)
+        lexical_index = load_lexical_index(tmp_dir, "test_numpy")
+
+        configs = {
+            "chroma": {**RETRIEVAL_CONFIG, "k": 4},
+            "numpy": {**RETRIEVAL_CONFIG, "engine": "numpy", "k": 4},
+            "quantized + MMR": {**RETRIEVAL_CONFIG, "engine": "quantized", "k": 4, "mmr": True, "fetch_k": 10},
+            "hybrid adaptive": {**RETRIEVAL_CONFIG, "mode": "hybrid", "engine": "numpy", "adaptive_k": True,
+                                "min_k": 2, "max_k": 6}
+        }
+        for label, config in configs.items():
+            retriever = build_retriever(vectorstore, config, lexical_index)
+            expected = [[doc.page_content for doc in retriever.invoke(query)] for query in queries]
+
+            requests_before = embeddings.requests
+            found = retrieve_batch(retriever, queries)
+            assert [[doc.page_content for doc in docs] for docs in found] == expected, f"Batch differs for {label}"
+            assert embeddings.requests - requests_before == 1, f"{label}: one embeddings request per batch"
+            print(f"[OK] {label}: {len(queries)} queries, same results, one embeddings request")
+
+        assert retrieve_batch(build_retriever(vectorstore, configs["numpy"]), []) == []
+
+    return True
+
+
+def test_async_retrieval_matches_sync():
+    """ainvoke returns the same documents as invoke for every engine-based retriever"""
+    print("\nTesting async retrieval...")
+
+    import asyncio
+    from config.settings import RETRIEVAL_CONFIG
+    from core.lexical import load_lexical_index
+    from core.retrievers import build_retriever
+
+    queries = ["émotivité", "Chunk numéro 7 sur le caractère.", "passion"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectorstore = build_collection(tmp_dir, size=60)
+        lexical_index = load_lexical_index(tmp_dir, "test_numpy")
+
+        configs = {
+            "numpy": {**RETRIEVAL_CONFIG, "engine": "numpy", "k": 4},
+            "quantized + MMR": {**RETRIEVAL_CONFIG, "engine": "quantized", "k": 4, "mmr": True, "fetch_k": 10},
+            "hybrid adaptive": {**RETRIEVAL_CONFIG, "mode": "hybrid", "engine": "numpy", "adaptive_k": True,
+                                "min_k": 2, "max_k": 6}
+        }
+        for label, config in configs.items():
+            retriever = build_retriever(vectorstore, config, lexical_index)
+
+            async def retrieve_all():
+                return await asyncio.gather(*(retriever.ainvoke(query) for query in queries))
+
+            expected = [[doc.page_content for doc in retriever.invoke(query)] for query in queries]
+            found = asyncio.run(retrieve_all())
+            assert [[doc.page_content for doc in docs] for docs in found] == expected, f"Async differs for {label}"
+            print(f"[OK] {label}: concurrent ainvoke matches invoke")
+
+    return True
+
+
+def main():
+    """Run all tests"""
+    print("Testing NumPy Vector Search...\n")
+
+    tests = [
+        test_numpy_engine_matches_chroma,
+        test_numpy_engine_batches_queries,
+        test_engine_selected_per_collection,
+        test_quantized_store_recall_and_memory,
+        test_quantized_engine_rebuilds_when_stale,
+        test_mmr_drops_near_duplicates,
+        test_adaptive_k_cuts_at_score_break,
+        test_batch_retrieval_matches_single_queries,
+        test_async_retrieval_matches_sync
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except Exception as e:
+            print(f"[ERROR] {test.__name__} failed: {e}")
+        print()
+
+    print("=" * 60)
+    print(f"Test Results: {passed}/{len(tests)} tests passed")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
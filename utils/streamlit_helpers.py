@@ -13,8 +13,8 @@ def create_stream_handler(placeholder):
     """Create a streaming callback handler for Streamlit"""
     return StreamlitCallbackHandler(
         placeholder, 
-        update_every=STREAMING_CONFIG["update_every"], 
-        delay=STREAMING_CONFIG["delay"]
+        max_fps=STREAMING_CONFIG["max_fps"], 
+        cursor=STREAMING_CONFIG["cursor"]
     )
 
 def render_conversation_sidebar():